@@ -0,0 +1,171 @@
+"""
+Write-behind buffer for chat messages.
+
+ChatConsumer broadcasts a message as soon as it arrives and only queues the row
+here; a single flusher task per process coalesces the queue into one
+bulk_create every CHAT_BUFFER_FLUSH_INTERVAL seconds or CHAT_BUFFER_BATCH_SIZE
+messages, whichever comes first, instead of one thread-pool hop per message.
+
+Every put() gets a sequence number. The flusher writes in queue order and
+records the last sequence written, so drain() waits for the messages queued
+before it was called and not for the ones other sockets keep sending.
+"""
+import asyncio
+import atexit
+import logging
+from typing import Dict, List, Optional
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, DateTimeField, Value, When
+
+from .models import Message
+
+logger = logging.getLogger(__name__)
+
+
+def restore_timestamps(stamps: Dict) -> None:
+    """
+        Write back the created_at the consumer set and broadcast, keyed by
+        message id: auto_now_add replaces it with the time of the insert.
+    """
+    stamps = {message_id: stamp for message_id, stamp in stamps.items() if stamp is not None}
+    if not stamps:
+        return
+    Message.objects.filter(id__in=stamps).update(created_at=Case(
+        *[When(id=message_id, then=Value(stamp)) for message_id, stamp in stamps.items()],
+        output_field=DateTimeField(),
+    ))
+
+
+class MessageWriteBuffer:
+    def __init__(self, max_size: int, batch_size: int, flush_interval: float):
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: Optional[asyncio.Queue] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._loop = None
+        # Sequence of the last message queued, and of the last one written
+        self._queued = 0
+        self._written = 0
+        self._progress: Optional[asyncio.Condition] = None
+        # Taken off the queue by the flusher, not committed yet
+        self._in_flight: List[Message] = []
+
+    @classmethod
+    def from_settings(cls) -> 'MessageWriteBuffer':
+        return cls(
+            max_size=settings.CHAT_BUFFER_MAX_SIZE,
+            batch_size=settings.CHAT_BUFFER_BATCH_SIZE,
+            flush_interval=settings.CHAT_BUFFER_FLUSH_INTERVAL,
+        )
+
+    def __len__(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def _ensure_started(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._queue is None or self._loop is not loop:
+            self._queue = asyncio.Queue(maxsize=self.max_size)
+            self._progress = asyncio.Condition()
+            self._loop = loop
+            self._flusher = None
+            self._written = self._queued
+        if self._flusher is None or self._flusher.done():
+            self._flusher = loop.create_task(self._run())
+
+    async def put(self, message: Message) -> int:
+        """
+            Queue a message for insertion, waits while the buffer is full
+            (backpressure). Returns its sequence number, see drain().
+        """
+        self._ensure_started()
+        if self._queue.full():
+            logger.warning(f"Message buffer full ({self.max_size}), waiting for a flush")
+        self._queued += 1
+        sequence = self._queued
+        await self._queue.put((sequence, message))
+        return sequence
+
+    async def drain(self, sequence: Optional[int] = None) -> None:
+        """Wait until the messages queued up to sequence (by default every one queued so far) are written."""
+        if self._queue is None or self._loop is not asyncio.get_running_loop():
+            return
+        target = self._queued if sequence is None else sequence
+        async with self._progress:
+            await self._progress.wait_for(lambda: self._written >= target)
+
+    async def close(self) -> None:
+        """Drain the queue and stop the flusher task."""
+        await self.drain()
+        if self._flusher is not None:
+            self._flusher.cancel()
+            self._flusher = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            self._in_flight = [message for _, message in batch]
+            try:
+                await database_sync_to_async(self.write)(self._in_flight)
+            finally:
+                self._in_flight = []
+                for _ in batch:
+                    self._queue.task_done()
+                async with self._progress:
+                    # A failed batch counts as written too, write() logged what it dropped
+                    self._written = batch[-1][0]
+                    self._progress.notify_all()
+
+    @staticmethod
+    def write(batch: List[Message], ignore_conflicts: bool = False) -> None:
+        """Insert a batch in one statement, falling back to row by row to isolate a bad message."""
+        stamps = {message.id: message.created_at for message in batch}
+        try:
+            with transaction.atomic():
+                Message.objects.bulk_create(batch, batch_size=len(batch), ignore_conflicts=ignore_conflicts)
+                restore_timestamps(stamps)
+            logger.debug(f"Flushed {len(batch)} chat message(s)")
+            return
+        except Exception as e:
+            logger.error(f"Bulk insert of {len(batch)} messages failed, retrying one by one: {e}")
+
+        for message in batch:
+            try:
+                with transaction.atomic():
+                    message.save(force_insert=True)
+                    restore_timestamps({message.id: stamps[message.id]})
+            except Exception as e:
+                logger.error(f"Dropping chat message {message.id}: {e}", exc_info=True)
+
+    def flush_remaining(self) -> None:
+        """
+            Synchronously write the batch in flight and whatever is still
+            queued, registered to run at interpreter exit.
+        """
+        batch = list(self._in_flight)
+        while self._queue is not None and not self._queue.empty():
+            batch.append(self._queue.get_nowait()[1])
+        if not batch:
+            return
+        logger.info(f"Writing {len(batch)} buffered chat message(s) on shutdown")
+        # The batch in flight may have been committed before the loop stopped
+        self.write(batch, ignore_conflicts=True)
+
+
+message_buffer = MessageWriteBuffer.from_settings()
+atexit.register(message_buffer.flush_remaining)
@@ -1,20 +1,34 @@
 import json
 import logging
+import uuid
 
 from channels.generic.websocket import AsyncWebsocketConsumer
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import ValidationError
 from django.middleware.csrf import CsrfViewMiddleware
 
+from common.pagination import InvalidCursor
+from common.slugs import resolve_slug
+from .buffer import message_buffer
+from .history import load_history
+from .presence import add_connection, is_online, remove_connection, touch_presence
+from .receipts import PendingRead, read_receipt_buffer
+from .unread import aincrement_unread
 from .models import Chat, Message, STATUS
 from channels.db import database_sync_to_async
 from django.utils import timezone
 
 logger = logging.getLogger(__name__)
 
+MESSAGE_MAX_LENGTH = Message._meta.get_field('message').max_length
+
 
 class ChatConsumer(AsyncWebsocketConsumer):
+    # Buffer sequence of the last message this socket queued, see chats.buffer
+    last_queued = 0
+
     async def connect(self):
         try:
             # Get connection parameters
@@ -80,6 +94,16 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 'room_name': self.room_name
             }))
 
+            await add_connection(self.user.pkid)
+            await self.broadcast_presence(online=True)
+
+            # Tell the new socket whether the other participant is around
+            await self.send(text_data=json.dumps({
+                'type': 'presence',
+                'user_id': str(self.receiver.id),
+                'online': await is_online(self.receiver.pkid)
+            }))
+
         except Exception as e:
             logger.error(f"WebSocket connection error: {str(e)}", exc_info=True)
             try:
@@ -113,21 +137,9 @@ class ChatConsumer(AsyncWebsocketConsumer):
             return False
 
     @database_sync_to_async
-    def get_message_history(self, room, last_message_id=0):
-        messages = Message.active_messages.filter(
-            chat=room,
-            id__gt=last_message_id
-        ).order_by('date_created')
-        return [
-            {
-                'author__username': msg.author.username,
-                'author_id': msg.author.id,
-                'message': msg.message,
-                'date_created': msg.date_created.isoformat(),
-                'id': msg.pkid
-            }
-            for msg in messages
-        ]
+    def get_message_history(self, cursor=None):
+        """A page of messages older than the cursor, see chats.history"""
+        return load_history(self.room, cursor)
 
     @database_sync_to_async
     def get_receiver(self):
@@ -142,29 +154,36 @@ class ChatConsumer(AsyncWebsocketConsumer):
     def get_room(self):
         """Get chat room with better error handling"""
         try:
-            return Chat.active_chats.get(slug=self.room_name)
-        except Chat.DoesNotExist:
-            logger.error(f"Chat room not found: {self.room_name}")
-            return None
+            room = resolve_slug(None, Chat.active_chats, self.room_name)
+            if room is None:
+                logger.error(f"Chat room not found: {self.room_name}")
+            return room
         except Exception as e:
             logger.error(f"Error getting chat room {self.room_name}: {str(e)}")
             return None
 
-    @database_sync_to_async
-    def save_message(self, room, content):
-        return Message._default_manager.create(
+    async def save_message(self, room, content):
+        """
+            Queue the message on the write-behind buffer, it is inserted with
+            the next batch. The UUID is assigned here, so it can be broadcast
+            right away.
+        """
+        message = Message(
             chat=room,
             author=self.user,
             sent_for=self.receiver,
             message=content,
-            status=STATUS.SENT
+            status=STATUS.SENT,
+            created_at=timezone.now()
         )
+        self.last_queued = await message_buffer.put(message)
+        return message
 
     @database_sync_to_async
     def update_message(self, message_id, new_content):
         try:
             # Use default manager instead of active_messages to ensure we can find the message
-            message = Message.objects.get(pkid=message_id)
+            message = Message.objects.select_related('author').get(id=message_id)
 
             # Verify ownership
             if message.author.id != self.user.id:
@@ -173,28 +192,27 @@ class ChatConsumer(AsyncWebsocketConsumer):
             # Update message
             message.message = new_content
             message.status = STATUS.EDITED
-            message.date_updated = timezone.now()
-            message.save()
+            message.save(update_fields=['message', 'status', 'updated_at'])
 
             # Return the updated message
             return {
-                'id': message.pkid,
+                'id': str(message.id),
                 'message': message.message,
-                'date_updated': message.date_updated,
-                'author_id': message.author.id
+                'updated_at': message.updated_at,
+                'author_id': str(message.author.id)
             }
 
-        except Message.DoesNotExist:
+        except (Message.DoesNotExist, ValidationError):
             raise ValueError("Message not found")
         except Exception as e:
-            print(f"Error updating message: {str(e)}")
+            logger.error(f"Error updating message: {str(e)}")
             raise
 
     @database_sync_to_async
     def delete_message(self, message_id):
         try:
             # Use default manager instead of active_messages to ensure we can find the message
-            message = Message.objects.get(pkid=message_id)
+            message = Message.objects.get(id=message_id)
 
             if not message:
                 logger.error("Message not found")
@@ -208,23 +226,54 @@ class ChatConsumer(AsyncWebsocketConsumer):
             message.status = STATUS.DELETED
             message.delete() # Soft delete
 
-        except Message.DoesNotExist:
+        except (Message.DoesNotExist, ValidationError):
             logger.error("Message not found")
         except Exception as e:
             logger.error(f"Error deleting message: {str(e)}")
             raise
 
+    async def group_send_frame(self, frame):
+        """
+            Serialize the outgoing frame once and hand the ready-made text to
+            the group, every consumer forwards it as is.
+        """
+        await self.channel_layer.group_send(
+            self.room_group_name,
+            {
+                'type': frame['type'],
+                'text': json.dumps(frame)
+            }
+        )
+
+    async def broadcast_presence(self, online):
+        await self.group_send_frame({
+            'type': 'presence',
+            'user_id': str(self.user.id),
+            'online': online
+        })
+
     async def disconnect(self, close_code):
+        # The connection was refused before joining the room
+        if not hasattr(self, 'room_group_name'):
+            return
+
+        # Still online through the user's other sockets
+        if not await remove_connection(self.user.pkid):
+            await self.broadcast_presence(online=False)
         await self.channel_layer.group_discard(
             self.room_group_name,
             self.channel_name
         )
+        # Don't let the socket go before its messages are written
+        await message_buffer.drain(self.last_queued)
 
     async def receive(self, text_data):
         try:
             data = json.loads(text_data)
 
             if data.get('type') == 'ping':
+                # Pings double as the presence heartbeat
+                await touch_presence(self.user.pkid)
                 await self.send(text_data=json.dumps({
                     'type': 'pong',
                     'message': 'Connection confirmed'
@@ -233,7 +282,69 @@ class ChatConsumer(AsyncWebsocketConsumer):
 
             message_type = data.get('type', 'chat_message')
 
-            if message_type == 'edit_message':
+            if message_type == 'chat_message':
+                content = data.get('message', '').strip()
+
+                if not content:
+                    return
+
+                if len(content) > MESSAGE_MAX_LENGTH:
+                    await self.send(text_data=json.dumps({
+                        'type': 'error',
+                        'message': f"Message is over {MESSAGE_MAX_LENGTH} letters long!"
+                    }))
+                    return
+
+                message = await self.save_message(self.room, content)
+                await aincrement_unread(self.receiver.pkid, self.room.pkid)
+
+                # Broadcast right away, the row is written by the buffer
+                await self.group_send_frame({
+                    'type': 'chat_message',
+                    'id': str(message.id),
+                    'temp_id': data.get('temp_id'),
+                    'message': message.message,
+                    'sender': self.user.username,
+                    'timestamp': message.created_at.isoformat(),
+                    'author_id': str(self.user.id)
+                })
+
+            elif message_type == 'load_history':
+                # Messages still waiting in the write-behind buffer are history too
+                await message_buffer.drain()
+
+                try:
+                    history = await self.get_message_history(data.get('cursor') or None)
+                except InvalidCursor:
+                    await self.send(text_data=json.dumps({
+                        'type': 'error',
+                        'message': 'Invalid history cursor'
+                    }))
+                    return
+
+                await self.send(text_data=json.dumps({
+                    'type': 'history',
+                    **history
+                }))
+
+            elif message_type == 'mark_read':
+                try:
+                    message_id = uuid.UUID(str(data.get('message_id')))
+                except ValueError:
+                    await self.send(text_data=json.dumps({
+                        'type': 'error',
+                        'message': 'Message not found'
+                    }))
+                    return
+
+                # Only the newest acknowledged message matters, older ones are covered by it
+                read_receipt_buffer.add(
+                    self.room.pkid,
+                    self.user.pkid,
+                    PendingRead(self.room_group_name, str(self.user.id), str(message_id))
+                )
+
+            elif message_type == 'edit_message':
                 message_id = data.get('message_id')
                 new_content = data.get('new_content', '').strip()
 
@@ -241,21 +352,21 @@ class ChatConsumer(AsyncWebsocketConsumer):
                     return
 
                 try:
+                    # The message may still be waiting in the write-behind buffer
+                    await message_buffer.drain()
+
                     # Update message in database
                     update_result = await self.update_message(message_id, new_content)
 
                     # Broadcast update to all clients
-                    await self.channel_layer.group_send(
-                        self.room_group_name,
-                        {
-                            'type': 'message_edited',
-                            'message_id': update_result['id'],
-                            'new_content': update_result['message'],
-                            'sender': self.user.username,
-                            'date_updated': update_result['date_updated'].isoformat(),
-                            'author_id': update_result['author_id']
-                        }
-                    )
+                    await self.group_send_frame({
+                        'type': 'message_edited',
+                        'message_id': update_result['id'],
+                        'new_content': update_result['message'],
+                        'sender': self.user.username,
+                        'updated_at': update_result['updated_at'].isoformat(),
+                        'author_id': update_result['author_id']
+                    })
 
                     # Send confirmation to sender
                     await self.send(text_data=json.dumps({
@@ -280,27 +391,20 @@ class ChatConsumer(AsyncWebsocketConsumer):
                     }))
 
         except Exception as e:
-            print(f"Error processing message: {str(e)}")
+            logger.error(f"Error processing message: {str(e)}", exc_info=True)
             await self.send(text_data=json.dumps({
                 'type': 'error',
                 'message': 'Failed to process message'
             }))
 
     async def chat_message(self, event):
-        await self.send(text_data=json.dumps({
-            'type': 'chat_message',
-            'message': event['message'],
-            'sender': event['sender'],
-            'timestamp': event['timestamp'],
-            'id': event['id'],
-            'author_id': event['author_id']
-        }))
+        await self.send(text_data=event['text'])
 
     async def message_edited(self, event):
-        await self.send(text_data=json.dumps({
-            'type': 'message_edited',
-            'message_id': event['message_id'],
-            'new_content': event['new_content'],
-            'sender': event['sender'],
-            'date_updated': event['date_updated']
-        }))
\ No newline at end of file
+        await self.send(text_data=event['text'])
+
+    async def presence(self, event):
+        await self.send(text_data=event['text'])
+
+    async def read_receipt(self, event):
+        await self.send(text_data=event['text'])
\ No newline at end of file
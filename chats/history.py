@@ -0,0 +1,55 @@
+"""
+Message history of a chat, paged backwards by a (created_at, pkid) cursor.
+
+Pages are read with values() projections joined with the author's username,
+so a page is one index range scan on (chat, created_at, pkid) no matter how
+far back the client has scrolled.
+"""
+from typing import Any, Dict, Optional
+
+from common.pagination import CursorPaginator
+from .models import Chat, Message
+
+HISTORY_PAGE_SIZE = 50
+
+HISTORY_FIELDS = (
+    'pkid',
+    'id',
+    'message',
+    'status',
+    'created_at',
+    'updated_at',
+    'author__id',
+    'author__username',
+)
+
+
+def history_paginator(chat: Chat, per_page: int = HISTORY_PAGE_SIZE) -> CursorPaginator:
+    """Newest first, so the `after` cursor of a page points to older messages."""
+    queryset = Message.active_messages.filter(chat=chat).values(*HISTORY_FIELDS)
+    return CursorPaginator(queryset, per_page, ordering=('-created_at', '-pkid'))
+
+
+def serialize_message(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'id': str(row['id']),
+        'message': row['message'],
+        'status': row['status'],
+        'sender': row['author__username'],
+        'author_id': str(row['author__id']),
+        'timestamp': row['created_at'].isoformat(),
+        'updated_at': row['updated_at'].isoformat() if row['updated_at'] else None,
+    }
+
+
+def load_history(chat: Chat, cursor: Optional[str] = None, per_page: int = HISTORY_PAGE_SIZE) -> Dict[str, Any]:
+    """
+        One page of messages older than `cursor` (the newest page without
+        one), newest first. Raises InvalidCursor for a malformed cursor.
+    """
+    page = history_paginator(chat, per_page).page(after=cursor)
+    return {
+        'messages': [serialize_message(row) for row in page],
+        'cursor': page.next_cursor,
+        'has_more': page.has_next(),
+    }
@@ -0,0 +1,22 @@
+# Generated by Django 5.0.4 on 2026-10-18 02:51
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("chats", "0007_alter_chat_managers_alter_message_managers"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(
+                fields=["chat", "-created_at", "-pkid"],
+                name="chats_messa_chat_id_17ec91_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.4 on 2026-10-18 03:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("chats", "0008_message_chats_messa_chat_id_17ec91_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="message",
+            name="renditions",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
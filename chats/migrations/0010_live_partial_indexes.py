@@ -0,0 +1,43 @@
+# Generated by Django 5.0.4 on 2026-10-18 03:47
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("chats", "0009_message_renditions"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="message",
+            name="chats_messa_chat_id_17ec91_idx",
+        ),
+        migrations.AddIndex(
+            model_name="chat",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["author", "-updated_at"],
+                name="chat_live_author_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="chat",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["chat_to_user", "-updated_at"],
+                name="chat_live_recipient_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["chat", "-created_at", "-pkid"],
+                name="message_live_history_idx",
+            ),
+        ),
+    ]
@@ -5,6 +5,7 @@ from django.contrib import messages
 from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse_lazy, reverse
 
+from common.slugs import resolve_slug
 from .models import Chat, Message
 
 
@@ -13,8 +14,7 @@ logger = logging.getLogger(__name__)
 class GetChatObjectMixin:
     def get_object(self):
         _slug = self.kwargs.get(self.slug_field, '')
-        print(f"Slug: {_slug}")
-        return Chat.active_chats.filter(slug=_slug).first()
+        return resolve_slug(self.request, Chat.active_chats, _slug)
 
 class GetMessageObjectMixin:
     def get_object(self):
@@ -7,7 +7,7 @@ from django.utils.text import slugify
 from autoslug import AutoSlugField
 
 from chats.managers import ActiveChatsManager, ActiveMessagesManager
-from common.models import TimeStampedUUIDModel
+from common.models import ImageRenditionsModel, TimeStampedUUIDModel
 
 
 class STATUS(models.TextChoices):
@@ -53,6 +53,19 @@ class Chat(TimeStampedUUIDModel):
         verbose_name_plural = _("Chats")
         ordering = ['-created_at']
         unique_together = ('author', 'chat_to_user')
+        indexes = [
+            # The inbox: active chats started by or sent to a user, last updated first
+            models.Index(
+                fields=['author', '-updated_at'],
+                condition=models.Q(is_active=True),
+                name='chat_live_author_idx'
+            ),
+            models.Index(
+                fields=['chat_to_user', '-updated_at'],
+                condition=models.Q(is_active=True),
+                name='chat_live_recipient_idx'
+            ),
+        ]
         
     def __str__(self):
         return self.slug
@@ -74,7 +87,7 @@ class Chat(TimeStampedUUIDModel):
         return reverse('chats:chat-detail', kwargs={'chat_slug': self.slug})
     
     
-class Message(TimeStampedUUIDModel):
+class Message(TimeStampedUUIDModel, ImageRenditionsModel):
     objects = models.Manager()
     active_messages = ActiveMessagesManager()
 
@@ -123,6 +136,14 @@ class Message(TimeStampedUUIDModel):
         verbose_name = _("Message")
         verbose_name_plural = _("Messages")
         ordering = ['-created_at']
+        indexes = [
+            # Backs the (created_at, pkid) history cursor and the last message of a chat
+            models.Index(
+                fields=['chat', '-created_at', '-pkid'],
+                condition=models.Q(is_active=True),
+                name='message_live_history_idx'
+            ),
+        ]
         
     def __str__(self):
         return f"{self.id} {self.author.username}"
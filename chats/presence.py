@@ -0,0 +1,59 @@
+"""
+Who is online, tracked by websocket heartbeats.
+
+A per-user key counts the user's open ChatConsumer connections: connect
+adds one, disconnect removes one, and the user is offline once none is left,
+so closing one tab doesn't hide the others. The key has a CHAT_PRESENCE_TTL
+timeout refreshed on every ping; a user whose sockets stop pinging drops
+offline once it expires, even if disconnect never ran.
+"""
+from typing import Iterable, Set
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+def presence_cache_key(user_pkid) -> str:
+    return f'chats:presence:{user_pkid}'
+
+
+async def add_connection(user_pkid) -> None:
+    key = presence_cache_key(user_pkid)
+    if await cache.aadd(key, 1, settings.CHAT_PRESENCE_TTL):
+        return
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        # Expired between the add and the incr
+        await cache.aadd(key, 1, settings.CHAT_PRESENCE_TTL)
+    await cache.atouch(key, settings.CHAT_PRESENCE_TTL)
+
+
+async def touch_presence(user_pkid) -> None:
+    key = presence_cache_key(user_pkid)
+    if not await cache.atouch(key, settings.CHAT_PRESENCE_TTL):
+        # Expired while the socket stayed quiet, it counts again
+        await cache.aadd(key, 1, settings.CHAT_PRESENCE_TTL)
+
+
+async def remove_connection(user_pkid) -> bool:
+    """Drop one connection of the user, returns whether others are still open."""
+    key = presence_cache_key(user_pkid)
+    try:
+        remaining = await cache.adecr(key)
+    except ValueError:
+        return False
+    if remaining <= 0:
+        await cache.adelete(key)
+        return False
+    return True
+
+
+async def is_online(user_pkid) -> bool:
+    return await cache.aget(presence_cache_key(user_pkid), 0) > 0
+
+
+def online_user_ids(user_pkids: Iterable[int]) -> Set[int]:
+    """The users among user_pkids that are online, in one cache round trip."""
+    keys = {presence_cache_key(user_pkid): user_pkid for user_pkid in user_pkids}
+    return {keys[key] for key, connections in cache.get_many(keys).items() if connections > 0}
@@ -0,0 +1,110 @@
+"""
+Read receipts, coalesced per chat.
+
+The mark_read websocket command only records the newest message a user has
+seen. Every CHAT_READ_FLUSH_INTERVAL seconds the buffer turns what was
+recorded into one `UPDATE ... WHERE pkid <= cursor` per (chat, reader) and
+pushes a single read_receipt frame to the chat's group, instead of one row
+update and one event per message.
+"""
+import asyncio
+import json
+import logging
+from typing import Dict, List, NamedTuple, Tuple
+
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.utils import timezone
+
+from .buffer import message_buffer
+from .models import Message, STATUS
+from .unread import decrement_unread, unread_messages_filter
+
+logger = logging.getLogger(__name__)
+
+
+class PendingRead(NamedTuple):
+    room_group_name: str
+    reader_id: str
+    message_id: str
+
+
+class ReadReceiptBuffer:
+    def __init__(self, flush_interval: float):
+        self.flush_interval = flush_interval
+        self._pending: Dict[Tuple[int, int], PendingRead] = {}
+        self._flusher = None
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, chat_pkid, reader_pkid, pending: PendingRead) -> None:
+        """Record the newest message the reader has seen, replacing an older one of the same chat."""
+        self._pending[(chat_pkid, reader_pkid)] = pending
+        loop = asyncio.get_running_loop()
+        if self._flusher is None or self._flusher.done() or self._flusher.get_loop() is not loop:
+            self._flusher = loop.create_task(self._run())
+
+    async def _run(self) -> None:
+        while self._pending:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self) -> None:
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return
+
+        # The acknowledged messages may still be waiting to be inserted
+        await message_buffer.drain()
+        try:
+            receipts = await database_sync_to_async(self.write)(pending)
+        except Exception as e:
+            logger.error(f"Failed to write {len(pending)} read receipt(s): {e}", exc_info=True)
+            return
+
+        channel_layer = get_channel_layer()
+        for room_group_name, frame in receipts:
+            await channel_layer.group_send(room_group_name, {
+                'type': 'read_receipt',
+                'text': json.dumps(frame)
+            })
+
+    @staticmethod
+    def write(pending: Dict[Tuple[int, int], PendingRead]) -> List[Tuple[str, dict]]:
+        """Mark messages read up to each cursor, returns the receipts to broadcast."""
+        cursors = {
+            (chat_pkid, str(message_id)): pkid
+            for chat_pkid, message_id, pkid in (
+                Message.objects
+                .filter(id__in={read.message_id for read in pending.values()})
+                .values_list('chat_id', 'id', 'pkid')
+            )
+        }
+
+        read_at = timezone.now()
+        receipts = []
+        for (chat_pkid, reader_pkid), read in pending.items():
+            cursor = cursors.get((chat_pkid, read.message_id))
+            if cursor is None:
+                continue
+
+            updated = (
+                Message.objects
+                .filter(chat_id=chat_pkid, pkid__lte=cursor)
+                .filter(unread_messages_filter(reader_pkid))
+                .update(status=STATUS.READ, updated_at=read_at)
+            )
+            decrement_unread(reader_pkid, chat_pkid, updated)
+            if updated:
+                receipts.append((read.room_group_name, {
+                    'type': 'read_receipt',
+                    'reader_id': read.reader_id,
+                    'message_id': read.message_id,
+                    'read_at': read_at.isoformat()
+                }))
+        return receipts
+
+
+read_receipt_buffer = ReadReceiptBuffer(settings.CHAT_READ_FLUSH_INTERVAL)
@@ -1,3 +1,388 @@
-from django.test import TestCase
+import asyncio
+import json
 
-# Create your tests here.
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .buffer import MessageWriteBuffer
+from .consumers import ChatConsumer
+from .history import HISTORY_PAGE_SIZE, load_history
+from .models import Chat, Message, STATUS
+from .presence import is_online
+from .receipts import read_receipt_buffer
+from .unread import get_unread_counts, increment_unread
+
+User = get_user_model()
+
+
+class TestMessageWriteBuffer(TestCase):
+    def setUp(self):
+        self.author = User._default_manager.create_user(
+            username='author', email='author@example.com', password='password'
+        )
+        self.receiver = User._default_manager.create_user(
+            username='receiver', email='receiver@example.com', password='password'
+        )
+        self.chat = Chat.objects.create(author=self.author, chat_to_user=self.receiver)
+
+    def build_message(self, text):
+        return Message(chat=self.chat, author=self.author, sent_for=self.receiver, message=text)
+
+    async def test_messages_are_flushed_in_one_batch(self):
+        buffer = MessageWriteBuffer(max_size=10, batch_size=5, flush_interval=1)
+        messages = [self.build_message(f"message {i}") for i in range(5)]
+
+        for message in messages:
+            await buffer.put(message)
+        await buffer.close()
+
+        self.assertEqual(await Message.objects.filter(chat=self.chat).acount(), 5)
+        self.assertEqual(len(buffer), 0)
+
+    async def test_drain_writes_partial_batch(self):
+        buffer = MessageWriteBuffer(max_size=10, batch_size=100, flush_interval=0.01)
+        message = self.build_message("hello")
+
+        await buffer.put(message)
+        await buffer.close()
+
+        self.assertTrue(await Message.objects.filter(id=message.id).aexists())
+
+    def test_flush_remaining_writes_synchronously(self):
+        buffer = MessageWriteBuffer(max_size=10, batch_size=100, flush_interval=1)
+        in_flight, queued = self.build_message("one"), self.build_message("two")
+        # Messages left behind by a loop that stopped before flushing
+        buffer._in_flight = [in_flight]
+        buffer._queue = asyncio.Queue()
+        buffer._queue.put_nowait((1, queued))
+
+        buffer.flush_remaining()
+        self.assertEqual(Message.objects.filter(chat=self.chat).count(), 2)
+
+    def test_flush_remaining_skips_a_committed_batch(self):
+        buffer = MessageWriteBuffer(max_size=10, batch_size=100, flush_interval=1)
+        message = self.build_message("committed")
+        MessageWriteBuffer.write([message])
+        buffer._in_flight = [message]
+
+        buffer.flush_remaining()
+        self.assertEqual(Message.objects.filter(chat=self.chat).count(), 1)
+
+    async def test_stored_timestamp_is_the_broadcast_one(self):
+        buffer = MessageWriteBuffer(max_size=10, batch_size=100, flush_interval=0.01)
+        message = self.build_message("hello")
+        message.created_at = timezone.now() - timezone.timedelta(seconds=30)
+        sent_at = message.created_at
+
+        await buffer.put(message)
+        await buffer.close()
+
+        stored = await Message.objects.aget(id=message.id)
+        self.assertEqual(stored.created_at, sent_at)
+
+    async def test_drain_does_not_wait_for_later_messages(self):
+        buffer = MessageWriteBuffer(max_size=100, batch_size=2, flush_interval=0.01)
+        first = self.build_message("first")
+        sequence = await buffer.put(first)
+
+        async def keep_sending():
+            while True:
+                # Refills the queue faster than the writer empties it
+                await buffer.put(self.build_message("more"))
+                await asyncio.sleep(0)
+
+        producer = asyncio.create_task(keep_sending())
+        try:
+            await asyncio.wait_for(buffer.drain(), timeout=2)
+            await asyncio.wait_for(buffer.drain(sequence), timeout=2)
+        finally:
+            producer.cancel()
+        self.assertTrue(await Message.objects.filter(id=first.id).aexists())
+        await buffer.close()
+
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class TestChatConsumer(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User._default_manager.create_user(
+            username='author', email='author@example.com', password='password'
+        )
+        self.receiver = User._default_manager.create_user(
+            username='receiver', email='receiver@example.com', password='password'
+        )
+        self.chat = Chat.objects.create(author=self.author, chat_to_user=self.receiver)
+
+    def communicator(self, user, other):
+        communicator = WebsocketCommunicator(
+            ChatConsumer.as_asgi(),
+            f"/ws/chat/{self.chat.slug}/{other.id}/?token=token"
+        )
+        communicator.scope['user'] = user
+        communicator.scope['url_route'] = {
+            'kwargs': {'room_name': self.chat.slug, 'receiver_id': str(other.id)}
+        }
+        return communicator
+
+    async def connect(self, user, other):
+        communicator = self.communicator(user, other)
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        handshake = await communicator.receive_json_from()
+        self.assertEqual(handshake['type'], 'handshake_complete')
+        return communicator
+
+    async def receive(self, communicator, frame_type, timeout=1):
+        """Raw text of the next frame of frame_type, skipping presence updates and the like."""
+        while True:
+            text = await communicator.receive_from(timeout)
+            if json.loads(text)['type'] == frame_type:
+                return text
+
+    async def receive_json(self, communicator, frame_type, timeout=1):
+        return json.loads(await self.receive(communicator, frame_type, timeout))
+
+    async def test_chat_message_is_broadcast_and_saved(self):
+        sender = await self.connect(self.author, self.receiver)
+        recipient = await self.connect(self.receiver, self.author)
+
+        await sender.send_json_to({'type': 'chat_message', 'message': 'hello', 'temp_id': 'temp-1'})
+        sent = await self.receive(sender, 'chat_message')
+        received = await self.receive(recipient, 'chat_message')
+
+        # Both sockets get the very same serialized frame
+        self.assertEqual(sent, received)
+        frame = json.loads(sent)
+        self.assertEqual(frame['type'], 'chat_message')
+        self.assertEqual(frame['message'], 'hello')
+        self.assertEqual(frame['temp_id'], 'temp-1')
+        self.assertEqual(frame['author_id'], str(self.author.id))
+
+        await sender.disconnect()
+        await recipient.disconnect()
+        self.assertTrue(await Message.objects.filter(id=frame['id'], chat=self.chat).aexists())
+
+    async def test_edit_message_by_uuid(self):
+        sender = await self.connect(self.author, self.receiver)
+
+        await sender.send_json_to({'type': 'chat_message', 'message': 'hello'})
+        frame = await self.receive_json(sender, 'chat_message')
+        await sender.send_json_to({
+            'type': 'edit_message',
+            'message_id': frame['id'],
+            'new_content': 'edited',
+        })
+        # The direct confirmation goes out before the group broadcast comes back
+        confirmation = await self.receive_json(sender, 'edit_success')
+        edited = await self.receive_json(sender, 'message_edited')
+        await sender.disconnect()
+
+        self.assertEqual(confirmation['message_id'], frame['id'])
+
+        self.assertEqual(edited['message_id'], frame['id'])
+        self.assertEqual(edited['new_content'], 'edited')
+        message = await Message.objects.aget(id=frame['id'])
+        self.assertEqual(message.message, 'edited')
+
+    async def test_load_history_includes_buffered_messages(self):
+        sender = await self.connect(self.author, self.receiver)
+
+        await sender.send_json_to({'type': 'chat_message', 'message': 'hello'})
+        frame = await self.receive_json(sender, 'chat_message')
+        await sender.send_json_to({'type': 'load_history'})
+        history = await self.receive_json(sender, 'history')
+        await sender.disconnect()
+
+        self.assertEqual([message['id'] for message in history['messages']], [frame['id']])
+        self.assertFalse(history['has_more'])
+
+    async def receive_presence(self, communicator, count):
+        return {
+            (status['user_id'], status['online'])
+            for status in [await self.receive_json(communicator, 'presence') for _ in range(count)]
+        }
+
+    async def test_presence_follows_connections(self):
+        author_id, receiver_id = str(self.author.id), str(self.receiver.id)
+
+        recipient = await self.connect(self.receiver, self.author)
+        self.assertEqual(
+            await self.receive_presence(recipient, 2),
+            {(author_id, False), (receiver_id, True)}
+        )
+
+        sender = await self.connect(self.author, self.receiver)
+        # The new socket is told the receiver is already online
+        self.assertEqual(
+            await self.receive_presence(sender, 2),
+            {(receiver_id, True), (author_id, True)}
+        )
+        self.assertEqual(await self.receive_presence(recipient, 1), {(author_id, True)})
+
+        await sender.disconnect()
+        self.assertEqual(await self.receive_presence(recipient, 1), {(author_id, False)})
+        await recipient.disconnect()
+
+    async def test_closing_one_of_two_sockets_stays_online(self):
+        first = await self.connect(self.author, self.receiver)
+        second = await self.connect(self.author, self.receiver)
+        # Sent once the connection is counted
+        await self.receive_presence(second, 2)
+        await first.disconnect()
+        self.assertTrue(await is_online(self.author.pkid))
+
+        await second.disconnect()
+        self.assertFalse(await is_online(self.author.pkid))
+
+    async def test_mark_read_is_coalesced_into_one_receipt(self):
+        self.addCleanup(setattr, read_receipt_buffer, 'flush_interval', read_receipt_buffer.flush_interval)
+        read_receipt_buffer.flush_interval = 0.05
+        sender = await self.connect(self.author, self.receiver)
+        recipient = await self.connect(self.receiver, self.author)
+
+        ids = []
+        for i in range(3):
+            await sender.send_json_to({'type': 'chat_message', 'message': f'message {i}'})
+            ids.append((await self.receive_json(recipient, 'chat_message'))['id'])
+        for message_id in ids:
+            await recipient.send_json_to({'type': 'mark_read', 'message_id': message_id})
+
+        receipt = await self.receive_json(sender, 'read_receipt')
+        self.assertEqual(receipt['reader_id'], str(self.receiver.id))
+        self.assertEqual(receipt['message_id'], ids[-1])
+        await sender.disconnect()
+        await recipient.disconnect()
+
+        statuses = [message.status async for message in Message.objects.filter(chat=self.chat)]
+        self.assertEqual(statuses, [STATUS.READ] * 3)
+
+
+class TestMessageHistory(TestCase):
+    def setUp(self):
+        self.author = User._default_manager.create_user(
+            username='author', email='author@example.com', password='password', is_active=True
+        )
+        self.receiver = User._default_manager.create_user(
+            username='receiver', email='receiver@example.com', password='password'
+        )
+        self.chat = Chat.objects.create(author=self.author, chat_to_user=self.receiver)
+        Message.objects.bulk_create([
+            Message(chat=self.chat, author=self.author, sent_for=self.receiver, message=f"message {i}")
+            for i in range(HISTORY_PAGE_SIZE * 2 + 7)
+        ])
+        self.url = reverse('chats:chat-history', kwargs={'chat_slug': self.chat.slug})
+
+    def test_pages_backwards_through_history(self):
+        self.client.force_login(self.author)
+        newest_first = list(
+            Message.objects.filter(chat=self.chat)
+            .order_by('-created_at', '-pkid')
+            .values_list('message', flat=True)
+        )
+
+        # Warms the cached session and auth snapshot
+        self.client.get(self.url)
+
+        seen, cursor = [], ''
+        while True:
+            with self.assertNumQueries(2):  # chat, one page
+                response = self.client.get(self.url, {'cursor': cursor})
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            seen += [message['message'] for message in data['messages']]
+            if not data['has_more']:
+                break
+            cursor = data['cursor']
+
+        self.assertEqual(seen, newest_first)
+        self.assertEqual(len(seen), HISTORY_PAGE_SIZE * 2 + 7)
+
+    def test_page_size(self):
+        page = load_history(self.chat, per_page=3)
+        self.assertEqual(len(page['messages']), 3)
+        self.assertTrue(page['has_more'])
+        self.assertEqual(page['messages'][0]['sender'], 'author')
+
+    def test_invalid_cursor(self):
+        self.client.force_login(self.author)
+        response = self.client.get(self.url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_outsider_is_forbidden(self):
+        outsider = User._default_manager.create_user(
+            username='outsider', email='outsider@example.com', password='password', is_active=True
+        )
+        self.client.force_login(outsider)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 403)
+
+
+class TestUnreadCounts(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User._default_manager.create_user(
+            username='reader', email='reader@example.com', password='password', is_active=True
+        )
+        self.chats = []
+        for i in range(3):
+            other = User._default_manager.create_user(
+                username=f'friend{i}', email=f'friend{i}@example.com', password='password'
+            )
+            chat = Chat.objects.create(author=other, chat_to_user=self.user)
+            Message.objects.bulk_create([
+                Message(chat=chat, author=other, sent_for=self.user, message=f"hi {j}")
+                for j in range(i + 1)
+            ] + [Message(chat=chat, author=self.user, sent_for=other, message="mine")])
+            self.chats.append(chat)
+        self.url = reverse('chats:user-chats')
+
+    def test_counts_are_recounted_once_then_cached(self):
+        with self.assertNumQueries(1):
+            counts = get_unread_counts(self.user, [chat.pkid for chat in self.chats])
+        self.assertEqual(counts, {chat.pkid: i + 1 for i, chat in enumerate(self.chats)})
+
+        with self.assertNumQueries(0):
+            get_unread_counts(self.user, [chat.pkid for chat in self.chats])
+
+    def test_inbox_query_count_does_not_grow_with_chats(self):
+        self.client.force_login(self.user)
+        # user and its two permission sets for the auth snapshot, chats and unread counts
+        with self.assertNumQueries(5):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.context['unread_counts'],
+            {chat.id: i + 1 for i, chat in enumerate(self.chats)}
+        )
+        self.assertEqual(response.context['chats'][0].last_message, "mine")
+
+        # Session, user and unread counts are all cached
+        with self.assertNumQueries(1):
+            self.client.get(self.url)
+
+    def test_counters_follow_send_and_read(self):
+        chat = self.chats[0]
+        get_unread_counts(self.user, [chat.pkid])
+        Message.objects.bulk_create([Message(chat=chat, author=chat.author, sent_for=self.user, message="new")])
+        increment_unread(self.user.pkid, chat.pkid)
+        self.assertEqual(get_unread_counts(self.user, [chat.pkid]), {chat.pkid: 2})
+
+        self.client.force_login(self.user)
+        self.client.get(reverse('chats:chat-detail', kwargs={'chat_slug': chat.slug}))
+        self.assertEqual(get_unread_counts(self.user, [chat.pkid]), {chat.pkid: 0})
+        cache.clear()
+        self.assertEqual(get_unread_counts(self.user, [chat.pkid]), {chat.pkid: 0})
+
+    def test_reading_keeps_messages_not_written_yet(self):
+        chat = self.chats[1]
+        get_unread_counts(self.user, [chat.pkid])
+        # Sent and counted, still waiting in the write buffer
+        increment_unread(self.user.pkid, chat.pkid)
+
+        self.client.force_login(self.user)
+        self.client.get(reverse('chats:chat-detail', kwargs={'chat_slug': chat.slug}))
+        self.assertEqual(get_unread_counts(self.user, [chat.pkid]), {chat.pkid: 1})
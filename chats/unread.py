@@ -0,0 +1,85 @@
+"""
+Per-user unread message counters.
+
+Counts are cached per (user, chat) so the inbox doesn't recount messages on
+every render. ChatConsumer increments the receiver's counter when it sends a
+message, marking messages read decrements it by the rows updated; a missing counter is
+recomputed from the database with one conditional Count for all such chats.
+"""
+from typing import Dict, Iterable
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .models import Chat, STATUS
+
+UNREAD_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Messages are saved as SENT and only become READ when their chat is opened
+UNREAD_STATUSES = (STATUS.SENT, STATUS.UNREAD)
+
+
+def unread_cache_key(user_pkid, chat_pkid) -> str:
+    return f'chats:unread:{user_pkid}:{chat_pkid}'
+
+
+def unread_messages_filter(user, prefix: str = '') -> Q:
+    """Active messages of someone else that the user hasn't read yet."""
+    return (
+        Q(**{f'{prefix}status__in': UNREAD_STATUSES, f'{prefix}is_active': True}) &
+        ~Q(**{f'{prefix}author': user})
+    )
+
+
+def get_unread_counts(user, chat_ids: Iterable[int]) -> Dict[int, int]:
+    """Unread counts keyed by chat pkid, at most one query for the counters missing from the cache."""
+    chat_ids = list(chat_ids)
+    keys = {unread_cache_key(user.pkid, chat_id): chat_id for chat_id in chat_ids}
+    cached = cache.get_many(keys)
+    counts = {keys[key]: value for key, value in cached.items()}
+
+    missing = [chat_id for chat_id in chat_ids if chat_id not in counts]
+    if missing:
+        recounted = dict(
+            Chat.objects
+            .filter(pkid__in=missing)
+            .values('pkid')
+            .annotate(unread_count=Count('messages', filter=unread_messages_filter(user, 'messages__')))
+            .values_list('pkid', 'unread_count')
+        )
+        cache.set_many(
+            {unread_cache_key(user.pkid, chat_id): count for chat_id, count in recounted.items()},
+            UNREAD_CACHE_TIMEOUT
+        )
+        counts.update(recounted)
+    return counts
+
+
+def increment_unread(user_pkid, chat_pkid, delta: int = 1) -> None:
+    """Bump a cached counter, a counter that isn't cached is recounted on the next read."""
+    try:
+        cache.incr(unread_cache_key(user_pkid, chat_pkid), delta)
+    except ValueError:
+        pass
+
+
+async def aincrement_unread(user_pkid, chat_pkid, delta: int = 1) -> None:
+    try:
+        await cache.aincr(unread_cache_key(user_pkid, chat_pkid), delta)
+    except ValueError:
+        pass
+
+
+def decrement_unread(user_pkid, chat_pkid, delta: int) -> None:
+    """
+        Take the messages just marked read off a cached counter. Not reset to
+        0: messages sent meanwhile, still in the write buffer, stay unread.
+    """
+    if not delta:
+        return
+    key = unread_cache_key(user_pkid, chat_pkid)
+    try:
+        if cache.decr(key, delta) < 0:
+            cache.delete(key)
+    except ValueError:
+        pass
@@ -15,6 +15,8 @@ urlpatterns = [
                                                     name='user-chats'),
     path('chat/<slug:chat_slug>/detail',    views.ChatDetailView.as_view(),
                                                     name='chat-detail'),
+    path('chat/<slug:chat_slug>/history',   views.ChatHistoryView.as_view(),
+                                                    name='chat-history'),
     path('chats/delete/<slug:chat_slug>/',  views.ChatDeleteView.as_view(),
                                                     name='chat-delete'),
     path('chat/create/<uuid:chat_to_user_id>',   views.ChatCreateView.as_view(),    
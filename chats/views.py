@@ -3,21 +3,24 @@ from typing import Dict, Any, Optional, Tuple
 
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.db import transaction
-from django.db.models import Q, QuerySet, Count
+from django.db.models import Q, QuerySet, Count, OuterRef, Subquery
 from django.urls import reverse
 from django.shortcuts import redirect, get_object_or_404
-from django.http import HttpRequest, HttpResponse, Http404
+from django.http import HttpRequest, HttpResponse, Http404, JsonResponse
 from django.contrib.auth import get_user_model
 from django.contrib import messages
-from django.views.generic import ListView, DetailView, CreateView, DeleteView, UpdateView, edit
+from django.views.generic import ListView, DetailView, CreateView, DeleteView, UpdateView, View, edit
 from rest_framework.reverse import reverse_lazy
 
 from . import mixins
 from .forms import MessageCreateUpdateForm
+from .history import history_paginator, load_history
+from .unread import decrement_unread, get_unread_counts, unread_messages_filter
 from .models import Chat, Message, STATUS
 from .mixins import (GetChatObjectMixin,
                      ChatAccessPermissionRequiredMixin)
 from common import mixins as common_mixins
+from common.pagination import InvalidCursor
 
 
 logger = logging.getLogger(__name__)
@@ -36,27 +39,34 @@ class ChatListView(LoginRequiredMixin, ListView):
     def get_queryset(self) -> QuerySet:
         """
         Get the list of chats for the current user with optimized queries.
+        The last message is joined in with a subquery instead of prefetching every message.
         """
         current_user = self.request.user
-        queryset = (
+        last_message = (
+            Message.active_messages
+            .filter(chat=OuterRef('pk'))
+            .order_by('-created_at', '-pkid')
+        )
+        return (
             self.model.active_chats
             .filter(Q(author=current_user) | Q(chat_to_user=current_user))
             .select_related('author', 'chat_to_user')
-            .prefetch_related('messages')
+            .annotate(
+                last_message=Subquery(last_message.values('message')[:1]),
+                last_message_at=Subquery(last_message.values('created_at')[:1]),
+            )
             .order_by('-updated_at')
         )
-        logger.debug("Fetched %d chats for user %s", queryset.count(), current_user.username)
-        return queryset
     
     def get_context_data(self, **kwargs) -> Dict[str, Any]:
         """Add unread messages count to the context."""
         context = super().get_context_data(**kwargs)
-        context['unread_counts'] = {
-            chat.id: chat.messages.filter(status=STATUS.UNREAD, author__isnull=False)
-                                 .exclude(author=self.request.user)
-                                 .count()
-            for chat in context['chats']
-        }
+        chats = context['chats']
+        unread_counts = get_unread_counts(self.request.user, [chat.pkid for chat in chats])
+        for chat in chats:
+            chat.unread_count = unread_counts.get(chat.pkid, 0)
+
+        context['unread_counts'] = {chat.id: chat.unread_count for chat in chats}
         return context
     
     
@@ -81,7 +91,6 @@ class ChatDetailView(LoginRequiredMixin,
         return (
             super().get_queryset()
             .select_related('author', 'chat_to_user')
-            .prefetch_related('messages__author')
         )
 
     def get_context_data(self, **kwargs) -> Dict[str, Any]:
@@ -94,16 +103,11 @@ class ChatDetailView(LoginRequiredMixin,
         
         # Mark messages as read in a single query
         if chat:
-            unread_messages = chat.messages.filter(
-                status=STATUS.UNREAD,
-                author__isnull=False
-            ).exclude(author=current_user)
-            
-            if unread_messages.exists():
-                unread_messages.update(status=STATUS.READ)
+            read = chat.messages.filter(unread_messages_filter(current_user)).update(status=STATUS.READ)
+            decrement_unread(current_user.pkid, chat.pkid, read)
         
-        # Get messages with optimized query
-        messages = chat.messages.select_related('author').order_by('-created_at')
+        # Newest page of the history, older pages are loaded by cursor
+        history = history_paginator(chat, self.paginate_by).page()
         
         # Determine the other user in the chat
         receiver = chat.chat_to_user if current_user == chat.author else chat.author
@@ -111,8 +115,9 @@ class ChatDetailView(LoginRequiredMixin,
 
         context.update({
             "receiver": receiver,
-            "initial_messages": messages[:self.paginate_by],
-            "has_more": messages.count() > self.paginate_by,
+            "initial_messages": history.object_list,
+            "has_more": history.has_next(),
+            "history_cursor": history.next_cursor,
             "form": MessageCreateUpdateForm(),
             "user": current_user,
             "chat_slug": chat.slug
@@ -121,6 +126,28 @@ class ChatDetailView(LoginRequiredMixin,
         return context
         
 
+class ChatHistoryView(LoginRequiredMixin, GetChatObjectMixin, View):
+    """
+    JSON page of a chat's history, newest first.
+    Pass the returned `cursor` back as `?cursor=` to get the next, older page.
+    """
+    slug_field = 'chat_slug'
+
+    def get(self, request: HttpRequest, *args, **kwargs) -> JsonResponse:
+        chat = self.get_object()
+        if chat is None:
+            return JsonResponse({'error': 'Chat does not exist!'}, status=404)
+
+        if request.user.pk not in (chat.author_id, chat.chat_to_user_id):
+            return JsonResponse({'error': 'Access forbidden'}, status=403)
+
+        try:
+            history = load_history(chat, request.GET.get('cursor') or None)
+        except InvalidCursor:
+            return JsonResponse({'error': 'Invalid cursor'}, status=400)
+        return JsonResponse(history)
+
+
 class ChatCreateView(LoginRequiredMixin,
                      common_mixins.HandleNotFoundObjectMixin,
                      common_mixins.InvalidFormMixin,
@@ -0,0 +1,24 @@
+# Generated by Django 5.0.4 on 2026-10-18 03:47
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("comments", "0010_comment_renditions"),
+        ("posts", "0015_live_partial_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["post", "-created_at"],
+                name="comment_live_post_idx",
+            ),
+        ),
+    ]
@@ -5,11 +5,11 @@ from django.urls import reverse
 from django.utils.translation import gettext_lazy as _
 from autoslug import AutoSlugField
 
-from common.models import TimeStampedUUIDModel
+from common.models import ImageRenditionsModel, TimeStampedUUIDModel
 from .managers import ActiveCommentsManager
 
 
-class Comment(TimeStampedUUIDModel):
+class Comment(TimeStampedUUIDModel, ImageRenditionsModel):
     objects = models.Manager()
     active_comments = ActiveCommentsManager()
     
@@ -74,6 +74,14 @@ class Comment(TimeStampedUUIDModel):
         verbose_name = _("Comments")
         verbose_name_plural = _("Comments")
         ordering = ['-created_at']
+        indexes = [
+            # The active comments of a post, newest first
+            models.Index(
+                fields=['post', '-created_at'],
+                condition=models.Q(is_active=True),
+                name='comment_live_post_idx'
+            ),
+        ]
         
     def __str__(self):
         return self.slug
@@ -1,5 +1,5 @@
 from typing import Any, Dict
-from django.db import models
+from django.db import models, transaction
 from django.db.models import QuerySet
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
@@ -14,6 +14,7 @@ from .utils import get_comments
 from users.permissions import PermissionEnum
 from common import mixins as common_mixins
 from posts.mixins import GetPostObjectMixin
+from posts.utils import update_post_counters
 
 
 class CommentCreateView(LoginRequiredMixin,
@@ -35,7 +36,12 @@ class CommentCreateView(LoginRequiredMixin,
 
     def form_valid(self, form):
         """Handle valid form submission and add success message."""
-        response = super().form_valid(form)
+        post = self.get_object()
+        form.instance.post = post
+        form.instance.author = self.request.user
+        with transaction.atomic():
+            response = super().form_valid(form)
+            update_post_counters(post.pkid, comment_count=1)
         messages.success(self.request, 'Your comment has been added!')
         return response
 
@@ -101,7 +107,9 @@ class CommentDeleteView(LoginRequiredMixin,
 
     def form_valid(self, form):
         """Handle valid form submission and add success message."""
-        response = super().form_valid(form)
+        with transaction.atomic():
+            response = super().form_valid(form)
+            update_post_counters(self.object.post_id, comment_count=-1)
         messages.success(self.request, 'Your comment has been deleted!')
         return response
 
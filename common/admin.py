@@ -1,3 +1,36 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import ArchivedRow, OutboxEmail
+
+
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = (
+                    'pkid',
+                    'subject',
+                    'status',
+                    'attempts',
+                    'next_attempt_at',
+                    'created_at',
+                    'sent_at'
+                )
+    list_filter = ("status",)
+    search_fields = ['pkid', 'subject']
+    readonly_fields = ('attempts', 'last_error', 'created_at', 'sent_at')
+
+
+admin.site.register(OutboxEmail, OutboxEmailAdmin)
+
+
+class ArchivedRowAdmin(admin.ModelAdmin):
+    list_display = (
+                    'pkid',
+                    'model_label',
+                    'object_pk',
+                    'deleted_at',
+                    'archived_at'
+                )
+    list_filter = ("model_label",)
+    search_fields = ['model_label', 'object_pk']
+
+
+admin.site.register(ArchivedRow, ArchivedRowAdmin)
@@ -0,0 +1,74 @@
+"""
+Hard deletion of soft-deleted rows.
+
+TimeStampedUUIDModel.delete() only clears is_active, so the dead rows of
+SOFT_DELETED_MODELS stay in their tables: out of the partial indexes, but
+still in the table scans, backups and VACUUM work. purge() removes the rows
+inactive since before a cutoff, a batch per transaction, through Django's
+deletion so cascades and delete signals run as usual. With archive=True
+every deleted row, cascaded ones included, is first copied to ArchivedRow.
+
+deleted_at has auto_now, any save after the soft delete refreshes it, so
+the retention counts from the last write to the row.
+"""
+import logging
+from collections import Counter
+from itertools import chain
+
+from django.apps import apps
+from django.core import serializers
+from django.db import transaction
+from django.db.models.deletion import Collector
+
+from .models import ArchivedRow
+
+logger = logging.getLogger(__name__)
+
+# Children first, so purging a parent has less left to cascade to
+SOFT_DELETED_MODELS = [
+    'chats.Message',
+    'likes.Reaction',
+    'comments.Comment',
+    'chats.Chat',
+    'posts.Post',
+]
+
+
+def expired(model, cutoff):
+    return model._default_manager.filter(is_active=False, deleted_at__lt=cutoff)
+
+
+def archive_and_delete(queryset) -> dict:
+    collector = Collector(using=queryset.db, origin=queryset)
+    collector.collect(queryset)
+
+    instances = chain(
+        chain.from_iterable(collector.data.values()),
+        chain.from_iterable(collector.fast_deletes),
+    )
+    ArchivedRow.objects.bulk_create([
+        ArchivedRow(
+            model_label=instance._meta.label,
+            object_pk=str(instance.pk),
+            data=serializers.serialize('python', [instance])[0]['fields'],
+            deleted_at=getattr(instance, 'deleted_at', None),
+        )
+        for instance in instances
+    ], batch_size=1000)
+    return collector.delete()[1]
+
+
+def purge(model_label: str, cutoff, batch_size: int = 1000, archive: bool = False) -> Counter:
+    """Delete the rows of model_label soft-deleted before cutoff. Returns the deleted rows per model."""
+    model = apps.get_model(model_label)
+    deleted = Counter()
+    while True:
+        with transaction.atomic():
+            pks = list(expired(model, cutoff).order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not pks:
+                break
+            batch = model._default_manager.filter(pk__in=pks)
+            counts = archive_and_delete(batch) if archive else batch.delete()[1]
+        deleted.update(counts)
+        logger.info(f"Purged {len(pks)} soft-deleted {model_label} row(s)")
+    return deleted
@@ -0,0 +1,239 @@
+"""
+As-you-type lookup of users and tags.
+
+A source is a model and the text fields it is matched on, a query matches
+rows where any of those fields (or any word of them) starts with it:
+
+    users   Profile.username, first_name, last_name
+    tags    Tags.title
+
+The backend is picked by database vendor:
+
+    TrigramAutocompleteBackend  ILIKE prefix and pg_trgm word similarity, served by
+                                the GIN trigram indexes of common migration 0002
+    PrefixAutocompleteBackend   per-process sorted list of (term, pk), binary searched,
+                                loaded on first use and kept current by common.signals
+
+Results are cached per source and query, under a version bumped whenever a
+row of the source changes.
+"""
+import hashlib
+import logging
+import threading
+from bisect import bisect_left, insort
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Tuple
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.postgres.lookups import TrigramWordSimilar
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.db.models import F, Lookup, Q, Value
+from django.db.models.functions import Greatest
+from django.utils.module_loading import import_string
+
+from .cache import get_cache_versions
+
+logger = logging.getLogger(__name__)
+
+
+class Source(NamedTuple):
+    model_label: str
+    fields: Tuple[str, ...]
+
+    @property
+    def model(self):
+        return apps.get_model(self.model_label)
+
+    def queryset(self):
+        return self.model._default_manager.filter(is_active=True)
+
+
+SOURCES = {
+    'users': Source('users.Profile', ('username', 'first_name', 'last_name')),
+    'tags': Source('posts.Tags', ('title',)),
+}
+
+BACKENDS = {
+    'postgresql': 'common.autocomplete.TrigramAutocompleteBackend',
+    'sqlite': 'common.autocomplete.PrefixAutocompleteBackend',
+}
+
+
+def normalize(text: str) -> str:
+    return ' '.join(text.casefold().split())
+
+
+def source_version_key(name: str) -> str:
+    return f'autocomplete:{name}:version'
+
+
+class ILike(Lookup):
+    """lhs ILIKE rhs, a 'prefix%' pattern is served by a gin_trgm_ops index (UPPER() LIKE isn't)."""
+    lookup_name = 'ilike'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} ILIKE {rhs}', [*lhs_params, *rhs_params]
+
+
+class TrigramAutocompleteBackend:
+    """
+        Prefix (ILIKE 'q%') or fuzzy (word_similarity) matches, ranked by
+        word similarity. Both conditions are served by the trigram indexes.
+    """
+
+    def complete(self, source: Source, query: str, limit: int) -> List[dict]:
+        pattern = Value(f'{connection.ops.prep_for_like_query(query)}%')
+        match = Q()
+        for field in source.fields:
+            match |= Q(ILike(F(field), pattern)) | Q(TrigramWordSimilar(F(field), Value(query)))
+
+        similarities = [TrigramWordSimilarity(query, field) for field in source.fields]
+        similarity = Greatest(*similarities) if len(similarities) > 1 else similarities[0]
+        return list(
+            source.queryset()
+            .filter(match)
+            .annotate(similarity=similarity)
+            .order_by('-similarity', source.fields[0])
+            .values('pk', *source.fields)[:limit]
+        )
+
+    def update(self, source: Source, instance) -> None:
+        """The trigram indexes are maintained by the database."""
+
+    def remove(self, source: Source, pk) -> None:
+        pass
+
+
+class PrefixIndex:
+    """
+        Terms of every row in one sorted list of (term, pk), so the rows
+        matching a prefix are a contiguous run found by binary search.
+        Rows are replaced one at a time as they are saved.
+    """
+
+    def __init__(self, source: Source):
+        self.source = source
+        self.entries: List[Tuple[str, int]] = []
+        self.rows: Dict[int, dict] = {}
+        self.terms: Dict[int, List[str]] = {}
+        self.loaded = False
+        self.lock = threading.Lock()
+
+    def row_terms(self, row: dict) -> List[str]:
+        terms = set()
+        for field in self.source.fields:
+            value = normalize(row.get(field) or '')
+            if value:
+                terms.add(value)
+                terms.update(value.split())
+        return sorted(terms)
+
+    def _remove(self, pk) -> None:
+        for term in self.terms.pop(pk, ()):
+            index = bisect_left(self.entries, (term, pk))
+            del self.entries[index]
+        self.rows.pop(pk, None)
+
+    def _add(self, row: dict) -> None:
+        pk = row['pk']
+        self._remove(pk)
+        self.rows[pk] = row
+        self.terms[pk] = self.row_terms(row)
+        for term in self.terms[pk]:
+            insort(self.entries, (term, pk))
+
+    def load(self) -> None:
+        with self.lock:
+            if self.loaded:
+                return
+            rows = list(self.source.queryset().values('pk', *self.source.fields))
+            entries = []
+            for row in rows:
+                self.rows[row['pk']] = row
+                self.terms[row['pk']] = self.row_terms(row)
+                entries.extend((term, row['pk']) for term in self.terms[row['pk']])
+            self.entries = sorted(entries)
+            self.loaded = True
+            logger.info(f"Autocomplete index of {self.source.model_label} loaded with {len(rows)} rows")
+
+    def update(self, row: dict) -> None:
+        with self.lock:
+            if self.loaded:
+                self._add(row)
+
+    def remove(self, pk) -> None:
+        with self.lock:
+            if self.loaded:
+                self._remove(pk)
+
+    def search(self, prefix: str, limit: int) -> List[dict]:
+        self.load()
+        results, seen = [], set()
+        with self.lock:
+            index = bisect_left(self.entries, (prefix,))
+            while index < len(self.entries) and len(results) < limit:
+                term, pk = self.entries[index]
+                if not term.startswith(prefix):
+                    break
+                if pk not in seen:
+                    seen.add(pk)
+                    results.append(self.rows[pk])
+                index += 1
+        return results
+
+
+class PrefixAutocompleteBackend:
+    """In-memory prefix indexes, for development on SQLite."""
+
+    def __init__(self):
+        self.indexes = {source.model_label: PrefixIndex(source) for source in SOURCES.values()}
+
+    def index_for(self, source: Source) -> PrefixIndex:
+        return self.indexes[source.model_label]
+
+    def complete(self, source, query, limit):
+        return self.index_for(source).search(normalize(query), limit)
+
+    def update(self, source, instance):
+        if not instance.is_active:
+            self.remove(source, instance.pk)
+            return
+        row = {'pk': instance.pk, **{field: getattr(instance, field) for field in source.fields}}
+        self.index_for(source).update(row)
+
+    def remove(self, source, pk):
+        self.index_for(source).remove(pk)
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    try:
+        return import_string(BACKENDS[connection.vendor])()
+    except KeyError:
+        raise ImproperlyConfigured(f"Autocomplete has no backend for the {connection.vendor} database")
+
+
+def autocomplete(name: str, query: str, limit: int = None) -> List[dict]:
+    """Rows of source `name` matching query, as dicts of pk and the source fields."""
+    source = SOURCES[name]
+    query = normalize(query)[:settings.AUTOCOMPLETE_MAX_LENGTH]
+    limit = limit or settings.AUTOCOMPLETE_LIMIT
+    if len(query) < settings.AUTOCOMPLETE_MIN_LENGTH:
+        return []
+
+    version_key = source_version_key(name)
+    version = get_cache_versions([version_key])[version_key]
+    digest = hashlib.md5(query.encode()).hexdigest()
+    cache_key = f'autocomplete:{name}:{version}:{limit}:{digest}'
+
+    results = cache.get(cache_key)
+    if results is None:
+        results = get_backend().complete(source, query, limit)
+        cache.set(cache_key, results, settings.AUTOCOMPLETE_CACHE_TIMEOUT)
+    return results
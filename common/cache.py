@@ -0,0 +1,29 @@
+import time
+from typing import Dict, Iterable
+
+from django.core.cache import cache
+
+
+def _new_version() -> int:
+    # Seeded from the clock so a version key evicted from the cache
+    # never restarts at a number that old cached pages were stored under
+    return time.time_ns()
+
+
+def get_cache_versions(keys: Iterable[str]) -> Dict[str, int]:
+    """Fetch the current version of every key in one round trip, creating missing ones."""
+    keys = list(keys)
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _new_version(), timeout=None)
+            versions[key] = cache.get(key)
+    return versions
+
+
+def bump_cache_version(key: str) -> None:
+    """Invalidate everything cached under the current version of key."""
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _new_version(), timeout=None)
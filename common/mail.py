@@ -0,0 +1,179 @@
+"""
+Outbox for outgoing email.
+
+With EMAIL_BACKEND = 'common.mail.OutboxBackend' sending a message (allauth's
+confirmation and password reset mails, send_verification_email, mail_admins)
+only inserts an OutboxEmail row, inside the request's transaction, so a
+rolled back signup sends nothing and no request waits on SMTP.
+
+The send_outbox worker claims due rows in batches, builds the messages and
+sends them through one connection of OUTBOX_DELIVERY_BACKEND kept open for
+the whole run, at most OUTBOX_RATE_PER_MINUTE of them. A failed message is
+retried after an exponential backoff and given up after OUTBOX_MAX_ATTEMPTS.
+Claimed rows are leased for OUTBOX_CLAIM_TIMEOUT seconds, so several
+workers can run and the rows of a crashed one are picked up again.
+"""
+import logging
+import time
+from datetime import timedelta
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxBackend(BaseEmailBackend):
+
+    def send_messages(self, email_messages):
+        queued, direct = [], []
+        for message in email_messages:
+            (direct if message.attachments else queued).append(message)
+
+        OutboxEmail.objects.bulk_create([
+            OutboxEmail(
+                subject=message.subject,
+                body=message.body,
+                from_email=message.from_email or '',
+                to=list(message.to),
+                cc=list(message.cc),
+                bcc=list(message.bcc),
+                reply_to=list(message.reply_to),
+                headers=dict(message.extra_headers),
+                alternatives=[list(alternative) for alternative in getattr(message, 'alternatives', [])],
+            )
+            for message in queued
+        ])
+
+        sent = len(queued)
+        if direct:
+            # Attachments aren't stored in the outbox, these go out right away
+            logger.warning(f"Sending {len(direct)} email(s) with attachments without the outbox")
+            delivery = get_connection(settings.OUTBOX_DELIVERY_BACKEND, fail_silently=self.fail_silently)
+            sent += delivery.send_messages(direct) or 0
+        return sent
+
+
+def to_message(email: OutboxEmail) -> EmailMultiAlternatives:
+    return EmailMultiAlternatives(
+        subject=email.subject,
+        body=email.body,
+        from_email=email.from_email or None,
+        to=email.to,
+        cc=email.cc,
+        bcc=email.bcc,
+        reply_to=email.reply_to,
+        headers=email.headers,
+        alternatives=[tuple(alternative) for alternative in email.alternatives],
+    )
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Backoff after the attempts-th failure: base, 2 * base, 4 * base... up to the max."""
+    seconds = settings.OUTBOX_RETRY_BASE_SECONDS * 2 ** (attempts - 1)
+    return timedelta(seconds=min(seconds, settings.OUTBOX_RETRY_MAX_SECONDS))
+
+
+class RateLimiter:
+    """Spaces calls of wait() at least 60 / per_minute seconds apart, no limit when per_minute is 0."""
+
+    def __init__(self, per_minute: int):
+        self.interval = 60 / per_minute if per_minute else 0
+        self.next_at = 0.0
+
+    def wait(self):
+        now = time.monotonic()
+        if now < self.next_at:
+            time.sleep(self.next_at - now)
+            now = self.next_at
+        self.next_at = now + self.interval
+
+
+class DeliveryResult(NamedTuple):
+    sent: int
+    retried: int
+    failed: int
+
+
+def claim_batch(batch_size: int) -> list:
+    """Lease the next due rows to this worker."""
+    now = timezone.now()
+    with transaction.atomic():
+        due = (
+            OutboxEmail.objects
+            .filter(status=OutboxEmail.Status.PENDING, next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'pkid')
+        )
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        batch = list(due[:batch_size])
+        OutboxEmail.objects.filter(pkid__in=[email.pkid for email in batch]).update(
+            next_attempt_at=now + timedelta(seconds=settings.OUTBOX_CLAIM_TIMEOUT)
+        )
+    return batch
+
+
+def reconnect(smtp):
+    """A failed send may have dropped the connection, the next one starts on a fresh one."""
+    try:
+        smtp.close()
+        smtp.open()
+    except Exception as error:
+        # send_messages() opens it again itself
+        logger.warning(f"Reconnecting to the mail server failed: {error}")
+
+
+def deliver_batch(batch, smtp, limiter: RateLimiter) -> DeliveryResult:
+    sent = retried = failed = 0
+    for email in batch:
+        limiter.wait()
+        email.attempts += 1
+        try:
+            smtp.send_messages([to_message(email)])
+        except Exception as error:
+            email.last_error = f"{type(error).__name__}: {error}"
+            reconnect(smtp)
+            if email.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+                email.status = OutboxEmail.Status.FAILED
+                failed += 1
+                logger.error(f"Giving up on email {email.pkid} after {email.attempts} attempts: {email.last_error}")
+            else:
+                email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+                retried += 1
+                logger.warning(f"Email {email.pkid} failed, retry at {email.next_attempt_at}: {email.last_error}")
+        else:
+            email.status = OutboxEmail.Status.SENT
+            email.sent_at = timezone.now()
+            email.last_error = ''
+            sent += 1
+
+    OutboxEmail.objects.bulk_update(
+        batch, ['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at']
+    )
+    return DeliveryResult(sent, retried, failed)
+
+
+def process_outbox(batch_size: int = None, rate_per_minute: int = None) -> DeliveryResult:
+    """Deliver every due message, through one connection. Returns the counts of the run."""
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    limiter = RateLimiter(settings.OUTBOX_RATE_PER_MINUTE if rate_per_minute is None else rate_per_minute)
+    totals = DeliveryResult(0, 0, 0)
+
+    smtp = None
+    try:
+        while batch := claim_batch(batch_size):
+            if smtp is None:
+                smtp = get_connection(settings.OUTBOX_DELIVERY_BACKEND, fail_silently=False)
+                smtp.open()
+            result = deliver_batch(batch, smtp, limiter)
+            totals = DeliveryResult(*(total + count for total, count in zip(totals, result)))
+    finally:
+        if smtp is not None:
+            smtp.close()
+    return totals
@@ -0,0 +1,134 @@
+import heapq
+import logging
+import time
+import traceback
+from collections import Counter
+from contextlib import ExitStack
+from typing import List, Tuple
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+class QueryRecorder:
+    """
+        connection.execute_wrapper hook recording the statements of one request.
+
+        Statements are grouped by their SQL with placeholders, so the same
+        query repeated with different parameters (the N+1 signature) is
+        counted as duplicates. When a statement reaches duplicate_threshold
+        the first application frame that ran it is captured.
+    """
+
+    def __init__(self, slow_ms: float, duplicate_threshold: int, slowest_count: int):
+        self.slow_ms = slow_ms
+        self.duplicate_threshold = duplicate_threshold
+        self.slowest_count = slowest_count
+        self.count = 0
+        self.total_ms = 0.0
+        self.statements = Counter()
+        self.duplicate_origins = {}
+        self.slowest: List[Tuple[float, int, str]] = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = (time.perf_counter() - start) * 1000
+            self.record(sql, duration)
+
+    def record(self, sql: str, duration: float) -> None:
+        self.count += 1
+        self.total_ms += duration
+        self.statements[sql] += 1
+
+        # The counter keeps the heap entries unique, so SQL strings are never compared
+        entry = (duration, self.count, sql)
+        if len(self.slowest) < self.slowest_count:
+            heapq.heappush(self.slowest, entry)
+        else:
+            heapq.heappushpop(self.slowest, entry)
+
+        if self.statements[sql] == self.duplicate_threshold:
+            self.duplicate_origins[sql] = application_frame()
+
+        if duration >= self.slow_ms:
+            logger.warning(f"Slow query {duration:.1f}ms at {application_frame()}: {sql}")
+
+    @property
+    def duplicates(self) -> dict:
+        return {sql: count for sql, count in self.statements.items() if count >= self.duplicate_threshold}
+
+    def server_timing(self, total_ms: float) -> str:
+        return f'db;desc="{self.count} queries";dur={self.total_ms:.2f}, app;dur={total_ms:.2f}'
+
+
+def application_frame() -> str:
+    """The innermost stack frame in the project's own code, outside site-packages and this module."""
+    base_dir = str(settings.BASE_DIR)
+    for frame in reversed(traceback.extract_stack()[:-1]):
+        if (frame.filename.startswith(base_dir)
+                and 'site-packages' not in frame.filename
+                and frame.filename != __file__):
+            return f"{frame.filename[len(base_dir) + 1:]}:{frame.lineno} in {frame.name}"
+    return 'unknown'
+
+
+class QueryInstrumentationMiddleware:
+    """
+        Records query count, DB time and the slowest statements of every
+        request, returns them in a Server-Timing header and logs a
+        logfmt line per request. Statements repeated QUERY_DUPLICATE_THRESHOLD
+        times are logged with the code that ran them.
+    """
+
+    def __init__(self, get_response):
+        if not settings.QUERY_INSTRUMENTATION:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder(
+            slow_ms=settings.QUERY_SLOW_MS,
+            duplicate_threshold=settings.QUERY_DUPLICATE_THRESHOLD,
+            slowest_count=settings.QUERY_SLOWEST_COUNT,
+        )
+
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - start) * 1000
+
+        response['Server-Timing'] = recorder.server_timing(total_ms)
+        self.log(request, response, recorder, total_ms)
+        return response
+
+    def log(self, request, response, recorder: QueryRecorder, total_ms: float) -> None:
+        duplicates = recorder.duplicates
+        logger.info(
+            f"method={request.method} path={request.path} status={response.status_code} "
+            f"queries={recorder.count} db_ms={recorder.total_ms:.2f} duration_ms={total_ms:.2f} "
+            f"duplicates={len(duplicates)}",
+            extra={
+                'path': request.path,
+                'status_code': response.status_code,
+                'queries': recorder.count,
+                'db_ms': round(recorder.total_ms, 2),
+                'duration_ms': round(total_ms, 2),
+            }
+        )
+
+        for duration, _, sql in sorted(recorder.slowest, reverse=True):
+            logger.debug(f"path={request.path} slowest_ms={duration:.2f} sql={sql}")
+
+        for sql, count in duplicates.items():
+            logger.warning(
+                f"Possible N+1 on {request.path}: {count} identical queries from "
+                f"{recorder.duplicate_origins.get(sql, 'unknown')}: {sql}"
+            )
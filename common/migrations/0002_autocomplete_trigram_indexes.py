@@ -0,0 +1,40 @@
+from django.db import migrations
+
+# Trigram indexes of common.autocomplete, PostgreSQL only: the SQLite
+# backend keeps its index in memory
+TRIGRAM_INDEXES = {
+    "users_profile_username_trgm": ("users_profile", "username"),
+    "users_profile_first_name_trgm": ("users_profile", "first_name"),
+    "users_profile_last_name_trgm": ("users_profile", "last_name"),
+    "posts_tags_title_trgm": ("posts_tags", "title"),
+}
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, (table, column) in TRIGRAM_INDEXES.items():
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin ({column} gin_trgm_ops)"
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name in TRIGRAM_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("common", "0001_initial"),
+        ("posts", "0012_post_search"),
+        ("users", "0005_profile_renditions"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
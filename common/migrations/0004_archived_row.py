@@ -0,0 +1,45 @@
+# Generated by Django 5.0.4 on 2026-10-18 03:47
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("common", "0003_outbox"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchivedRow",
+            fields=[
+                (
+                    "pkid",
+                    models.BigAutoField(
+                        editable=False, primary_key=True, serialize=False
+                    ),
+                ),
+                ("model_label", models.CharField(max_length=100)),
+                ("object_pk", models.CharField(max_length=64)),
+                (
+                    "data",
+                    models.JSONField(
+                        encoder=django.core.serializers.json.DjangoJSONEncoder
+                    ),
+                ),
+                ("deleted_at", models.DateTimeField(blank=True, null=True)),
+                ("archived_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "verbose_name": "Archived row",
+                "verbose_name_plural": "Archived rows",
+                "indexes": [
+                    models.Index(
+                        fields=["model_label", "object_pk"],
+                        name="common_arch_model_l_ce5b46_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -1,11 +1,16 @@
+import hashlib
 import logging
 
+from django.conf import settings
+from django.core.cache import cache
 from django.http import HttpResponse
 # Auth
 from django.contrib import messages
 from django.shortcuts import redirect
 from django.urls import reverse_lazy
 
+from .cache import get_cache_versions
+
 logger = logging.getLogger(__name__)
 
 
@@ -32,3 +37,71 @@ class HandleNotFoundObjectMixin:
         if self.object is None:
             return redirect(reverse_lazy("exceptions:404_not_found"))
         return super().dispatch(request, *args, **kwargs)
+
+
+class AnonymousPageCacheMixin:
+    """
+        Serve the rendered page from the cache for anonymous GET requests.
+        A cache hit returns before dispatch, so it doesn't touch the ORM at all.
+
+        Pages are keyed on the path, the cache_query_params of the query
+        string (other parameters can't multiply the entries) and the
+        versions of get_cache_version_keys(); signal handlers bump those
+        versions to invalidate. A page that rendered a CSRF token isn't
+        cached: the token belongs to one visitor, and a cache hit doesn't set
+        the cookie it must match.
+    """
+    cache_key_prefix = 'page'
+    cache_version_keys = ()
+    # Query parameters the view reads (pagination, filters), the others are ignored
+    cache_query_params = ()
+
+    def get_cache_version_keys(self):
+        return list(self.cache_version_keys)
+
+    def get_cache_timeout(self) -> int:
+        return settings.PAGE_CACHE_TIMEOUT
+
+    def get_page_cache_key(self) -> str:
+        versions = get_cache_versions(self.get_cache_version_keys())
+        params = sorted(
+            (name, value)
+            for name in set(self.cache_query_params)
+            for value in self.request.GET.getlist(name)
+        )
+        raw = f"{self.request.path}|{params}|{sorted(versions.items())}"
+        digest = hashlib.md5(raw.encode()).hexdigest()
+        return f"{self.cache_key_prefix}:{digest}"
+
+    def can_cache_page(self, request) -> bool:
+        # Pending flash messages are rendered into the page and belong to one visitor
+        return (request.method == 'GET'
+                and not request.user.is_authenticated
+                and not len(messages.get_messages(request)))
+
+    def dispatch(self, request, *args, **kwargs):
+        if not self.can_cache_page(request):
+            return super().dispatch(request, *args, **kwargs)
+
+        key = self.get_page_cache_key()
+        response = cache.get(key)
+        if response is not None:
+            logger.debug(f"Page cache hit: {request.get_full_path()}")
+            return response
+
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code == 200 and not response.streaming:
+            timeout = self.get_cache_timeout()
+
+            def store(rendered):
+                # Set by get_token(), i.e. {% csrf_token %} (CSRF_COOKIE_USED before Django 4.1)
+                if request.META.get('CSRF_COOKIE_NEEDS_UPDATE'):
+                    logger.debug(f"Page with a CSRF token not cached: {request.path}")
+                    return
+                cache.set(key, rendered, timeout)
+
+            if hasattr(response, 'render') and not response.is_rendered:
+                response.add_post_render_callback(store)
+            else:
+                store(response)
+        return response
@@ -1,7 +1,8 @@
 import uuid
-from datetime import timezone
 
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.utils import timezone
 
 
 class TimeStampedUUIDModel(models.Model):
@@ -29,7 +30,7 @@ class TimeStampedUUIDModel(models.Model):
         # Update the is_active flag
         self.is_active = False
         self.deleted_at = timezone.now()
-        self.save(using=using, update_fields=['is_active', 'updated_at'])
+        self.save(using=using, update_fields=['is_active', 'deleted_at', 'updated_at'])
 
         # Call any post-save signals if needed
         models.signals.pre_delete.send(
@@ -38,3 +39,117 @@ class TimeStampedUUIDModel(models.Model):
             using=using,
             soft_delete=True  # Custom flag to indicate soft delete
         )
+
+
+class ImageRenditionsModel(models.Model):
+    """
+    Resized copies of an uploaded image, generated off the request thread by
+    common.renditions. `renditions` maps a size name to its storage path and
+    keeps the name of the source file they were made from under "source".
+    """
+    rendition_field = 'image'
+
+    renditions = models.JSONField(default=dict, blank=True, editable=False)
+
+    class Meta:
+        abstract = True
+
+    def rendition_url(self, size):
+        """URL of the rendition, the original upload until it has been generated."""
+        image = getattr(self, self.rendition_field)
+        path = self.renditions.get(size) if self.renditions.get('source') == image.name else None
+        try:
+            return image.storage.url(path) if path else image.url
+        except ValueError:
+            return ''
+
+    @property
+    def thumbnailURL(self):
+        return self.rendition_url('thumbnail')
+
+    @property
+    def feedURL(self):
+        return self.rendition_url('feed')
+
+    @property
+    def fullURL(self):
+        return self.rendition_url('full')
+
+
+class MediaBlob(models.Model):
+    """A file of common.storage.ContentAddressedStorage and how many fields reference it."""
+    pkid = models.BigAutoField(primary_key=True, editable=False)
+    path = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField(default=0)
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Media blob"
+        verbose_name_plural = "Media blobs"
+
+    def __str__(self):
+        return f"{self.path} ({self.ref_count} references)"
+
+
+class OutboxEmail(models.Model):
+    """A message queued by common.mail.OutboxBackend, delivered by the send_outbox worker."""
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        SENT = 'sent', 'Sent'
+        FAILED = 'failed', 'Failed'
+
+    pkid = models.BigAutoField(primary_key=True, editable=False)
+    subject = models.TextField(blank=True)
+    body = models.TextField(blank=True)
+    from_email = models.CharField(max_length=254, blank=True)
+    to = models.JSONField(default=list)
+    cc = models.JSONField(default=list, blank=True)
+    bcc = models.JSONField(default=list, blank=True)
+    reply_to = models.JSONField(default=list, blank=True)
+    headers = models.JSONField(default=dict, blank=True)
+    # [content, mimetype] pairs, the HTML part of allauth's mails
+    alternatives = models.JSONField(default=list, blank=True)
+    status = models.CharField(max_length=10, choices=Status, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # When a worker may (re)try it: backoff after a failure, lease while claimed
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Outbox email"
+        verbose_name_plural = "Outbox emails"
+        indexes = [
+            # The worker's only lookup, sent and failed rows stay out of it
+            models.Index(
+                fields=['next_attempt_at'],
+                condition=models.Q(status='pending'),
+                name='outbox_due_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} to {', '.join(self.to)} ({self.status})"
+
+
+class ArchivedRow(models.Model):
+    """A row hard-deleted by purge_soft_deleted --archive, serialized with its fields."""
+    pkid = models.BigAutoField(primary_key=True, editable=False)
+    model_label = models.CharField(max_length=100)
+    object_pk = models.CharField(max_length=64)
+    data = models.JSONField(encoder=DjangoJSONEncoder)
+    deleted_at = models.DateTimeField(null=True, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Archived row"
+        verbose_name_plural = "Archived rows"
+        indexes = [
+            models.Index(fields=['model_label', 'object_pk']),
+        ]
+
+    def __str__(self):
+        return f"{self.model_label} {self.object_pk}"
@@ -0,0 +1,156 @@
+import base64
+import json
+from typing import Any, Iterable, List, Optional
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q, QuerySet
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor can't be decoded for the paginator ordering."""
+
+
+class CursorPage:
+    """A single page of a CursorPaginator, mirroring the parts of Django's Page the templates use."""
+
+    def __init__(self,
+                 object_list: List[Any],
+                 next_cursor: Optional[str] = None,
+                 previous_cursor: Optional[str] = None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f"<CursorPage of {len(self.object_list)} items>"
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    def has_previous(self) -> bool:
+        return self.previous_cursor is not None
+
+    def has_other_pages(self) -> bool:
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """
+        Keyset (cursor) paginator.
+
+        Pages are addressed by an opaque cursor holding the ordering values of
+        the boundary row instead of an OFFSET, and no total count is computed,
+        so every page costs the same index range scan no matter how deep it is.
+        The ordering must be unique, so it has to end with the primary key.
+    """
+
+    def __init__(self,
+                 queryset: QuerySet,
+                 per_page: int,
+                 ordering: Iterable[str] = ('-created_at', '-pkid')):
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        self.fields = [(field.lstrip('-'), field.startswith('-')) for field in self.ordering]
+
+        # Rows with a NULL ordering value can't be compared against a cursor
+        not_null = {
+            f"{name}__isnull": False
+            for name, _ in self.fields
+            if getattr(self._model_field(queryset.model, name), 'null', False)
+        }
+        self.queryset = queryset.filter(**not_null) if not_null else queryset
+
+    @staticmethod
+    def _model_field(model, name):
+        try:
+            return model._meta.get_field(name)
+        except FieldDoesNotExist:
+            # Annotations are ordered on as they are
+            return None
+
+    def _value(self, obj, name):
+        return obj[name] if isinstance(obj, dict) else getattr(obj, name)
+
+    def encode_cursor(self, obj) -> str:
+        """Encode the ordering values of a row (model instance or values() dict)."""
+        values = [self._value(obj, name) for name, _ in self.fields]
+        # default=str keeps full datetime precision, DjangoJSONEncoder drops microseconds
+        raw = json.dumps(values, default=str, separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor: str) -> List[Any]:
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        except (ValueError, TypeError) as e:
+            raise InvalidCursor(f"Malformed cursor: {cursor!r}") from e
+
+        if not isinstance(values, list) or len(values) != len(self.fields):
+            raise InvalidCursor(f"Cursor does not match ordering {self.ordering}")
+
+        decoded = []
+        for (name, _), value in zip(self.fields, values):
+            field = self._model_field(self.queryset.model, name)
+            try:
+                decoded.append(field.to_python(value) if field is not None else value)
+            except ValidationError as e:
+                raise InvalidCursor(f"Invalid cursor value for {name}") from e
+        return decoded
+
+    def _seek(self, values: List[Any], forward: bool) -> Q:
+        """
+            Lexicographic row comparison (a, b) < (x, y), spelled out as
+            a < x OR (a = x AND b < y) so it works on every backend.
+        """
+        condition = Q()
+        for index, (name, descending) in enumerate(self.fields):
+            lookup = 'lt' if descending == forward else 'gt'
+            clause = Q(**{f"{name}__{lookup}": values[index]})
+            for (prev_name, _), prev_value in zip(self.fields[:index], values[:index]):
+                clause &= Q(**{prev_name: prev_value})
+            condition |= clause
+        return condition
+
+    def _reversed_ordering(self) -> List[str]:
+        return [name if descending else f"-{name}" for name, descending in self.fields]
+
+    def page(self, after: Optional[str] = None, before: Optional[str] = None) -> CursorPage:
+        """
+            Return the page following the `after` cursor, the page preceding
+            the `before` cursor, or the first page when neither is given.
+        """
+        if before:
+            queryset = (self.queryset
+                        .filter(self._seek(self.decode_cursor(before), forward=False))
+                        .order_by(*self._reversed_ordering()))
+            rows = list(queryset[:self.per_page + 1])
+            has_more = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+
+            return CursorPage(
+                rows,
+                next_cursor=self.encode_cursor(rows[-1]) if rows else None,
+                previous_cursor=self.encode_cursor(rows[0]) if has_more else None,
+            )
+
+        queryset = self.queryset.order_by(*self.ordering)
+        if after:
+            queryset = queryset.filter(self._seek(self.decode_cursor(after), forward=True))
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        return CursorPage(
+            rows,
+            next_cursor=self.encode_cursor(rows[-1]) if has_more else None,
+            previous_cursor=self.encode_cursor(rows[0]) if after and rows else None,
+        )
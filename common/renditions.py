@@ -0,0 +1,135 @@
+"""
+Resized renditions of uploaded images.
+
+Saving a model based on ImageRenditionsModel with a new upload schedules
+generate_renditions once the transaction commits. It runs on the backend named
+by IMAGE_RENDITION_BACKEND: a thread pool by default, or inline with
+ImmediateBackend. Every size in IMAGE_RENDITION_SIZES is written as
+IMAGE_RENDITION_FORMAT without the EXIF block of the upload, and the paths
+are stored in the model's `renditions` field.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+from io import BytesIO
+from typing import Dict
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.signals import setting_changed
+from django.db import connection, transaction
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = {'WEBP': 'webp', 'JPEG': 'jpg'}
+
+
+class ImmediateBackend:
+    """Runs the task in the calling thread, for tests and management commands."""
+
+    def submit(self, func, *args) -> None:
+        func(*args)
+
+
+class ThreadPoolBackend:
+    """Runs the task on a small per-process thread pool, off the request thread."""
+
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_RENDITION_WORKERS,
+            thread_name_prefix='renditions'
+        )
+
+    def submit(self, func, *args) -> None:
+        self.executor.submit(self.run, func, *args)
+
+    @staticmethod
+    def run(func, *args) -> None:
+        try:
+            func(*args)
+        except Exception as e:
+            logger.error(f"Rendition task {func.__name__}{args} failed: {e}", exc_info=True)
+        finally:
+            # Worker threads outlive requests, don't leave their connection open
+            connection.close()
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    return import_string(settings.IMAGE_RENDITION_BACKEND)()
+
+
+@receiver(setting_changed)
+def reset_backend(setting, **kwargs):
+    if setting == 'IMAGE_RENDITION_BACKEND':
+        get_backend.cache_clear()
+
+
+def needs_renditions(instance) -> bool:
+    """True when the instance has an upload, other than the field default, without renditions."""
+    image = getattr(instance, instance.rendition_field)
+    default = instance._meta.get_field(instance.rendition_field).default
+    return bool(image.name) and image.name != default and instance.renditions.get('source') != image.name
+
+
+def schedule_renditions(instance) -> None:
+    transaction.on_commit(
+        partial(get_backend().submit, generate_renditions, instance._meta.label, instance.pk)
+    )
+
+
+def render(source: Image.Image, size: int, image_format: str) -> ContentFile:
+    """Fit the image into a size x size box (never upscaled) and encode it without metadata."""
+    image = source.copy()
+    image.thumbnail((size, size), Image.Resampling.LANCZOS)
+
+    has_alpha = image.mode in ('RGBA', 'LA') or 'transparency' in image.info
+    mode = 'RGBA' if has_alpha and image_format == 'WEBP' else 'RGB'
+    if image.mode != mode:
+        image = image.convert(mode)
+
+    buffer = BytesIO()
+    # No exif= argument, so nothing from the upload's EXIF block is written
+    image.save(buffer, image_format, quality=settings.IMAGE_RENDITION_QUALITY)
+    return ContentFile(buffer.getvalue())
+
+
+def generate_renditions(model_label: str, pk) -> Dict[str, str]:
+    """Write every rendition of the instance's image and store their paths on it."""
+    model = apps.get_model(model_label)
+    instance = model._default_manager.filter(pk=pk).first()
+    if instance is None or not needs_renditions(instance):
+        return {}
+
+    image = getattr(instance, model.rendition_field)
+    storage = image.storage
+    image_format = settings.IMAGE_RENDITION_FORMAT
+    base_path = f"renditions/{model._meta.app_label}/{model._meta.model_name}/{instance.pk}"
+
+    with image.open('rb'):
+        source = ImageOps.exif_transpose(Image.open(image))
+        source.load()
+
+    # Release the renditions of the previous upload before writing the new ones
+    for name, path in instance.renditions.items():
+        if name != 'source' and path:
+            storage.delete(path)
+
+    renditions = {'source': image.name}
+    for name, size in settings.IMAGE_RENDITION_SIZES.items():
+        path = f"{base_path}/{name}.{EXTENSIONS[image_format]}"
+        renditions[name] = storage.save(path, render(source, size, image_format))
+
+    # Skip the write if the image was replaced meanwhile, its own task will run
+    updated = (
+        model._default_manager
+        .filter(pk=pk, **{model.rendition_field: image.name})
+        .update(renditions=renditions)
+    )
+    if updated:
+        logger.info(f"Generated {len(renditions) - 1} renditions for {model_label} {pk}")
+    return renditions
@@ -0,0 +1,110 @@
+from django.db import models, transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import autocomplete
+from .cache import bump_cache_version
+from .models import ImageRenditionsModel
+from .renditions import needs_renditions, schedule_renditions
+from .slugs import invalidate_slug
+from .storage import release
+
+
+@receiver(post_save)
+def schedule_image_renditions(sender, instance, update_fields=None, **kwargs):
+    """Generate renditions of a new upload on any model based on ImageRenditionsModel."""
+    if not isinstance(instance, ImageRenditionsModel):
+        return
+    if update_fields is not None and instance.rendition_field not in update_fields:
+        return
+    if needs_renditions(instance):
+        schedule_renditions(instance)
+
+
+def autocomplete_source(sender):
+    return next(
+        (name, source) for name, source in autocomplete.SOURCES.items()
+        if source.model_label == sender._meta.label
+    )
+
+
+@receiver(post_save, sender='users.Profile')
+@receiver(post_save, sender='posts.Tags')
+def update_autocomplete(sender, instance, update_fields=None, **kwargs):
+    """Refresh the row in the autocomplete index once committed, unless none of its fields changed."""
+    name, source = autocomplete_source(sender)
+    if update_fields is not None and not {*source.fields, 'is_active'} & set(update_fields):
+        return
+
+    def update():
+        autocomplete.get_backend().update(source, instance)
+        bump_cache_version(autocomplete.source_version_key(name))
+    transaction.on_commit(update)
+
+
+@receiver(post_delete, sender='users.Profile')
+@receiver(post_delete, sender='posts.Tags')
+def remove_from_autocomplete(sender, instance, **kwargs):
+    name, source = autocomplete_source(sender)
+    pk = instance.pk
+
+    def remove():
+        autocomplete.get_backend().remove(source, pk)
+        bump_cache_version(autocomplete.source_version_key(name))
+    transaction.on_commit(remove)
+
+
+@receiver(post_save, sender='posts.Post')
+@receiver(post_delete, sender='posts.Post')
+@receiver(post_save, sender='chats.Chat')
+@receiver(post_delete, sender='chats.Chat')
+def invalidate_slug_ref(sender, instance, **kwargs):
+    """The cached SlugRef (common.slugs) of a saved or deleted post or chat."""
+    if instance.slug:
+        invalidate_slug(sender, instance.slug)
+
+
+def file_fields(model):
+    return [field for field in model._meta.concrete_fields if isinstance(field, models.FileField)]
+
+
+@receiver(pre_save)
+def remember_stored_files(sender, instance, raw=False, update_fields=None, **kwargs):
+    """The file names of the row before the save, compared by release_replaced_files."""
+    fields = [
+        field for field in file_fields(sender)
+        if update_fields is None or field.name in update_fields
+    ]
+    if raw or not fields or instance._state.adding:
+        return
+    instance._stored_files = (
+        sender._base_manager
+        .using(instance._state.db)
+        .filter(pk=instance.pk)
+        .values(*(field.attname for field in fields))
+        .first()
+    ) or {}
+
+
+@receiver(post_save)
+def release_replaced_files(sender, instance, **kwargs):
+    stored = instance.__dict__.pop('_stored_files', None)
+    if not stored:
+        return
+    for field in file_fields(sender):
+        name = stored.get(field.attname)
+        if name and name != getattr(instance, field.attname).name:
+            release(field.storage, name)
+
+
+@receiver(post_delete)
+def release_deleted_files(sender, instance, **kwargs):
+    """A hard-deleted row (purge, cascade) releases its files and their renditions."""
+    for field in file_fields(sender):
+        file = getattr(instance, field.attname)
+        if file.name:
+            release(field.storage, file.name)
+            if isinstance(instance, ImageRenditionsModel) and field.name == instance.rendition_field:
+                for size, path in instance.renditions.items():
+                    if size != 'source' and path:
+                        release(field.storage, path)
@@ -0,0 +1,81 @@
+"""
+Slug to object resolution for post and chat URLs.
+
+A request resolves the slug of its URL several times over:
+HandleNotFoundObjectMixin.dispatch, DetailView.get, get_context_data and
+get_success_url all call get_object(). resolve_slug() keeps every object it
+loads in an identity map on the request, so a slug is loaded once per
+request whatever the number of callers.
+
+Across requests the shared cache holds the slug's SlugRef: its pkid, author
+and is_active. An unknown or soft-deleted slug returns None without a
+query, a known one is loaded by primary key. common.signals drops the
+entry when a post or chat is saved or deleted. A renamed object leaves its
+old slug pointing to its pkid; the load checks the slug as well and drops
+such stale entries.
+"""
+import logging
+from typing import NamedTuple, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# Cached for slugs without a row, so repeated 404s don't query either
+NOT_FOUND = ()
+
+
+class SlugRef(NamedTuple):
+    pkid: int
+    author_id: int
+    is_active: bool
+
+
+def slug_cache_key(model, slug: str) -> str:
+    return f"slug:{model._meta.label_lower}:{slug}"
+
+
+def invalidate_slug(model, slug: str) -> None:
+    cache.delete(slug_cache_key(model, slug))
+
+
+def get_slug_ref(model, slug: str) -> Optional[SlugRef]:
+    key = slug_cache_key(model, slug)
+    ref = cache.get(key)
+    if ref is None:
+        row = (
+            model._default_manager
+            .filter(slug=slug)
+            .values_list('pkid', 'author_id', 'is_active')
+            .first()
+        )
+        ref = SlugRef(*row) if row else NOT_FOUND
+        cache.set(key, ref, settings.SLUG_CACHE_TIMEOUT)
+    return ref or None
+
+
+def resolve_slug(request, queryset, slug: str):
+    """
+        The active object of queryset named slug, None when there is none.
+        Loaded at most once per request, pass request=None outside of one
+        (websocket consumers).
+    """
+    model = queryset.model
+    identity_map = None
+    if request is not None:
+        identity_map = request.__dict__.setdefault('_resolved_slugs', {})
+        if (model, slug) in identity_map:
+            return identity_map[(model, slug)]
+
+    obj = None
+    ref = get_slug_ref(model, slug)
+    if ref is not None and ref.is_active:
+        obj = queryset.filter(pkid=ref.pkid, slug=slug).first()
+        if obj is None:
+            logger.debug(f"Stale slug reference {slug} of {model._meta.label}")
+            invalidate_slug(model, slug)
+
+    if identity_map is not None:
+        identity_map[(model, slug)] = obj
+    return obj
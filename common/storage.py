@@ -0,0 +1,111 @@
+"""
+Content-addressed, deduplicated media storage.
+
+An upload is hashed (SHA-256) while it is streamed to a temporary file and
+then moved to blobs/<aa>/<bb>/<digest><ext>, so the same content uploaded
+twice is stored once whatever upload_to says. Every save adds a reference to
+the blob's MediaBlob row and every delete removes one; the file is deleted
+with its last reference, once the transaction that released it commits.
+Saves and deletes of a blob lock its row, so a save never counts a reference
+to a file a concurrent delete is removing. common.signals releases the
+references of replaced files and hard-deleted rows. Blob names never change
+content, so they are served with immutable cache headers (see
+common.views.serve_media).
+"""
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+
+from .models import MediaBlob
+
+BLOB_DIR = 'blobs'
+TMP_DIR = 'tmp'
+
+
+def is_blob(name: str) -> bool:
+    return bool(name) and name.replace('\\', '/').startswith(f'{BLOB_DIR}/')
+
+
+class ContentAddressedStorage(FileSystemStorage):
+
+    def blob_name(self, digest: str, extension: str) -> str:
+        return f"{BLOB_DIR}/{digest[:2]}/{digest[2:4]}/{digest}{extension}"
+
+    def get_available_name(self, name, max_length=None):
+        # Names are derived from the content in _save, identical content is meant to collide
+        return name
+
+    def _save(self, name, content):
+        extension = os.path.splitext(name)[1].lower()
+        tmp_dir = self.path(TMP_DIR)
+        os.makedirs(tmp_dir, exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with os.fdopen(fd, 'wb') as tmp_file:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    tmp_file.write(chunk)
+                    size += len(chunk)
+
+            blob_name = self.blob_name(digest.hexdigest(), extension)
+            full_path = self.path(blob_name)
+            with transaction.atomic():
+                blob = self.lock_blob(blob_name, size)
+                if os.path.exists(full_path):
+                    os.remove(tmp_path)
+                else:
+                    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                    os.replace(tmp_path, full_path)
+                    if self.file_permissions_mode is not None:
+                        os.chmod(full_path, self.file_permissions_mode)
+                MediaBlob.objects.filter(pkid=blob.pkid).update(ref_count=F('ref_count') + 1)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        return blob_name
+
+    def lock_blob(self, name: str, size: int = 0) -> MediaBlob:
+        """The MediaBlob row of name, created when missing, locked until the end of the transaction."""
+        while True:
+            MediaBlob.objects.get_or_create(path=name, defaults={'size': size})
+            blob = MediaBlob.objects.select_for_update().filter(path=name).first()
+            # None when a concurrent delete_unreferenced removed the new row
+            if blob is not None:
+                return blob
+
+    def add_reference(self, name: str, size: int = 0) -> None:
+        with transaction.atomic():
+            blob = self.lock_blob(name, size)
+            MediaBlob.objects.filter(pkid=blob.pkid).update(ref_count=F('ref_count') + 1)
+
+    def delete(self, name):
+        """Drop one reference, the file goes with the last one. Paths outside blobs/ are deleted as is."""
+        if not is_blob(name):
+            super().delete(name)
+            return
+        MediaBlob.objects.filter(path=name, ref_count__gt=0).update(ref_count=F('ref_count') - 1)
+        # Once committed, a rolled back release keeps its file
+        transaction.on_commit(lambda: self.delete_unreferenced(name))
+
+    def delete_unreferenced(self, name: str) -> None:
+        with transaction.atomic():
+            blob = self.lock_blob(name)
+            if blob.ref_count:
+                return
+            blob.delete()
+            super().delete(name)
+
+
+def release(storage, name: str) -> None:
+    """Drop a field's reference to name, files of other storages and outside blobs/ are left alone."""
+    if isinstance(storage, ContentAddressedStorage) and is_blob(name):
+        storage.delete(name)
@@ -1,3 +1,446 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.files.base import ContentFile
+from django.core import mail
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.mail import EmailMultiAlternatives
+from django.http import HttpResponse
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from chats.models import Chat
+from comments.models import Comment
+from likes.models import Reaction, ReactionKind
+from posts.models import Post, Tags
+from . import autocomplete
+from .mail import process_outbox
+from .middleware import QueryInstrumentationMiddleware
+from .models import ArchivedRow, MediaBlob, OutboxEmail
+from .slugs import get_slug_ref, resolve_slug
+from .storage import ContentAddressedStorage
+from .views import serve_media
+
+User = get_user_model()
+
+
+@override_settings(QUERY_INSTRUMENTATION=True, QUERY_DUPLICATE_THRESHOLD=3, QUERY_SLOW_MS=10_000)
+class TestQueryInstrumentationMiddleware(TestCase):
+    def run_view(self, view):
+        middleware = QueryInstrumentationMiddleware(view)
+        return middleware(RequestFactory().get('/instrumented/'))
+
+    def test_server_timing_header_counts_queries(self):
+        def view(request):
+            User.objects.count()
+            User.objects.exists()
+            return HttpResponse()
+
+        with self.assertLogs('common.middleware', 'INFO') as logs:
+            response = self.run_view(view)
+
+        self.assertIn('db;desc="2 queries"', response['Server-Timing'])
+        self.assertIn('app;dur=', response['Server-Timing'])
+        self.assertIn('queries=2', logs.output[0])
+        self.assertIn('duplicates=0', logs.output[0])
+
+    def test_repeated_statements_are_flagged_with_their_origin(self):
+        def view(request):
+            for pk in range(4):
+                User.objects.filter(pk=pk).first()
+            return HttpResponse()
+
+        with self.assertLogs('common.middleware', 'INFO') as logs:
+            self.run_view(view)
+
+        warnings = [line for line in logs.output if 'Possible N+1' in line]
+        self.assertEqual(len(warnings), 1)
+        self.assertIn('4 identical queries', warnings[0])
+        self.assertIn('common/tests.py', warnings[0])
+
+    @override_settings(QUERY_INSTRUMENTATION=False)
+    def test_disabled_middleware_is_not_used(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            self.run_view(lambda request: HttpResponse())
+
+
+def make_upload(name='photo.jpg', size=(2000, 1500)):
+    image = Image.new('RGB', size, 'red')
+    exif = Image.Exif()
+    exif[0x010F] = 'Camera maker'
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', exif=exif)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+@override_settings(IMAGE_RENDITION_BACKEND='common.renditions.ImmediateBackend', IMAGE_RENDITION_FORMAT='WEBP')
+class TestImageRenditions(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User._default_manager.create_user(
+            username='uploader', email='uploader@example.com', password='password'
+        )
+
+    def upload(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.featured_img = make_upload()
+            self.user.save()
+        self.user.refresh_from_db()
+
+    def test_upload_generates_resized_renditions_without_exif(self):
+        self.upload()
+
+        self.assertEqual(self.user.renditions['source'], self.user.featured_img.name)
+        for name, longest_edge in [('thumbnail', 150), ('feed', 640), ('full', 1080)]:
+            with self.user.featured_img.storage.open(self.user.renditions[name]) as rendition:
+                image = Image.open(rendition)
+                self.assertEqual(image.format, 'WEBP')
+                self.assertEqual(max(image.size), longest_edge)
+                self.assertFalse(image.getexif())
+        self.assertEqual(
+            self.user.thumbnailURL,
+            self.user.featured_img.storage.url(self.user.renditions['thumbnail'])
+        )
+
+    def test_urls_fall_back_to_the_original_until_generated(self):
+        self.user.featured_img = make_upload()
+        self.user.renditions = {}
+        self.assertEqual(self.user.feedURL, self.user.imageURL)
+
+    def test_default_image_is_not_processed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.first_name = 'Changed'
+            self.user.save()
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.renditions, {})
+
+
+class TestContentAddressedStorage(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.storage = ContentAddressedStorage(location=self.media_root)
+
+    def test_identical_uploads_share_one_blob(self):
+        first = self.storage.save('posts/photo.jpg', ContentFile(b'same bytes'))
+        second = self.storage.save('profiles/other-name.JPG', ContentFile(b'same bytes'))
+        other = self.storage.save('posts/photo.jpg', ContentFile(b'other bytes'))
+
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        self.assertTrue(first.startswith('blobs/'))
+        self.assertTrue(first.endswith('.jpg'))
+        self.assertEqual(MediaBlob.objects.get(path=first).ref_count, 2)
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'tmp')), [])
+
+    def test_file_is_deleted_with_its_last_reference(self):
+        name = self.storage.save('photo.jpg', ContentFile(b'bytes'))
+        self.storage.save('photo.jpg', ContentFile(b'bytes'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.storage.delete(name)
+        self.assertTrue(self.storage.exists(name))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.storage.delete(name)
+        self.assertFalse(self.storage.exists(name))
+        self.assertFalse(MediaBlob.objects.filter(path=name).exists())
+
+    def test_saving_again_before_commit_keeps_the_file(self):
+        name = self.storage.save('photo.jpg', ContentFile(b'bytes'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.storage.delete(name)
+            self.storage.save('photo.jpg', ContentFile(b'bytes'))
+        self.assertTrue(self.storage.exists(name))
+        self.assertEqual(MediaBlob.objects.get(path=name).ref_count, 1)
+
+    def test_blobs_are_served_as_immutable(self):
+        name = self.storage.save('photo.jpg', ContentFile(b'bytes'))
+        with override_settings(MEDIA_ROOT=self.media_root):
+            response = serve_media(RequestFactory().get('/media/'), name)
+        self.assertIn('immutable', response['Cache-Control'])
+
+
+@override_settings(IMAGE_RENDITION_BACKEND='common.renditions.ImmediateBackend')
+class TestStoredFileReferences(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User._default_manager.create_user(
+            username='owner', email='owner@example.com', password='password'
+        )
+
+    def upload(self, size):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.featured_img = make_upload(size=size)
+            self.user.save()
+        self.user.refresh_from_db()
+        return self.user.featured_img.name
+
+    def test_replaced_file_is_released(self):
+        first = self.upload((200, 100))
+        second = self.upload((300, 100))
+
+        self.assertNotEqual(first, second)
+        self.assertFalse(MediaBlob.objects.filter(path=first).exists())
+        self.assertFalse(self.user.featured_img.storage.exists(first))
+        self.assertEqual(MediaBlob.objects.get(path=second).ref_count, 1)
+
+    def test_deleted_row_releases_its_file_and_renditions(self):
+        self.upload((200, 100))
+        self.assertTrue(self.user.renditions)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+        self.assertFalse(MediaBlob.objects.exists())
+        files = [name for _, _, names in os.walk(os.path.join(self.media_root, 'blobs')) for name in names]
+        self.assertEqual(files, [])
+
+
+class TestAutocomplete(TestCase):
+    def setUp(self):
+        cache.clear()
+        # A fresh in-memory index, the previous one saw rolled back rows
+        autocomplete.get_backend.cache_clear()
+        self.addCleanup(autocomplete.get_backend.cache_clear)
+        with self.captureOnCommitCallbacks(execute=True):
+            User._default_manager.create_user(
+                username='annabelle', email='anna@example.com', password='testpass123',
+                first_name='Anna', last_name='Smith', is_active=True
+            )
+            User._default_manager.create_user(
+                username='drew', email='drew@example.com', password='testpass123',
+                first_name='Andrew', last_name='Annan', is_active=True
+            )
+            User._default_manager.create_user(
+                username='inactive_ann', email='ann@example.com', password='testpass123', is_active=False
+            )
+            Tags.objects.create(title='Analog photography')
+
+    def usernames(self, query):
+        return [row['username'] for row in autocomplete.autocomplete('users', query)]
+
+    def test_prefix_matches_any_field_once(self):
+        self.assertCountEqual(self.usernames('An'), ['annabelle', 'drew'])
+        self.assertEqual(self.usernames('smi'), ['annabelle'])
+        self.assertEqual(self.usernames('dre'), ['drew'])
+        self.assertEqual(self.usernames('x'), [])
+        self.assertEqual(
+            [row['title'] for row in autocomplete.autocomplete('tags', 'photo')],
+            ['Analog photography']
+        )
+
+    def test_index_is_updated_on_save(self):
+        self.assertEqual(self.usernames('zo'), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            zoe = User._default_manager.create_user(
+                username='zoe', email='zoe@example.com', password='testpass123', is_active=True
+            )
+        self.assertEqual(self.usernames('zo'), ['zoe'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            zoe.username = 'yvonne'
+            zoe.save()
+        self.assertEqual(self.usernames('zo'), [])
+        self.assertEqual(self.usernames('yv'), ['yvonne'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            zoe.is_active = False
+            zoe.save(update_fields=['is_active'])
+        self.assertEqual(self.usernames('yv'), [])
+
+    def test_results_are_cached_per_prefix(self):
+        backend = autocomplete.get_backend()
+        with mock.patch.object(backend, 'complete', wraps=backend.complete) as complete:
+            self.usernames('ann')
+            self.usernames('ANN ')
+            self.usernames('anna')
+        self.assertEqual(complete.call_count, 2)
+
+    def test_view(self):
+        url = reverse('common:autocomplete')
+        response = self.client.get(url, {'q': 'smi'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            'users': [{
+                'username': 'annabelle',
+                'name': 'Anna Smith',
+                'url': reverse('users:following-user-profile', args=['annabelle']),
+            }],
+            'tags': [],
+        })
+        self.assertEqual(list(self.client.get(url, {'q': 'ana', 'type': 'tags'}).json()), ['tags'])
+        self.assertEqual(self.client.get(url, {'q': 'a', 'type': 'posts'}).status_code, 400)
+
+
+@override_settings(
+    EMAIL_BACKEND='common.mail.OutboxBackend',
+    OUTBOX_DELIVERY_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    OUTBOX_RATE_PER_MINUTE=0,
+    OUTBOX_MAX_ATTEMPTS=2,
+)
+class TestOutbox(TestCase):
+    def queue(self, subject='Confirm your email'):
+        message = EmailMultiAlternatives(subject, 'Plain body', 'noreply@example.com', ['anna@example.com'])
+        message.attach_alternative('<p>HTML body</p>', 'text/html')
+        message.send()
+
+    def test_sending_only_queues(self):
+        self.queue()
+
+        self.assertEqual(mail.outbox, [])
+        email = OutboxEmail.objects.get()
+        self.assertEqual((email.status, email.to), (OutboxEmail.Status.PENDING, ['anna@example.com']))
+        self.assertEqual(email.alternatives, [['<p>HTML body</p>', 'text/html']])
+
+    def test_worker_delivers_in_batches(self):
+        for i in range(5):
+            self.queue(f"Message {i}")
+
+        result = process_outbox(batch_size=2)
+
+        self.assertEqual(result.sent, 5)
+        self.assertEqual([message.subject for message in mail.outbox], [f"Message {i}" for i in range(5)])
+        self.assertEqual(mail.outbox[0].alternatives, [('<p>HTML body</p>', 'text/html')])
+        self.assertFalse(OutboxEmail.objects.exclude(status=OutboxEmail.Status.SENT).exists())
+        self.assertEqual(process_outbox().sent, 0)
+
+    def test_failures_back_off_then_give_up(self):
+        self.queue()
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages',
+                        side_effect=ConnectionError('refused')):
+            self.assertEqual(process_outbox().retried, 1)
+
+            email = OutboxEmail.objects.get()
+            self.assertEqual((email.status, email.attempts), (OutboxEmail.Status.PENDING, 1))
+            self.assertIn('refused', email.last_error)
+            # Not due again before the backoff ends
+            self.assertEqual(process_outbox(), (0, 0, 0))
+
+            OutboxEmail.objects.update(next_attempt_at=email.created_at)
+            self.assertEqual(process_outbox().failed, 1)
+
+        self.assertEqual(OutboxEmail.objects.get().status, OutboxEmail.Status.FAILED)
+        self.assertEqual(mail.outbox, [])
+
+
+class TestPurgeSoftDeleted(TestCase):
+    def setUp(self):
+        self.user = User._default_manager.create_user(
+            username='purger', email='purger@example.com', password='testpass123', is_active=True
+        )
+        # bulk_create skips Post.save, which expects the view kwargs
+        self.dead, self.recent, self.live = Post.objects.bulk_create([
+            Post(title=title, slug=title, author=self.user) for title in ('dead', 'recent', 'live')
+        ])
+        self.comment = Comment.objects.bulk_create([Comment(title='on-dead', post=self.dead, author=self.user)])[0]
+        self.reaction = Reaction.objects.create(author=self.user, post=self.live, kind=ReactionKind.LIKE)
+
+        long_ago = timezone.now() - timezone.timedelta(days=40)
+        Post.objects.filter(pkid=self.dead.pkid).update(is_active=False, deleted_at=long_ago)
+        Post.objects.filter(pkid=self.recent.pkid).update(is_active=False, deleted_at=timezone.now())
+        Reaction.objects.filter(pkid=self.reaction.pkid).update(is_active=False, deleted_at=long_ago)
+
+    def test_dry_run_deletes_nothing(self):
+        out = StringIO()
+        call_command('purge_soft_deleted', '--days', '30', '--dry-run', stdout=out)
+
+        self.assertIn('posts.Post: 1 row(s) to purge', out.getvalue())
+        self.assertEqual(Post.objects.count(), 3)
+
+    def test_purges_old_rows_in_batches(self):
+        call_command('purge_soft_deleted', '--days', '30', '--batch-size', '1', stdout=StringIO())
+
+        self.assertEqual(set(Post.objects.values_list('title', flat=True)), {'recent', 'live'})
+        # The active comment of the purged post goes with it
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(Reaction.objects.exists())
+        self.assertFalse(ArchivedRow.objects.exists())
+
+    def test_archive_keeps_a_copy_of_every_deleted_row(self):
+        call_command('purge_soft_deleted', '--days', '30', '--archive', stdout=StringIO())
+
+        archived = dict(ArchivedRow.objects.values_list('model_label', 'object_pk'))
+        self.assertEqual(archived['posts.Post'], str(self.dead.pkid))
+        self.assertEqual(archived['comments.Comment'], str(self.comment.pkid))
+        self.assertEqual(archived['likes.Reaction'], str(self.reaction.pkid))
+        self.assertEqual(ArchivedRow.objects.get(model_label='posts.Post').data['title'], 'dead')
+
+
+class TestSlugResolution(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author, self.receiver = [
+            User._default_manager.create_user(
+                username=name, email=f'{name}@example.com', password='testpass123', is_active=True
+            )
+            for name in ('sluga', 'slugb')
+        ]
+        self.chat = Chat.objects.create(author=self.author, chat_to_user=self.receiver)
+        # bulk_create skips Post.save, which expects the view kwargs
+        self.post = Post.objects.bulk_create([Post(title='Resolved', slug='resolved', author=self.author)])[0]
+
+    def test_resolved_once_per_request(self):
+        request = RequestFactory().get('/')
+        with self.assertNumQueries(2):  # the slug reference, the post by pkid
+            post = resolve_slug(request, Post.published, 'resolved')
+        with self.assertNumQueries(0):
+            self.assertIs(resolve_slug(request, Post.published, 'resolved'), post)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(resolve_slug(RequestFactory().get('/'), Post.published, 'resolved'), post)
+
+    def test_unknown_slug_is_cached(self):
+        self.assertIsNone(resolve_slug(None, Post.published, 'missing'))
+        with self.assertNumQueries(0):
+            self.assertIsNone(resolve_slug(None, Post.published, 'missing'))
+
+    def test_signals_invalidate(self):
+        old_slug = self.chat.slug
+        self.assertEqual(get_slug_ref(Chat, old_slug).author_id, self.author.pkid)
+
+        self.author.username = 'renamed'
+        self.author.save()
+        self.chat.save()
+        self.assertIsNone(resolve_slug(None, Chat.active_chats, old_slug))
+        self.assertEqual(resolve_slug(None, Chat.active_chats, self.chat.slug), self.chat)
+
+        self.chat.delete()
+        self.assertFalse(get_slug_ref(Chat, self.chat.slug).is_active)
+        with self.assertNumQueries(0):
+            self.assertIsNone(resolve_slug(None, Chat.active_chats, self.chat.slug))
+
+    def test_post_page_loads_the_post_once(self):
+        self.client.force_login(self.author)
+        url = reverse('posts:post-detail', kwargs={'slug': self.post.slug})
+        self.client.get(url)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, 200)
+        post_queries = [query['sql'] for query in queries.captured_queries
+                        if query['sql'].startswith('SELECT') and 'FROM "posts_post"' in query['sql']]
+        self.assertEqual(len(post_queries), 1)
@@ -0,0 +1,10 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'common'
+
+urlpatterns = [
+    path('autocomplete/', views.AutocompleteView.as_view(),
+                                            name='autocomplete'),
+]
@@ -1,3 +1,62 @@
-from django.shortcuts import render
+from urllib.parse import urlencode
 
-# Create your views here.
+from django.conf import settings
+from django.http import HttpRequest, JsonResponse
+from django.urls import reverse
+from django.views import View
+from django.views.static import serve
+
+from .autocomplete import SOURCES, autocomplete
+from .storage import is_blob
+
+# Blob names are content hashes, a given URL never changes content
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def serve_media(request, path):
+    """Development media server, content-addressed files are marked immutable."""
+    response = serve(request, path, document_root=settings.MEDIA_ROOT)
+    if is_blob(path):
+        response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    return response
+
+
+class AutocompleteView(View):
+    """
+    JSON suggestions for the `q` prefix, of users and tags or only the
+    `type` given, see common.autocomplete.
+    """
+
+    def get(self, request: HttpRequest, *args, **kwargs) -> JsonResponse:
+        names = request.GET.getlist('type') or list(SOURCES)
+        if not set(names) <= set(SOURCES):
+            return JsonResponse({'error': f"type must be one of {', '.join(SOURCES)}"}, status=400)
+
+        query = request.GET.get('q', '')
+        return JsonResponse({
+            name: getattr(self, f'serialize_{name}')(autocomplete(name, query))
+            for name in names
+        })
+
+    @staticmethod
+    def serialize_users(rows):
+        return [
+            {
+                'username': row['username'],
+                'name': ' '.join(filter(None, [row['first_name'], row['last_name']])),
+                'url': reverse('users:following-user-profile', args=[row['username']]),
+            }
+            for row in rows
+        ]
+
+    @staticmethod
+    def serialize_tags(rows):
+        # Tag titles aren't unique, suggest each one once
+        titles = dict.fromkeys(row['title'] for row in rows)
+        return [
+            {
+                'title': title,
+                'url': f"{reverse('posts:posts-list')}?{urlencode({'tags__title': title})}",
+            }
+            for title in titles
+        ]
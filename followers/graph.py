@@ -0,0 +1,259 @@
+"""
+Follow relationships between users.
+
+SocialGraph is the one place follows are written: it keeps the denormalized
+Profile.followers_count and Profile.following_count in step with the
+UserFollowing rows, in the same transaction, and invalidates the cached
+follow state of the follower and the cached auth snapshots of both
+profiles, which hold the counters (see users.backends). The follower's "who to follow" suggestions
+are queued for a refresh (see followers.recommendations). Counters drifted
+by writes made elsewhere (bulk_create, admin) are rebuilt by the
+recount_follow_counters command.
+
+Unfollowing soft-deletes the row (see TimeStampedUUIDModel.delete), only
+active rows count as following, and following again reactivates the row.
+"""
+import logging
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, QuerySet, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from posts import timeline
+from users.backends import invalidate_groups, invalidate_user
+from . import recommendations
+from .models import UserFollowing
+
+logger = logging.getLogger(__name__)
+
+Profile = get_user_model()
+
+
+def follow_cache_key(user_pkid, username: str) -> str:
+    return f'social:follows:{user_pkid}:{username}'
+
+
+class BulkFollowResult(NamedTuple):
+    created: int = 0
+    removed: int = 0
+    # Already (not) following, or the user themselves
+    skipped: int = 0
+    not_found: int = 0
+
+    def __add__(self, other):
+        return BulkFollowResult(*(a + b for a, b in zip(self, other)))
+
+
+class SocialGraph:
+
+    @staticmethod
+    def _invalidate_snapshots(pkids) -> None:
+        # The UPDATEs send no post_save, users.signals doesn't see them
+        pkids = list(pkids)
+        transaction.on_commit(lambda: [invalidate_user(pkid) for pkid in pkids])
+
+    def _update_counters(self, user_pkid, target_pkid, delta: int) -> None:
+        Profile.objects.filter(pkid=user_pkid).update(
+            following_count=Greatest(F('following_count') + delta, 0)
+        )
+        Profile.objects.filter(pkid=target_pkid).update(
+            followers_count=Greatest(F('followers_count') + delta, 0)
+        )
+        self._invalidate_snapshots([user_pkid, target_pkid])
+
+    def follow(self, user, target) -> bool:
+        """Make user follow target, False when already following (or target is user)."""
+        if user.pk == target.pk:
+            return False
+
+        with transaction.atomic():
+            following, created = UserFollowing.objects.select_for_update().get_or_create(
+                user=user,
+                following_user=target
+            )
+            if not created:
+                if following.is_active:
+                    return False
+                following.is_active = True
+                following.save(update_fields=['is_active', 'updated_at'])
+            self._update_counters(user.pkid, target.pkid, 1)
+            recommendations.follows_changed(user.pkid, [target.pkid])
+
+        cache.delete(follow_cache_key(user.pkid, target.username))
+        logger.info(f"User {user.username} started following {target.username}")
+        return True
+
+    def unfollow(self, user, target) -> bool:
+        """Remove the follow of target by user, False when not following."""
+        with transaction.atomic():
+            following = (
+                UserFollowing.objects
+                .select_for_update()
+                .filter(user=user, following_user=target, is_active=True)
+                .first()
+            )
+            if following is None:
+                return False
+            following.delete()
+            self._update_counters(user.pkid, target.pkid, -1)
+            recommendations.follows_changed(user.pkid, [target.pkid])
+
+        cache.delete(follow_cache_key(user.pkid, target.username))
+        logger.info(f"User {user.username} unfollowed {target.username}")
+        return True
+
+    def _resolve(self, user, usernames: List[str]) -> Dict[str, Profile]:
+        """Profiles of usernames in one query, without user themselves."""
+        targets = Profile.objects.only('pkid', 'username').in_bulk(usernames, field_name='username')
+        targets.pop(user.username, None)
+        return targets
+
+    @staticmethod
+    def _chunks(usernames: Iterable[str], chunk_size: int):
+        usernames = list(dict.fromkeys(username for username in usernames if username))
+        for start in range(0, len(usernames), chunk_size):
+            yield usernames[start:start + chunk_size]
+
+    def follow_many(self, user, usernames: Iterable[str], chunk_size: Optional[int] = None) -> BulkFollowResult:
+        """
+            Follow every user of usernames, chunk_size usernames per
+            transaction: one in_bulk lookup, one bulk_create that leaves
+            existing rows to the unique_followers constraint, one reactivation
+            UPDATE and one recount of the touched counters.
+        """
+        result = BulkFollowResult()
+        for chunk in self._chunks(usernames, chunk_size or settings.SOCIAL_GRAPH_BULK_CHUNK_SIZE):
+            result += self._follow_chunk(user, chunk)
+        logger.info(f"User {user.username} bulk followed: {result._asdict()}")
+        return result
+
+    def _follow_chunk(self, user, usernames: List[str]) -> BulkFollowResult:
+        targets = self._resolve(user, usernames)
+        target_pkids = [target.pkid for target in targets.values()]
+        follows = UserFollowing.objects.filter(user=user, following_user_id__in=target_pkids)
+
+        with transaction.atomic():
+            existing = dict(follows.values_list('following_user_id', 'is_active'))
+            UserFollowing.objects.bulk_create(
+                [
+                    UserFollowing(user=user, following_user_id=pkid)
+                    for pkid in target_pkids if pkid not in existing
+                ],
+                ignore_conflicts=True
+            )
+            follows.filter(is_active=False).update(is_active=True, updated_at=timezone.now())
+            followed = set(follows.filter(is_active=True).values_list('following_user_id', flat=True))
+            added = followed - {pkid for pkid, active in existing.items() if active}
+            if added:
+                # Recounted rather than incremented, rows inserted meanwhile by
+                # another request were skipped above and are counted once
+                self.recount(Profile.objects.filter(pkid__in=[user.pkid, *added]))
+                recommendations.follows_changed(user.pkid, added)
+                transaction.on_commit(lambda: timeline.backfill_timeline_many(user.pkid, added))
+
+        cache.delete_many([follow_cache_key(user.pkid, username) for username in targets])
+        return BulkFollowResult(
+            created=len(added),
+            skipped=len(targets) - len(added) + (user.username in usernames),
+            not_found=len(set(usernames) - set(targets) - {user.username}),
+        )
+
+    def unfollow_many(self, user, usernames: Iterable[str], chunk_size: Optional[int] = None) -> BulkFollowResult:
+        """Unfollow every user of usernames, soft-deleting the follows in one UPDATE per chunk."""
+        result = BulkFollowResult()
+        for chunk in self._chunks(usernames, chunk_size or settings.SOCIAL_GRAPH_BULK_CHUNK_SIZE):
+            result += self._unfollow_chunk(user, chunk)
+        logger.info(f"User {user.username} bulk unfollowed: {result._asdict()}")
+        return result
+
+    def _unfollow_chunk(self, user, usernames: List[str]) -> BulkFollowResult:
+        targets = self._resolve(user, usernames)
+        follows = UserFollowing.objects.filter(
+            user=user,
+            following_user_id__in=[target.pkid for target in targets.values()],
+            is_active=True
+        )
+
+        with transaction.atomic():
+            removed = list(follows.select_for_update().values_list('following_user_id', flat=True))
+            if removed:
+                now = timezone.now()
+                UserFollowing.objects.filter(user=user, following_user_id__in=removed).update(
+                    is_active=False, deleted_at=now, updated_at=now
+                )
+                self.recount(Profile.objects.filter(pkid__in=[user.pkid, *removed]))
+                recommendations.follows_changed(user.pkid, removed)
+                # The UPDATE sends no pre_delete, so the timeline is cleaned up here
+                timeline.remove_authors_from_timeline(user.pkid, removed)
+
+        cache.delete_many([follow_cache_key(user.pkid, username) for username in targets])
+        return BulkFollowResult(
+            removed=len(removed),
+            skipped=len(targets) - len(removed) + (user.username in usernames),
+            not_found=len(set(usernames) - set(targets) - {user.username}),
+        )
+
+    def is_following_many(self, user, usernames: Iterable[str]) -> Dict[str, bool]:
+        """
+            Whether user follows each of usernames, in one cache round trip
+            and at most one query for the usernames missing from the cache.
+        """
+        usernames = set(usernames)
+        if not getattr(user, 'is_authenticated', False) or not usernames:
+            return dict.fromkeys(usernames, False)
+
+        keys = {follow_cache_key(user.pkid, username): username for username in usernames}
+        cached = cache.get_many(keys)
+        result = {keys[key]: value for key, value in cached.items()}
+
+        missing = usernames - result.keys()
+        if missing:
+            followed = set(
+                UserFollowing.objects
+                .filter(user=user, is_active=True, following_user__username__in=missing)
+                .values_list('following_user__username', flat=True)
+            )
+            fetched = {username: username in followed for username in missing}
+            cache.set_many(
+                {follow_cache_key(user.pkid, username): value for username, value in fetched.items()},
+                settings.SOCIAL_GRAPH_CACHE_TIMEOUT
+            )
+            result.update(fetched)
+        return result
+
+    def is_following(self, user, username: str) -> bool:
+        return self.is_following_many(user, [username])[username]
+
+    def recount(self, profiles: Optional[QuerySet] = None) -> int:
+        """Rebuild the follow counters of profiles (every user by default) from the active follows."""
+        def active_count(field):
+            counts = (
+                UserFollowing.objects
+                .filter(**{field: OuterRef('pkid')}, is_active=True)
+                .order_by()
+                .values(field)
+                .annotate(total=Count('pkid'))
+                .values('total')
+            )
+            return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+        counters = {
+            'followers_count': active_count('following_user'),
+            'following_count': active_count('user'),
+        }
+        if profiles is None:
+            updated = Profile.objects.update(**counters)
+            transaction.on_commit(invalidate_groups)
+            return updated
+        pkids = list(profiles.values_list('pkid', flat=True))
+        updated = Profile.objects.filter(pkid__in=pkids).update(**counters)
+        self._invalidate_snapshots(pkids)
+        return updated
+
+
+social_graph = SocialGraph()
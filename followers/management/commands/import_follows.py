@@ -0,0 +1,59 @@
+import csv
+import sys
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from followers.graph import BulkFollowResult, social_graph
+
+Profile = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ('Imports follows from a CSV file of "follower,followed" username rows, '
+            'or of followed usernames with --user')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file, "-" reads stdin')
+        parser.add_argument('--user', help='Username of the follower of every row, rows then hold one username')
+        parser.add_argument('--unfollow', action='store_true',
+                            help='Remove the follows instead of creating them')
+        parser.add_argument('--chunk-size', type=int, default=None,
+                            help='Usernames followed per transaction (defaults to SOCIAL_GRAPH_BULK_CHUNK_SIZE)')
+
+    def read_rows(self, path):
+        if path == '-':
+            return list(csv.reader(sys.stdin))
+        with open(path, newline='') as csv_file:
+            return list(csv.reader(csv_file))
+
+    def handle(self, *args, **options):
+        rows = [[cell.strip() for cell in row] for row in self.read_rows(options['path']) if row]
+
+        # Follower username -> followed usernames
+        follows = defaultdict(list)
+        if options['user']:
+            follows[options['user']] = [row[0] for row in rows]
+        else:
+            for line, row in enumerate(rows, start=1):
+                if len(row) < 2:
+                    raise CommandError(f"Line {line} is not a follower,followed pair, pass --user for single usernames")
+                follows[row[0]].append(row[1])
+
+        followers = Profile.objects.in_bulk(list(follows), field_name='username')
+        bulk_action = social_graph.unfollow_many if options['unfollow'] else social_graph.follow_many
+
+        total = BulkFollowResult()
+        for username, usernames in follows.items():
+            follower = followers.get(username)
+            if follower is None:
+                self.stderr.write(self.style.WARNING(f"Unknown follower {username}, {len(usernames)} row(s) skipped"))
+                total += BulkFollowResult(not_found=len(usernames))
+                continue
+            total += bulk_action(follower, usernames, options['chunk_size'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{total.created} follow(s) created, {total.removed} removed, "
+            f"{total.skipped} skipped, {total.not_found} username(s) not found."
+        ))
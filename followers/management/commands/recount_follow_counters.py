@@ -0,0 +1,37 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max, Min
+
+from followers.graph import social_graph
+
+Profile = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the denormalized followers/following counters on profiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of profiles (by pkid range) updated per transaction',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        bounds = Profile.objects.aggregate(low=Min('pkid'), high=Max('pkid'))
+
+        if bounds['low'] is None:
+            self.stdout.write('No profiles to recount.')
+            return
+
+        updated = 0
+        for start in range(bounds['low'], bounds['high'] + 1, batch_size):
+            with transaction.atomic():
+                updated += social_graph.recount(
+                    Profile.objects.filter(pkid__gte=start, pkid__lt=start + batch_size)
+                )
+
+        self.stdout.write(self.style.SUCCESS(f'Recounted follow counters for {updated} profile(s).'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from followers.recommendations import refresh_all_suggestions, refresh_queued_suggestions
+
+
+class Command(BaseCommand):
+    help = ('Recomputes the "who to follow" suggestions of the users queued by follow changes, '
+            'or of every active user with --all')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Recompute every active user')
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Users computed together (defaults to SUGGESTIONS_BATCH_SIZE)')
+
+    def handle(self, *args, **options):
+        if options['all']:
+            refreshed = refresh_all_suggestions(options['batch_size'])
+        else:
+            refreshed = refresh_queued_suggestions(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Refreshed follow suggestions of {refreshed} user(s).'))
@@ -0,0 +1,87 @@
+# Generated by Django 5.0.4 on 2026-10-18 03:18
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("followers", "0003_userfollowing_deleted_at"),
+        ("users", "0006_profile_follow_counters"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SuggestionRefresh",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="+",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                ("queued_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="FollowSuggestion",
+            fields=[
+                (
+                    "pkid",
+                    models.BigAutoField(
+                        editable=False, primary_key=True, serialize=False
+                    ),
+                ),
+                ("score", models.FloatField(verbose_name="Score")),
+                (
+                    "mutual_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Mutual follows"
+                    ),
+                ),
+                (
+                    "engagement_count",
+                    models.PositiveIntegerField(default=0, verbose_name="Recent likes"),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "suggested_user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="suggested_to",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="follow_suggestions",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Follow suggestion",
+                "verbose_name_plural": "Follow suggestions",
+                "indexes": [
+                    models.Index(
+                        fields=["user", "-score"], name="followers_f_user_id_8e7bd3_idx"
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="followsuggestion",
+            constraint=models.UniqueConstraint(
+                fields=("user", "suggested_user"), name="unique_follow_suggestion"
+            ),
+        ),
+    ]
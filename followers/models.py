@@ -1,5 +1,6 @@
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.utils.translation import gettext_lazy as _
 
 from common.models import TimeStampedUUIDModel
 
@@ -39,5 +40,58 @@ class UserFollowing(TimeStampedUUIDModel):
                             and self.following_user == user_to_chat_id:
             return True
         return False
-    
-    
+
+
+class FollowSuggestion(models.Model):
+    """A precomputed "who to follow" candidate, see followers.recommendations."""
+    pkid = models.BigAutoField(primary_key=True, editable=False)
+    user = models.ForeignKey(
+                                User,
+                                related_name='follow_suggestions',
+                                on_delete=models.CASCADE
+                            )
+    suggested_user = models.ForeignKey(
+                                User,
+                                related_name='suggested_to',
+                                on_delete=models.CASCADE
+                            )
+    score = models.FloatField(verbose_name=_('Score'))
+    # Followed users of `user` that follow `suggested_user`
+    mutual_count = models.PositiveIntegerField(verbose_name=_('Mutual follows'), default=0)
+    # Recent likes of `user` on posts of `suggested_user`
+    engagement_count = models.PositiveIntegerField(verbose_name=_('Recent likes'), default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.suggested_user_id} suggested to {self.user_id}"
+
+    class Meta:
+        verbose_name = _("Follow suggestion")
+        verbose_name_plural = _("Follow suggestions")
+        constraints = [
+            models.UniqueConstraint(
+                                    fields=['user', 'suggested_user'],
+                                    name="unique_follow_suggestion"
+                                ),
+        ]
+        indexes = [
+            # Backs the suggestions page, best first
+            models.Index(fields=['user', '-score']),
+        ]
+
+
+class SuggestionRefresh(models.Model):
+    """
+        A user whose follows changed since their suggestions were computed,
+        drained with their followers by refresh_queued_suggestions.
+    """
+    user = models.OneToOneField(
+                                User,
+                                primary_key=True,
+                                related_name='+',
+                                on_delete=models.CASCADE
+                            )
+    queued_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Refresh suggestions of {self.user_id}"
@@ -0,0 +1,167 @@
+"""
+"Who to follow" suggestions.
+
+Candidates for a user are the accounts followed by the accounts they follow
+(friends of friends) and the authors whose posts they liked lately. A
+candidate scores
+
+    mutual_count + SUGGESTIONS_ENGAGEMENT_WEIGHT * engagement_count
+
+where mutual_count is how many of the user's followed accounts follow the
+candidate and engagement_count the user's likes on the candidate's posts in
+the last SUGGESTIONS_ENGAGEMENT_DAYS. The best SUGGESTIONS_TOP_K per user are
+stored in FollowSuggestion, which is all the suggestions page reads.
+
+Users are computed in batches: three queries load the follow graph two hops
+out and the recent likes of the whole batch into adjacency sets, the scoring
+itself is set and Counter arithmetic in memory. A follow change only queues
+the follower in SuggestionRefresh; the refresh_suggestions command
+recomputes the queued users and their followers, whose second hop changed
+with them. Queue rows are deleted only if no follow change re-queued them
+while the refresh ran.
+"""
+import heapq
+import logging
+import operator
+from collections import Counter, defaultdict
+from datetime import timedelta
+from functools import reduce
+from typing import Dict, Iterable, List, Set
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from likes.models import Reaction, ReactionKind
+from .models import FollowSuggestion, SuggestionRefresh, UserFollowing
+
+logger = logging.getLogger(__name__)
+
+Profile = get_user_model()
+
+
+def _adjacency(user_pkids: Iterable[int]) -> Dict[int, Set[int]]:
+    """Active accounts followed by each of user_pkids."""
+    following = defaultdict(set)
+    rows = (
+        UserFollowing.objects
+        .filter(user_id__in=list(user_pkids), is_active=True, following_user__is_active=True)
+        .values_list('user_id', 'following_user_id')
+    )
+    for user_pkid, followed_pkid in rows.iterator():
+        following[user_pkid].add(followed_pkid)
+    return following
+
+
+def _recent_engagement(user_pkids: Iterable[int]) -> Dict[int, Counter]:
+    """Recent likes given by each of user_pkids, counted per post author."""
+    since = timezone.now() - timedelta(days=settings.SUGGESTIONS_ENGAGEMENT_DAYS)
+    engagement = defaultdict(Counter)
+    rows = (
+        Reaction.objects
+        .filter(author_id__in=list(user_pkids), kind=ReactionKind.LIKE, is_active=True,
+                updated_at__gte=since, post__author__is_active=True)
+        .values('author_id', 'post__author_id')
+        .annotate(total=Count('pkid'))
+        .values_list('author_id', 'post__author_id', 'total')
+    )
+    for user_pkid, author_pkid, total in rows.iterator():
+        engagement[user_pkid][author_pkid] = total
+    return engagement
+
+
+def compute_suggestions(user_pkids: List[int]) -> List[FollowSuggestion]:
+    """Top suggestions of every user of the batch, in three queries."""
+    following = _adjacency(user_pkids)
+    second_hop = _adjacency(set().union(*following.values()) - set(following)) if following else {}
+    second_hop.update(following)
+    engagement = _recent_engagement(user_pkids)
+
+    weight = settings.SUGGESTIONS_ENGAGEMENT_WEIGHT
+    suggestions = []
+    for user_pkid in user_pkids:
+        followed = following.get(user_pkid, set())
+        mutual = Counter()
+        for followed_pkid in followed:
+            mutual.update(second_hop.get(followed_pkid, ()))
+        liked = engagement.get(user_pkid, Counter())
+
+        candidates = (mutual.keys() | liked.keys()) - followed - {user_pkid}
+        scored = (
+            (mutual[candidate] + weight * liked[candidate], candidate)
+            for candidate in candidates
+        )
+        for score, candidate in heapq.nlargest(settings.SUGGESTIONS_TOP_K, scored):
+            suggestions.append(FollowSuggestion(
+                user_id=user_pkid,
+                suggested_user_id=candidate,
+                score=score,
+                mutual_count=mutual[candidate],
+                engagement_count=liked[candidate],
+            ))
+    return suggestions
+
+
+def refresh_suggestions(user_pkids: Iterable[int], batch_size: int = None) -> int:
+    """Recompute and replace the suggestions of user_pkids, returns the rows stored."""
+    user_pkids = list(user_pkids)
+    batch_size = batch_size or settings.SUGGESTIONS_BATCH_SIZE
+    stored = 0
+    for start in range(0, len(user_pkids), batch_size):
+        batch = user_pkids[start:start + batch_size]
+        suggestions = compute_suggestions(batch)
+        with transaction.atomic():
+            FollowSuggestion.objects.filter(user_id__in=batch).delete()
+            FollowSuggestion.objects.bulk_create(suggestions)
+        stored += len(suggestions)
+    logger.info(f"Refreshed follow suggestions of {len(user_pkids)} user(s), {stored} stored")
+    return stored
+
+
+def refresh_queued_suggestions(batch_size: int = None) -> int:
+    """Recompute the users queued by follow changes and their followers, returns how many."""
+    batch_size = batch_size or settings.SUGGESTIONS_BATCH_SIZE
+    # Read before computing, a follow meanwhile moves queued_at past these
+    queued = dict(SuggestionRefresh.objects.values_list('user_id', 'queued_at'))
+    if not queued:
+        return 0
+    followers = (
+        UserFollowing.objects
+        .filter(following_user_id__in=list(queued), is_active=True)
+        .values_list('user_id', flat=True)
+    )
+    user_pkids = sorted({*queued, *followers})
+    refresh_suggestions(user_pkids, batch_size)
+
+    rows = list(queued.items())
+    for start in range(0, len(rows), batch_size):
+        SuggestionRefresh.objects.filter(reduce(operator.or_, (
+            Q(user_id=user_pkid, queued_at__lte=queued_at)
+            for user_pkid, queued_at in rows[start:start + batch_size]
+        ))).delete()
+    return len(user_pkids)
+
+
+def refresh_all_suggestions(batch_size: int = None) -> int:
+    user_pkids = list(Profile.objects.filter(is_active=True).order_by('pkid').values_list('pkid', flat=True))
+    refresh_suggestions(user_pkids, batch_size)
+    return len(user_pkids)
+
+
+def follows_changed(user_pkid, target_pkids: Iterable[int]) -> None:
+    """
+        Called by SocialGraph once user_pkid (un)followed target_pkids: the
+        targets leave (or may come back to) the user's suggestions right
+        away, and the user is queued for a refresh, their followers are
+        added when the queue is processed.
+    """
+    FollowSuggestion.objects.filter(user_id=user_pkid, suggested_user_id__in=list(target_pkids)).delete()
+    # An already queued user gets a new queued_at, see refresh_queued_suggestions
+    SuggestionRefresh.objects.bulk_create(
+        [SuggestionRefresh(user_id=user_pkid)],
+        update_conflicts=True,
+        unique_fields=['user'],
+        update_fields=['queued_at'],
+    )
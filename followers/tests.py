@@ -1,3 +1,278 @@
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
 from django.test import TestCase
+from django.urls import reverse
+
+from followers.graph import social_graph
+from followers.models import FollowSuggestion, SuggestionRefresh, UserFollowing
+from followers.recommendations import compute_suggestions, refresh_queued_suggestions, refresh_suggestions
+from likes.models import Reaction, ReactionKind
+from posts.models import Post, TimelineEntry
+
+
+User = get_user_model()
+
+
+class TestSocialGraph(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user, self.alice, self.bob = [
+            User._default_manager.create_user(
+                username=username,
+                email=f'{username}@example.com',
+                password='testpass123',
+                first_name=username,
+                last_name='Tester',
+                is_active=True
+            )
+            for username in ('grapher', 'alice', 'bob')
+        ]
+
+    def assertCounts(self, user, followers, following):
+        user.refresh_from_db()
+        self.assertEqual((user.followers_count, user.following_count), (followers, following))
+
+    def test_follow_and_unfollow_update_counters(self):
+        self.assertTrue(social_graph.follow(self.user, self.alice))
+        self.assertFalse(social_graph.follow(self.user, self.alice))
+        self.assertFalse(social_graph.follow(self.user, self.user))
+        self.assertCounts(self.user, 0, 1)
+        self.assertCounts(self.alice, 1, 0)
+
+        self.assertTrue(social_graph.unfollow(self.user, self.alice))
+        self.assertFalse(social_graph.unfollow(self.user, self.alice))
+        self.assertCounts(self.user, 0, 0)
+        self.assertCounts(self.alice, 0, 0)
+
+        # The soft-deleted row is reactivated
+        self.assertTrue(social_graph.follow(self.user, self.alice))
+        self.assertCounts(self.alice, 1, 0)
+        self.assertEqual(UserFollowing.objects.filter(user=self.user).count(), 1)
+
+    def test_is_following_many_is_cached(self):
+        social_graph.follow(self.user, self.alice)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                social_graph.is_following_many(self.user, ['alice', 'bob', 'nobody']),
+                {'alice': True, 'bob': False, 'nobody': False}
+            )
+        with self.assertNumQueries(0):
+            social_graph.is_following_many(self.user, ['alice', 'bob', 'nobody'])
+
+        social_graph.follow(self.user, self.bob)
+        social_graph.unfollow(self.user, self.alice)
+        self.assertEqual(
+            social_graph.is_following_many(self.user, ['alice', 'bob']),
+            {'alice': False, 'bob': True}
+        )
+
+    def test_recount_follow_counters_command(self):
+        UserFollowing.objects.bulk_create([
+            UserFollowing(user=self.user, following_user=self.alice),
+            UserFollowing(user=self.bob, following_user=self.alice),
+            UserFollowing(user=self.alice, following_user=self.bob, is_active=False),
+        ])
+
+        call_command('recount_follow_counters', stdout=StringIO())
+
+        self.assertCounts(self.alice, 2, 0)
+        self.assertCounts(self.bob, 0, 1)
+        self.assertCounts(self.user, 0, 1)
+
+    def test_profile_page(self):
+        social_graph.follow(self.user, self.alice)
+        social_graph.follow(self.bob, self.alice)
+        self.client.force_login(self.user)
+
+        response = self.client.get(reverse('users:following-user-profile', args=['alice']))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['is_following'])
+        self.assertEqual(response.context['followers_count'], 2)
+        self.assertEqual(response.context['following_count'], 0)
+
+    def test_follow_view(self):
+        self.client.force_login(self.user)
+
+        self.client.get(reverse('users:follow-user', args=['bob']))
+        self.assertCounts(self.bob, 1, 0)
+
+        self.client.get(reverse('users:unfollow-user', args=['bob']))
+        self.assertCounts(self.bob, 0, 0)
+
+
+class TestBulkFollow(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User._default_manager.create_user(
+            username='bulkfollower', email='bulkfollower@example.com', password='testpass123', is_active=True
+        )
+        self.targets = User._default_manager.bulk_create([
+            User(username=f'target{i}', email=f'target{i}@example.com', is_active=True)
+            for i in range(7)
+        ])
+        self.usernames = [target.username for target in self.targets]
+
+    def test_follow_many_in_chunks(self):
+        social_graph.follow(self.user, self.targets[0])
+        social_graph.follow(self.user, self.targets[1])
+        social_graph.unfollow(self.user, self.targets[1])
+
+        # bulk_create skips Post.save, which expects the view kwargs
+        post = Post.objects.bulk_create([Post(title='Bulk', slug='bulk', author=self.targets[5])])[0]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            result = social_graph.follow_many(
+                self.user,
+                [*self.usernames, 'target0', 'missing', self.user.username],
+                chunk_size=3
+            )
+
+        self.assertEqual(result._asdict(), {'created': 6, 'removed': 0, 'skipped': 2, 'not_found': 1})
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.following_count, 7)
+        self.assertEqual(UserFollowing.objects.filter(user=self.user, is_active=True).count(), 7)
+        self.assertTrue(all(social_graph.is_following_many(self.user, self.usernames).values()))
+        self.assertTrue(TimelineEntry.objects.filter(owner=self.user, post=post).exists())
+
+    def test_unfollow_many(self):
+        social_graph.follow_many(self.user, self.usernames[:4])
+        # bulk_create skips Post.save, which expects the view kwargs
+        post = Post.objects.bulk_create([Post(title='Bulk', slug='bulk', author=self.targets[2])])[0]
+        TimelineEntry.objects.create(owner=self.user, post=post)
+
+        result = social_graph.unfollow_many(self.user, self.usernames[2:])
+
+        self.assertEqual(result._asdict(), {'created': 0, 'removed': 2, 'skipped': 3, 'not_found': 0})
+        self.user.refresh_from_db()
+        self.targets[2].refresh_from_db()
+        self.assertEqual(self.user.following_count, 2)
+        self.assertEqual(self.targets[2].followers_count, 0)
+        self.assertFalse(TimelineEntry.objects.filter(owner=self.user).exists())
+
+    def test_bulk_view(self):
+        self.client.force_login(self.user)
+        url = reverse('users:follow-bulk')
+
+        response = self.client.post(url, {'usernames': self.usernames}, content_type='application/json')
+        self.assertEqual(response.json(), {'created': 7, 'removed': 0, 'skipped': 0, 'not_found': 0})
+
+        response = self.client.post(reverse('users:unfollow-bulk'), {'usernames': ['target0', 'nobody']})
+        self.assertEqual(response.json(), {'created': 0, 'removed': 1, 'skipped': 0, 'not_found': 1})
+
+        response = self.client.post(url, {'usernames': 'target1'}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_import_follows_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as csv_file:
+            csv_file.write('bulkfollower,target0\nbulkfollower,target1\ntarget0,target1\nghost,target2\n')
+        self.addCleanup(os.remove, csv_file.name)
+
+        out = StringIO()
+        call_command('import_follows', csv_file.name, stdout=out, stderr=StringIO())
+
+        self.assertIn('3 follow(s) created', out.getvalue())
+        self.targets[1].refresh_from_db()
+        self.assertEqual(self.targets[1].followers_count, 2)
+
+
+class TestFollowSuggestions(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user, self.alice, self.bob, self.carol, self.dave = [
+            User._default_manager.create_user(
+                username=username,
+                email=f'{username}@example.com',
+                password='testpass123',
+                first_name=username,
+                last_name='Tester',
+                is_active=True
+            )
+            for username in ('suggested', 'alice', 'bob', 'carol', 'dave')
+        ]
+        # user -> alice, bob; both follow carol, bob also follows dave
+        UserFollowing.objects.bulk_create([
+            UserFollowing(user=self.user, following_user=self.alice),
+            UserFollowing(user=self.user, following_user=self.bob),
+            UserFollowing(user=self.alice, following_user=self.carol),
+            UserFollowing(user=self.bob, following_user=self.carol),
+            UserFollowing(user=self.bob, following_user=self.dave),
+            UserFollowing(user=self.bob, following_user=self.user),
+        ])
+
+    def suggested(self, user):
+        return list(
+            FollowSuggestion.objects.filter(user=user).order_by('-score')
+            .values_list('suggested_user__username', 'mutual_count', 'engagement_count')
+        )
+
+    def test_friends_of_friends_scored_by_mutuals_and_likes(self):
+        # bulk_create skips Post.save, which expects the view kwargs
+        posts = Post.objects.bulk_create([Post(title=f'Dave {i}', slug=f'dave-{i}', author=self.dave) for i in range(3)])
+        # One reaction per post, so three posts for three likes
+        Reaction.objects.bulk_create([Reaction(author=self.user, post=post, kind=ReactionKind.LIKE) for post in posts])
+
+        with self.assertNumQueries(3):
+            suggestions = compute_suggestions([self.user.pkid, self.alice.pkid])
+
+        self.assertEqual(
+            [(s.user_id, s.suggested_user_id, s.score) for s in suggestions],
+            [(self.user.pkid, self.dave.pkid, 2.5), (self.user.pkid, self.carol.pkid, 2.0)]
+        )
+
+        refresh_suggestions([self.user.pkid])
+        self.assertEqual(self.suggested(self.user), [('dave', 1, 3), ('carol', 2, 0)])
+
+    def test_follow_updates_suggestions(self):
+        erin = User._default_manager.create_user(
+            username='erin', email='erin@example.com', password='testpass123', is_active=True
+        )
+        refresh_suggestions([self.user.pkid, self.bob.pkid])
+        self.assertEqual(self.suggested(self.bob), [('alice', 1, 0)])
+
+        social_graph.follow_many(self.user, ['carol', 'erin'])
+
+        # carol leaves the suggestions at once, only user is queued, bob (their
+        # follower) is added when the queue is processed
+        self.assertEqual(self.suggested(self.user), [('dave', 1, 0)])
+        self.assertEqual(list(SuggestionRefresh.objects.values_list('user_id', flat=True)), [self.user.pkid])
+
+        call_command('refresh_suggestions', stdout=StringIO())
+
+        self.assertFalse(SuggestionRefresh.objects.exists())
+        self.assertCountEqual(self.suggested(self.bob), [('alice', 1, 0), ('erin', 1, 0)])
+        self.assertFalse(FollowSuggestion.objects.filter(user=self.user, suggested_user=erin).exists())
+
+    def test_follow_during_a_refresh_stays_queued(self):
+        social_graph.follow(self.user, self.carol)
+
+        def follow_meanwhile(user_pkids):
+            social_graph.follow(self.user, self.dave)
+            return compute_suggestions(user_pkids)
+
+        with mock.patch('followers.recommendations.compute_suggestions', side_effect=follow_meanwhile):
+            refresh_queued_suggestions()
+        self.assertEqual(list(SuggestionRefresh.objects.values_list('user_id', flat=True)), [self.user.pkid])
+
+        refresh_queued_suggestions()
+        self.assertFalse(SuggestionRefresh.objects.exists())
+
+    def test_suggestions_view(self):
+        call_command('refresh_suggestions', '--all', stdout=StringIO())
+        self.client.force_login(self.user)
+
+        response = self.client.get(reverse('users:follow-suggestions'))
 
-# Create your tests here.
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [suggestion.suggested_user.username for suggestion in response.context['suggestions']],
+            ['carol', 'dave']
+        )
+        self.assertContains(response, reverse('users:follow-user', args=['carol']))
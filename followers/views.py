@@ -1,17 +1,19 @@
+import json
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db import transaction
 from django.urls import reverse
 from django.shortcuts import redirect, get_object_or_404
-from django.http import Http404, HttpResponse, HttpRequest
+from django.http import Http404, HttpResponse, HttpRequest, JsonResponse
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib import messages
-from django.views.generic import DetailView
+from django.views.generic import DetailView, ListView, View
 from django.db.models import QuerySet
 
-from .models import UserFollowing
+from .graph import social_graph
+from .models import FollowSuggestion
 from common.decorators import login_required
 
 logger = logging.getLogger(__name__)
@@ -45,23 +47,17 @@ def follow_user(request: HttpRequest, username: str) -> HttpResponse:
         messages.warning(request, "You cannot follow yourself!")
         return redirect(redirect_url)
     
-    # Check if already following
-    if current_user.is_following(user_to_follow.username):
-        messages.info(request, f"You are already following {user_to_follow.username}!")
-        return redirect(redirect_url)
-    
-    # Create the follow relationship
     try:
-        with transaction.atomic():
-            UserFollowing.objects.create(
-                user=current_user,
-                following_user=user_to_follow
-            )
-        messages.success(request, f"You are now following {user_to_follow.username}!")
-        logger.info(f"User {current_user.username} started following {user_to_follow.username}")
+        followed = social_graph.follow(current_user, user_to_follow)
     except Exception as e:
         logger.error(f"Error following user: {e}", exc_info=True)
         messages.error(request, "An error occurred while trying to follow the user.")
+        return redirect(redirect_url)
+
+    if followed:
+        messages.success(request, f"You are now following {user_to_follow.username}!")
+    else:
+        messages.info(request, f"You are already following {user_to_follow.username}!")
     
     return redirect(redirect_url)
 
@@ -87,26 +83,17 @@ def unfollow_user(request: HttpRequest, username: str) -> HttpResponse:
         messages.warning(request, "You cannot unfollow yourself!")
         return redirect(redirect_url)
     
-    # Check if not following
-    if not current_user.is_following(user_to_unfollow.username):
-        messages.info(request, f"You are not following {user_to_unfollow.username}!")
-        return redirect(redirect_url)
-    
-    # Remove the follow relationship
     try:
-        with transaction.atomic():
-            following = UserFollowing.objects.get(
-                user=current_user,
-                following_user=user_to_unfollow
-            )
-            following.delete()
-        messages.success(request, f"You have unfollowed {user_to_unfollow.username}.")
-        logger.info(f"User {current_user.username} unfollowed {user_to_unfollow.username}")
-    except UserFollowing.DoesNotExist:
-        messages.info(request, f"You are not following {user_to_unfollow.username}.")
+        unfollowed = social_graph.unfollow(current_user, user_to_unfollow)
     except Exception as e:
         logger.error(f"Error unfollowing user: {e}", exc_info=True)
         messages.error(request, "An error occurred while trying to unfollow the user.")
+        return redirect(redirect_url)
+
+    if unfollowed:
+        messages.success(request, f"You have unfollowed {user_to_unfollow.username}.")
+    else:
+        messages.info(request, f"You are not following {user_to_unfollow.username}!")
     
     return redirect(redirect_url)
 
@@ -117,7 +104,7 @@ class FollowingProfileDetailView(LoginRequiredMixin, DetailView):
     """
     model = Profile
     template_name = "followers/followerProfile_detail.html"
-    context_object_name = 'profile'
+    context_object_name = 'followingUser'
     slug_field = 'username'
     slug_url_kwarg = 'username'
     
@@ -130,7 +117,7 @@ class FollowingProfileDetailView(LoginRequiredMixin, DetailView):
             raise Http404("No username provided")
             
         try:
-            return Profile.objects.select_related('user').get(username=username)
+            return Profile.objects.get(username=username)
         except Profile.DoesNotExist as e:
             logger.warning(f"Profile not found: {username}")
             raise Http404("User not found") from e
@@ -140,15 +127,68 @@ class FollowingProfileDetailView(LoginRequiredMixin, DetailView):
         Add additional context to the template.
         """
         context = super().get_context_data(**kwargs)
-        profile = self.get_object()
+        profile = self.object
         current_user = self.request.user
         
+        # Counters are denormalized on the profile, follow state comes from the cache
         context.update({
-            'is_following': current_user.is_following(profile.username),
+            'is_following': social_graph.is_following(current_user, profile.username),
             'can_follow': current_user != profile,
-            'followers_count': profile.followers.count(),
-            'following_count': profile.following.count(),
+            'followers_count': profile.followers_count,
+            'following_count': profile.following_count,
         })
         
         return context
-    
\ No newline at end of file
+
+
+class BulkFollowView(LoginRequiredMixin, View):
+    """
+    Follow (or with unfollow = True, unfollow) many users at once, e.g.
+    suggested accounts on onboarding. POST a JSON body {"usernames": [...]}
+    or repeated `usernames` form fields, get the created/removed/skipped/
+    not_found counts back.
+    """
+    unfollow = False
+
+    def get_usernames(self, request: HttpRequest) -> List[str]:
+        if request.content_type == 'application/json':
+            usernames = json.loads(request.body or b'{}').get('usernames')
+            if not isinstance(usernames, list) or not all(isinstance(name, str) for name in usernames):
+                raise ValueError('usernames must be a list of strings')
+            return usernames
+        return request.POST.getlist('usernames')
+
+    def post(self, request: HttpRequest, *args, **kwargs) -> JsonResponse:
+        try:
+            usernames = self.get_usernames(request)
+        except (ValueError, AttributeError) as e:
+            return JsonResponse({'error': f'Invalid request body: {e}'}, status=400)
+
+        if len(usernames) > settings.SOCIAL_GRAPH_BULK_MAX_USERNAMES:
+            return JsonResponse(
+                {'error': f'At most {settings.SOCIAL_GRAPH_BULK_MAX_USERNAMES} usernames per request'},
+                status=400
+            )
+
+        if self.unfollow:
+            result = social_graph.unfollow_many(request.user, usernames)
+        else:
+            result = social_graph.follow_many(request.user, usernames)
+        return JsonResponse(result._asdict())
+
+
+class SuggestionsView(LoginRequiredMixin, ListView):
+    """
+    "Who to follow" for the current user, read from the suggestions
+    precomputed by followers.recommendations.
+    """
+    template_name = "followers/suggestions.html"
+    context_object_name = 'suggestions'
+
+    def get_queryset(self) -> QuerySet:
+        return (
+            FollowSuggestion.objects
+            .filter(user=self.request.user, suggested_user__is_active=True)
+            .select_related('suggested_user')
+            .order_by('-score', 'pkid')[:settings.SUGGESTIONS_TOP_K]
+        )
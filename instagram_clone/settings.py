@@ -59,6 +59,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so it also counts the queries of the other middleware
+    'common.middleware.QueryInstrumentationMiddleware',
     'allauth.account.middleware.AccountMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -124,6 +126,141 @@ else:
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# CACHE_BACKEND: "locmem" (default for development and tests), "file" or "redis"
+
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'locmem' if DEBUG or 'test' in sys.argv else 'redis')
+
+if CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': os.getenv(
+                'CACHE_LOCATION',
+                f"redis://{os.getenv('REDIS_HOST')}:{os.getenv('REDIS_PORT')}/1"
+            ),
+            'OPTIONS': {
+                'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+            },
+            'KEY_PREFIX': 'instagram_clone',
+        }
+    }
+elif CACHE_BACKEND == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.getenv('CACHE_LOCATION', os.path.join(BASE_DIR, 'cache')),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'instagram-clone',
+        }
+    }
+
+# Seconds the pkid, author and state of a post or chat slug stay cached (common.slugs)
+SLUG_CACHE_TIMEOUT = int(os.getenv('SLUG_CACHE_TIMEOUT', 60 * 60))
+
+# Days a soft-deleted row is kept before purge_soft_deleted removes it (common.archival)
+SOFT_DELETE_RETENTION_DAYS = int(os.getenv('SOFT_DELETE_RETENTION_DAYS', 30))
+
+# Seconds a rendered anonymous page stays cached (AnonymousPageCacheMixin)
+PAGE_CACHE_TIMEOUT = int(os.getenv('PAGE_CACHE_TIMEOUT', 60 * 5))
+
+# Sessions are read from the cache and written through to the database
+SESSION_ENGINE = os.getenv('SESSION_ENGINE', 'django.contrib.sessions.backends.cached_db')
+# Cached identity and permissions of a logged in user (users.backends)
+AUTH_CACHE_TIMEOUT = int(os.getenv('AUTH_CACHE_TIMEOUT', 60 * 15))
+
+
+# Image renditions of uploads (common.renditions)
+# Longest edge in pixels of every generated size
+IMAGE_RENDITION_SIZES = {
+    'thumbnail': 150,
+    'feed': 640,
+    'full': 1080,
+}
+IMAGE_RENDITION_FORMAT = os.getenv('IMAGE_RENDITION_FORMAT', 'WEBP')  # WEBP or JPEG
+IMAGE_RENDITION_QUALITY = 80
+# common.renditions.ThreadPoolBackend or common.renditions.ImmediateBackend
+IMAGE_RENDITION_BACKEND = os.getenv('IMAGE_RENDITION_BACKEND', 'common.renditions.ThreadPoolBackend')
+IMAGE_RENDITION_WORKERS = int(os.getenv('IMAGE_RENDITION_WORKERS', 2))
+
+
+# Per-request query instrumentation (common.middleware), on by default in DEBUG
+# only: it adds a Server-Timing header to every response
+QUERY_INSTRUMENTATION = os.getenv('QUERY_INSTRUMENTATION', 'True' if DEBUG else 'False') == 'True'
+# Statements slower than this (ms) are logged with the code that ran them
+QUERY_SLOW_MS = float(os.getenv('QUERY_SLOW_MS', 100))
+# The same statement this many times in one request is logged as a possible N+1
+QUERY_DUPLICATE_THRESHOLD = int(os.getenv('QUERY_DUPLICATE_THRESHOLD', 5))
+# Slowest statements of each request logged at DEBUG
+QUERY_SLOWEST_COUNT = 3
+
+
+# Social graph (followers.graph)
+# Cached follow state of a (follower, followed username) pair
+SOCIAL_GRAPH_CACHE_TIMEOUT = int(os.getenv('SOCIAL_GRAPH_CACHE_TIMEOUT', 60 * 60))
+# Usernames resolved and followed per transaction by the bulk follow API
+SOCIAL_GRAPH_BULK_CHUNK_SIZE = 500
+# Most usernames accepted by one bulk follow/unfollow request
+SOCIAL_GRAPH_BULK_MAX_USERNAMES = int(os.getenv('SOCIAL_GRAPH_BULK_MAX_USERNAMES', 5000))
+
+
+# Who to follow (followers.recommendations)
+# Suggestions stored per user
+SUGGESTIONS_TOP_K = int(os.getenv('SUGGESTIONS_TOP_K', 20))
+# Likes given in this many days count as engagement with the post author
+SUGGESTIONS_ENGAGEMENT_DAYS = int(os.getenv('SUGGESTIONS_ENGAGEMENT_DAYS', 30))
+# Score of one recent like, a mutual follow scores 1
+SUGGESTIONS_ENGAGEMENT_WEIGHT = float(os.getenv('SUGGESTIONS_ENGAGEMENT_WEIGHT', 0.5))
+# Users whose suggestions are computed together
+SUGGESTIONS_BATCH_SIZE = 500
+
+
+# Home timeline (posts.timeline)
+# Posts kept per follower timeline
+TIMELINE_MAX_LENGTH = int(os.getenv('TIMELINE_MAX_LENGTH', 800))
+# Authors with more followers than this are merged in on read instead of fanned out
+TIMELINE_FANOUT_LIMIT = int(os.getenv('TIMELINE_FANOUT_LIMIT', 5000))
+TIMELINE_FANOUT_BATCH_SIZE = 1000
+# Recent posts copied into a timeline when following someone
+TIMELINE_BACKFILL = 20
+
+
+# Trending posts and tags (posts.trending), rebuilt by the compute_trending command
+# Engagement older than this is ignored
+TRENDING_WINDOW_HOURS = int(os.getenv('TRENDING_WINDOW_HOURS', 72))
+# An event counts half as much every half-life
+TRENDING_HALF_LIFE_HOURS = float(os.getenv('TRENDING_HALF_LIFE_HOURS', 12))
+TRENDING_WEIGHTS = {
+    'like': 1.0,
+    'dislike': 0.5,
+    'comment': 2.0,
+}
+TRENDING_MAX_POSTS = 500
+TRENDING_MAX_TAGS = 100
+# Cached trending pages, also dropped by every run
+TRENDING_CACHE_TIMEOUT = int(os.getenv('TRENDING_CACHE_TIMEOUT', 60 * 15))
+
+
+# Posts full-text search (posts.search)
+# PostgreSQL text search configuration used for the documents and the queries
+POSTS_SEARCH_CONFIG = os.getenv('POSTS_SEARCH_CONFIG', 'english')
+# Words of content shown around the matches in the search results
+POSTS_SEARCH_HEADLINE_WORDS = 30
+
+
+# Users and tags autocomplete (common.autocomplete)
+AUTOCOMPLETE_MIN_LENGTH = 1
+AUTOCOMPLETE_MAX_LENGTH = 50
+AUTOCOMPLETE_LIMIT = int(os.getenv('AUTOCOMPLETE_LIMIT', 10))
+AUTOCOMPLETE_CACHE_TIMEOUT = int(os.getenv('AUTOCOMPLETE_CACHE_TIMEOUT', 60 * 5))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -167,6 +304,16 @@ MEDIA_URL = 'media/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Uploads are stored once per content hash (common.storage)
+STORAGES = {
+    "default": {
+        "BACKEND": "common.storage.ContentAddressedStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
+    },
+}
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Crispy forms
@@ -176,9 +323,11 @@ CRISPY_TEMPLATE_PACK = "bootstrap5"
 # User model
 AUTH_USER_MODEL = "users.Profile"
 
+# ModelBackend and allauth's backend, with the user and their permissions
+# served from the cache (users.backends)
 AUTHENTICATION_BACKENDS = [
-    'django.contrib.auth.backends.ModelBackend',
-    "allauth.account.auth_backends.AuthenticationBackend",
+    'users.backends.CachedModelBackend',
+    "users.backends.CachedAuthenticationBackend",
 ]
 
 from django.urls import reverse_lazy
@@ -228,7 +377,7 @@ ACCOUNT_FORMS = {
 # Email backend for development
 if DEBUG:
     print("\n=== DEBUG: Using console email backend ===")
-    EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+    OUTBOX_DELIVERY_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
     SITE_DOMAIN = 'localhost:8000'
     SITE_NAME = 'Localhost'
@@ -322,6 +471,12 @@ if DEBUG:
                 "level": "DEBUG",
                 "propagate": False,
             },
+            # Per-request query counts, slow queries and N+1 warnings
+            "common.middleware": {
+                "handlers": ["console", "file"],
+                "level": "INFO",
+                "propagate": False,
+            },
             # Add other apps as needed
         },
     }
@@ -329,7 +484,7 @@ else:
     SITE_DOMAIN = os.getenv('SITE_DOMAIN', 'localhost:8000')
     SITE_NAME = os.getenv('SITE_NAME', 'Localhost')
 
-    EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+    OUTBOX_DELIVERY_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
     EMAIL_HOST = os.getenv('EMAIL_HOST', 'smtp.gmail.com')
     EMAIL_PORT = int(os.getenv('EMAIL_PORT', 587))
     EMAIL_USE_TLS = True
@@ -337,6 +492,49 @@ else:
     EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', '')
     DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'noreply@yourdomain.com')
 
+    LOGGING = {
+        "version": 1,
+        "disable_existing_loggers": False,
+        "formatters": {
+            "console": {
+                "format": "%(asctime)s %(name)-12s %(levelname)-8s %(message)s",
+            },
+        },
+        "handlers": {
+            "console": {
+                "level": "INFO",
+                "class": "logging.StreamHandler",
+                "formatter": "console",
+            },
+        },
+        "loggers": {
+            # Per-request query counts, slow queries and N+1 warnings, when
+            # QUERY_INSTRUMENTATION is enabled
+            "common.middleware": {
+                "handlers": ["console"],
+                "level": "INFO",
+                "propagate": False,
+            },
+        },
+    }
+
+# Outgoing email is queued in the outbox and sent by the send_outbox worker
+# through OUTBOX_DELIVERY_BACKEND (common.mail)
+EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'common.mail.OutboxBackend')
+OUTBOX_DELIVERY_BACKEND = os.getenv('OUTBOX_DELIVERY_BACKEND', OUTBOX_DELIVERY_BACKEND)
+# Messages claimed and sent per round by a worker
+OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', 50))
+# Messages a worker sends per minute at most, 0 for no limit
+OUTBOX_RATE_PER_MINUTE = int(os.getenv('OUTBOX_RATE_PER_MINUTE', 120))
+# Failed messages are retried after 1, 2, 4... times the base delay, capped at the max
+OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', 6))
+OUTBOX_RETRY_BASE_SECONDS = int(os.getenv('OUTBOX_RETRY_BASE_SECONDS', 60))
+OUTBOX_RETRY_MAX_SECONDS = int(os.getenv('OUTBOX_RETRY_MAX_SECONDS', 60 * 60))
+# Seconds a claimed batch is reserved for its worker before others may retry it
+OUTBOX_CLAIM_TIMEOUT = int(os.getenv('OUTBOX_CLAIM_TIMEOUT', 60 * 5))
+# Seconds the worker sleeps when the outbox is empty
+OUTBOX_POLL_INTERVAL = int(os.getenv('OUTBOX_POLL_INTERVAL', 5))
+
 # SocialAccount Auth
 SOCIALACCOUNT_PROVIDERS = {
 "google": {
@@ -504,3 +702,16 @@ CHANNEL_LAYERS = {
         },
     },
 }
+
+# Chat message write-behind buffer (chats.buffer)
+# Messages queued per process before ChatConsumer waits for a flush
+CHAT_BUFFER_MAX_SIZE = int(os.getenv('CHAT_BUFFER_MAX_SIZE', 10000))
+# A batch is written when it reaches this size or the interval (seconds) elapses
+CHAT_BUFFER_BATCH_SIZE = int(os.getenv('CHAT_BUFFER_BATCH_SIZE', 200))
+CHAT_BUFFER_FLUSH_INTERVAL = float(os.getenv('CHAT_BUFFER_FLUSH_INTERVAL', 0.05))
+
+# Presence and read receipts (chats.presence, chats.receipts)
+# Seconds a user stays online after their last websocket heartbeat
+CHAT_PRESENCE_TTL = int(os.getenv('CHAT_PRESENCE_TTL', 60))
+# mark_read acknowledgements are written and broadcast once per interval (seconds)
+CHAT_READ_FLUSH_INTERVAL = float(os.getenv('CHAT_READ_FLUSH_INTERVAL', 1.0))
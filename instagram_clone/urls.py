@@ -1,7 +1,9 @@
 from django.conf import settings
 from django.conf.urls.static  import static
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
+
+from common.views import serve_media
 
 urlpatterns = [
     path('admin/',    admin.site.urls),
@@ -13,10 +15,12 @@ urlpatterns = [
     path('chats/',    include('chats.urls', namespace='chats')),
     path('comments/', include('comments.urls', namespace='comments')),
     path('exceptions/', include('exceptions.urls', namespace='exceptions')),
+    path('common/',   include('common.urls', namespace='common')),
 ]
 
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL,
-                          document_root=settings.MEDIA_ROOT)
+    urlpatterns += [
+        re_path(rf'^{settings.MEDIA_URL.lstrip("/")}(?P<path>.*)$', serve_media),
+    ]
     urlpatterns += static(settings.STATIC_URL,
                           document_root=settings.STATIC_ROOT)
\ No newline at end of file
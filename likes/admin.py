@@ -1,20 +1,21 @@
 from django.contrib import admin
-from .models import Like
+from .models import Reaction
 
 
-class LikeAdmin(admin.ModelAdmin):
+class ReactionAdmin(admin.ModelAdmin):
     list_display = (    
                     'pkid',
                     'id', 
                     'author', 
                     'post', 
+                    'kind',
+                    'is_active',
                     'created_at',
                     'updated_at'
                 )
-    list_filter = ("author__username",)
-    search_fields = ['pkid', 'post__slug', 'auhtor__username']
+    list_filter = ("kind", "author__username",)
+    search_fields = ['pkid', 'post__slug', 'author__username']
     prepopulated_fields = {}
 
      
-admin.site.register(Like, LikeAdmin)
-
+admin.site.register(Reaction, ReactionAdmin)
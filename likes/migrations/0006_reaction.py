@@ -0,0 +1,132 @@
+# Generated by Django 5.0.4 on 2026-10-18 03:27
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def copy_likes_and_dislikes(apps, schema_editor):
+    """One reaction per (author, post), the latest of its active like or dislike."""
+    Like = apps.get_model("likes", "Like")
+    Dislike = apps.get_model("likes", "Dislike")
+    Reaction = apps.get_model("likes", "Reaction")
+    # Keep the times of the copied rows, they feed the trending and suggestion windows
+    for field in Reaction._meta.concrete_fields:
+        if field.name in ("created_at", "updated_at", "deleted_at"):
+            field.auto_now = field.auto_now_add = False
+
+    latest = {}
+    for kind, model in (("like", Like), ("dislike", Dislike)):
+        rows = model.objects.filter(is_active=True).values_list(
+            "author_id", "post_id", "created_at"
+        )
+        for author_id, post_id, created_at in rows.iterator():
+            current = latest.get((author_id, post_id))
+            if current is None or (
+                created_at and (current[1] is None or created_at > current[1])
+            ):
+                latest[(author_id, post_id)] = (kind, created_at)
+
+    Reaction.objects.bulk_create(
+        [
+            Reaction(
+                author_id=author_id,
+                post_id=post_id,
+                kind=kind,
+                created_at=created_at,
+                updated_at=created_at,
+            )
+            for (author_id, post_id), (kind, created_at) in latest.items()
+        ],
+        batch_size=1000,
+    )
+
+    # A pair with both a like and a dislike kept only one of them, recount
+    def active_count(kind):
+        counts = (
+            Reaction.objects.filter(post=OuterRef("pkid"), is_active=True, kind=kind)
+            .order_by()
+            .values("post")
+            .annotate(total=Count("pkid"))
+            .values("total")
+        )
+        return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+    apps.get_model("posts", "Post")._base_manager.update(
+        like_count=active_count("like"), dislike_count=active_count("dislike")
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("likes", "0005_dislike_deleted_at_like_deleted_at"),
+        ("posts", "0013_trending"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Reaction",
+            fields=[
+                (
+                    "pkid",
+                    models.BigAutoField(
+                        editable=False, primary_key=True, serialize=False
+                    ),
+                ),
+                (
+                    "id",
+                    models.UUIDField(default=uuid.uuid4, editable=False, unique=True),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True, null=True)),
+                ("updated_at", models.DateTimeField(auto_now=True, null=True)),
+                ("deleted_at", models.DateTimeField(auto_now=True, null=True)),
+                ("is_active", models.BooleanField(default=True)),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[("like", "Like"), ("dislike", "Dislike")],
+                        max_length=10,
+                        verbose_name="Reaction",
+                    ),
+                ),
+                (
+                    "author",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="reactions",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "post",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="reactions",
+                        to="posts.post",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Reaction",
+                "verbose_name_plural": "Reactions",
+                "ordering": ["-created_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["post", "kind"], name="likes_react_post_id_654b41_idx"
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="reaction",
+            constraint=models.UniqueConstraint(
+                fields=("author", "post"), name="unique_reaction"
+            ),
+        ),
+        migrations.RunPython(copy_likes_and_dislikes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.4 on 2026-10-18 03:28
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("likes", "0006_reaction"),
+        ("posts", "0014_remove_post_likes"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="like",
+            name="author",
+        ),
+        migrations.RemoveField(
+            model_name="like",
+            name="post",
+        ),
+        migrations.DeleteModel(
+            name="Dislike",
+        ),
+        migrations.DeleteModel(
+            name="Like",
+        ),
+    ]
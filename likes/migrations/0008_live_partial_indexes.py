@@ -0,0 +1,28 @@
+# Generated by Django 5.0.4 on 2026-10-18 03:47
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("likes", "0007_delete_like_dislike"),
+        ("posts", "0015_live_partial_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="reaction",
+            name="likes_react_post_id_654b41_idx",
+        ),
+        migrations.AddIndex(
+            model_name="reaction",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["post", "kind"],
+                name="reaction_live_post_idx",
+            ),
+        ),
+    ]
@@ -1,4 +1,3 @@
-from typing import Iterable, List
 from django.db import models
 from django.conf import settings
 from django.utils.translation import gettext_lazy as _
@@ -9,65 +8,50 @@ from django.contrib.auth import get_user_model
 Profile = get_user_model()
 
 
-class Like(TimeStampedUUIDModel):
-    author = models.ForeignKey( 
-                                settings.AUTH_USER_MODEL,
-                                related_name='given_likes',
-                                on_delete=models.CASCADE
-                            )
-    post = models.ForeignKey( 
-                                "posts.Post",
-                                related_name='post_likes',
-                                on_delete=models.CASCADE
-                            )
-    
-    
-    def __str__(self):
-        return f"For post: {self.post.slug} given by {self.author.username}"
+class ReactionKind(models.TextChoices):
+    LIKE = "like", _("Like")
+    DISLIKE = "dislike", _("Dislike")
 
 
-    class Meta:
-        verbose_name = _("Like")
-        verbose_name_plural = _("Likes")
-        ordering = ['-created_at']
-
-    
-    def get_all_likes_authors_list(self) -> List[int]:
-        """Returns a list of all users who have liked any post"""
-        authors_ids = []
-        for like in Like.objects.all():
-            if like.author.given_likes is not None:
-                authors_ids.append(like.author.id)
-                print("Like author", like.author)
-        return authors_ids
-
-        
-class Dislike(TimeStampedUUIDModel):
-    author = models.ForeignKey( 
+class Reaction(TimeStampedUUIDModel):
+    """
+        The one reaction of a user to a post, written by likes.reactions.
+        Changing it updates the row in place, removing it soft-deletes it.
+    """
+    author = models.ForeignKey(
                                 settings.AUTH_USER_MODEL,
-                                related_name='given_dislikes',
+                                related_name='reactions',
                                 on_delete=models.CASCADE
                             )
-    post = models.ForeignKey( 
+    post = models.ForeignKey(
                                 "posts.Post",
-                                related_name='post_dislikes',
+                                related_name='reactions',
                                 on_delete=models.CASCADE
                             )
-    
-    
-    def __str__(self):
-        return f"For post: {self.post.slug} given by {self.author.username}"
+    kind = models.CharField(
+                                verbose_name=_('Reaction'),
+                                max_length=10,
+                                choices=ReactionKind.choices
+                            )
 
-    def get_all_dislikes_authors_list(self) -> List[int]:
-        """Returns a list of all users who have disliked any post"""
-        authors_ids = []
-        for dislike in Dislike.objects.all():
-            if dislike.author.given_dislikes is not None:
-                authors_ids.append(dislike.author.id)
-                print("Dislike author", dislike.author)
-        return authors_ids
+    def __str__(self):
+        return f"{self.kind} for post {self.post_id} given by {self.author_id}"
 
     class Meta:
-        verbose_name = _("Dislike")
-        verbose_name_plural = _("Dislikes")
+        verbose_name = _("Reaction")
+        verbose_name_plural = _("Reactions")
         ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(
+                                    fields=['author', 'post'],
+                                    name="unique_reaction"
+                                ),
+        ]
+        indexes = [
+            # Backs the counter recount and the trending window, removed reactions left out
+            models.Index(
+                fields=['post', 'kind'],
+                condition=models.Q(is_active=True),
+                name='reaction_live_post_idx'
+            ),
+        ]
@@ -0,0 +1,213 @@
+"""
+Likes and dislikes.
+
+A user has at most one Reaction per post (unique_reaction), its kind is
+switched in place and removing it soft-deletes the row. react() sets the
+reaction to a given state, so repeating a call changes nothing: the
+reaction row is upserted and the post's like_count/dislike_count receive
+the difference between the old and the new state, in one transaction.
+
+The backend is picked by database vendor:
+
+    PostgresReactionBackend  an INSERT ... ON CONFLICT DO NOTHING of the reaction
+                             row, then one statement: the row lock, the state
+                             change and the counter UPDATE are CTEs of it
+    ReactionBackend          one read of the post and the old reaction, then the
+                             upsert and the counter UPDATE when the state changed
+"""
+import logging
+import uuid
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+from django.db import connection, transaction
+from django.db.models import OuterRef, Subquery
+from django.utils.module_loading import import_string
+
+from common.cache import bump_cache_version
+from posts.models import Post
+from posts.utils import post_page_cache_version, update_post_counters
+from .models import Reaction, ReactionKind
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = {
+    'postgresql': 'likes.reactions.PostgresReactionBackend',
+}
+DEFAULT_BACKEND = 'likes.reactions.ReactionBackend'
+
+COUNTER_FIELDS = {
+    ReactionKind.LIKE: 'like_count',
+    ReactionKind.DISLIKE: 'dislike_count',
+}
+
+
+class ReactionResult(NamedTuple):
+    # Reaction of the user after the call, None when they have none
+    kind: Optional[str]
+    like_count: int
+    dislike_count: int
+    changed: bool
+
+
+def new_state(old: Optional[str], kind: str, active: bool) -> Optional[str]:
+    """Setting kind makes it the reaction, unsetting it only removes that same kind."""
+    if active:
+        return kind
+    return None if old == kind else old
+
+
+def counter_deltas(old: Optional[str], new: Optional[str]) -> dict:
+    return {
+        field: (new == kind) - (old == kind)
+        for kind, field in COUNTER_FIELDS.items()
+    }
+
+
+class ReactionBackend:
+
+    def react(self, user, post_slug: str, kind: str, active: bool) -> Optional[ReactionResult]:
+        current = (
+            Reaction.objects
+            .filter(author=user, post=OuterRef('pkid'), is_active=True)
+            .values('kind')[:1]
+        )
+        with transaction.atomic():
+            post = (
+                Post.published
+                .filter(slug=post_slug)
+                .annotate(reaction=Subquery(current))
+                .values('pkid', 'like_count', 'dislike_count', 'reaction')
+                .first()
+            )
+            if post is None:
+                return None
+
+            old = post['reaction']
+            new = new_state(old, kind, active)
+            if new == old:
+                return ReactionResult(old, post['like_count'], post['dislike_count'], changed=False)
+
+            Reaction.objects.bulk_create(
+                [Reaction(author=user, post_id=post['pkid'], kind=new or old, is_active=new is not None)],
+                update_conflicts=True,
+                unique_fields=['author', 'post'],
+                # deleted_at only moves when the reaction is removed
+                update_fields=['kind', 'is_active', 'updated_at', *(['deleted_at'] if new is None else [])]
+            )
+            deltas = counter_deltas(old, new)
+            update_post_counters(post['pkid'], **deltas)
+
+        return ReactionResult(
+            new,
+            max(post['like_count'] + deltas['like_count'], 0),
+            max(post['dislike_count'] + deltas['dislike_count'], 0),
+            changed=True
+        )
+
+
+class PostgresReactionBackend(ReactionBackend):
+    """
+        Two statements in one transaction. The first makes sure the (author,
+        post) row exists, inserting an inactive one on a first reaction. The
+        second locks that row FOR UPDATE whatever its state, so concurrent
+        calls of the same user (a double click) queue up on it, and each one
+        computes its counter difference against the state the other left.
+        The state change and the counter UPDATE are CTEs of that statement.
+    """
+
+    def ensure_sql(self) -> str:
+        reaction_table = Reaction._meta.db_table
+        post_table = Post._meta.db_table
+        return f"""
+            INSERT INTO {reaction_table}
+                (id, author_id, post_id, kind, is_active, created_at, updated_at, deleted_at)
+            SELECT %(id)s, %(author)s, pkid, %(kind)s, false, now(), now(), now()
+            FROM {post_table} WHERE slug = %(slug)s AND is_active
+            ON CONFLICT (author_id, post_id) DO NOTHING
+        """
+
+    def sql(self) -> str:
+        reaction_table = Reaction._meta.db_table
+        post_table = Post._meta.db_table
+        return f"""
+            WITH target AS (
+                SELECT pkid FROM {post_table} WHERE slug = %(slug)s AND is_active
+            ), locked AS (
+                SELECT reaction.pkid, reaction.kind, reaction.is_active
+                FROM {reaction_table} reaction JOIN target ON reaction.post_id = target.pkid
+                WHERE reaction.author_id = %(author)s
+                FOR UPDATE OF reaction
+            ), old AS (
+                SELECT CASE WHEN locked.is_active THEN locked.kind END AS kind FROM locked
+            ), new AS (
+                SELECT CASE
+                    WHEN %(active)s THEN %(kind)s::varchar
+                    WHEN (SELECT kind FROM old) = %(kind)s THEN NULL
+                    ELSE (SELECT kind FROM old)
+                END AS kind
+            ), changed AS (
+                UPDATE {reaction_table} reaction SET
+                    kind = COALESCE(new.kind, reaction.kind),
+                    is_active = new.kind IS NOT NULL,
+                    updated_at = now(),
+                    deleted_at = CASE WHEN new.kind IS NULL THEN now() ELSE reaction.deleted_at END
+                FROM locked, new
+                WHERE reaction.pkid = locked.pkid
+                  AND new.kind IS DISTINCT FROM (SELECT kind FROM old)
+            ), delta AS (
+                SELECT
+                    (new.kind IS NOT DISTINCT FROM 'like')::int
+                        - ((SELECT kind FROM old) IS NOT DISTINCT FROM 'like')::int AS likes,
+                    (new.kind IS NOT DISTINCT FROM 'dislike')::int
+                        - ((SELECT kind FROM old) IS NOT DISTINCT FROM 'dislike')::int AS dislikes
+                FROM new
+            ), counters AS (
+                UPDATE {post_table} post SET
+                    like_count = GREATEST(post.like_count + delta.likes, 0),
+                    dislike_count = GREATEST(post.dislike_count + delta.dislikes, 0)
+                FROM target, delta
+                WHERE post.pkid = target.pkid AND (delta.likes <> 0 OR delta.dislikes <> 0)
+                RETURNING post.like_count, post.dislike_count
+            )
+            SELECT (SELECT kind FROM new), like_count, dislike_count, true FROM counters
+            UNION ALL
+            SELECT (SELECT kind FROM new), post.like_count, post.dislike_count, false
+            FROM {post_table} post JOIN target ON post.pkid = target.pkid
+            WHERE NOT EXISTS (SELECT 1 FROM counters)
+        """
+
+    def react(self, user, post_slug, kind, active):
+        params = {
+            'slug': post_slug,
+            'author': user.pkid,
+            'kind': kind,
+            'active': active,
+            'id': uuid.uuid4(),
+        }
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(self.ensure_sql(), params)
+            cursor.execute(self.sql(), params)
+            row = cursor.fetchone()
+        return ReactionResult(*row) if row is not None else None
+
+
+@lru_cache(maxsize=None)
+def get_backend() -> ReactionBackend:
+    return import_string(BACKENDS.get(connection.vendor, DEFAULT_BACKEND))()
+
+
+def react(user, post_slug: str, kind: str, active: bool = True) -> Optional[ReactionResult]:
+    """
+        Set (or with active=False, remove) the `kind` reaction of user to the
+        published post post_slug. Returns None when there is no such post.
+    """
+    if kind not in COUNTER_FIELDS:
+        raise ValueError(f"Unknown reaction {kind!r}")
+
+    result = get_backend().react(user, post_slug, kind, active)
+    if result is not None and result.changed:
+        # The writes bypass the model signals, so the detail page is invalidated here
+        transaction.on_commit(lambda: bump_cache_version(post_page_cache_version(post_slug)))
+        logger.info(f"User {user.username} reaction to {post_slug} is now {result.kind}")
+    return result
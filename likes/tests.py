@@ -1,3 +1,99 @@
+from unittest import mock, skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.urls import reverse
+
+from likes.models import Reaction, ReactionKind
+from likes.reactions import PostgresReactionBackend, react
+from posts.models import Post
+
+
+User = get_user_model()
+
+
+class TestReactions(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User._default_manager.create_user(
+            username='reactor', email='reactor@example.com', password='testpass123', is_active=True
+        )
+        # bulk_create skips Post.save, which expects the view kwargs
+        self.post = Post.objects.bulk_create([Post(title='Reacted', slug='reacted', author=self.user)])[0]
+
+    def assertCounters(self, likes, dislikes):
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.like_count, self.post.dislike_count), (likes, dislikes))
+
+    def test_react_is_idempotent(self):
+        first = react(self.user, self.post.slug, ReactionKind.LIKE)
+        again = react(self.user, self.post.slug, ReactionKind.LIKE)
+
+        self.assertEqual(first._asdict(), {'kind': 'like', 'like_count': 1, 'dislike_count': 0, 'changed': True})
+        self.assertFalse(again.changed)
+        self.assertCounters(1, 0)
+
+        # Unsetting a dislike leaves the like alone
+        self.assertFalse(react(self.user, self.post.slug, ReactionKind.DISLIKE, active=False).changed)
+        self.assertCounters(1, 0)
+
+    def test_switch_and_remove_reuse_one_row(self):
+        react(self.user, self.post.slug, ReactionKind.LIKE)
+        switched = react(self.user, self.post.slug, ReactionKind.DISLIKE)
+        self.assertEqual((switched.kind, switched.like_count, switched.dislike_count), ('dislike', 0, 1))
+        self.assertCounters(0, 1)
+
+        removed = react(self.user, self.post.slug, ReactionKind.DISLIKE, active=False)
+        self.assertIsNone(removed.kind)
+        self.assertCounters(0, 0)
+
+        react(self.user, self.post.slug, ReactionKind.LIKE)
+        reaction = Reaction.objects.get(author=self.user, post=self.post)
+        self.assertEqual((reaction.kind, reaction.is_active), ('like', True))
+        self.assertCounters(1, 0)
+
+    def test_reactivating_keeps_the_deletion_time(self):
+        react(self.user, self.post.slug, ReactionKind.LIKE)
+        react(self.user, self.post.slug, ReactionKind.LIKE, active=False)
+        deleted_at = Reaction.objects.get(author=self.user, post=self.post).deleted_at
+
+        react(self.user, self.post.slug, ReactionKind.DISLIKE)
+        reaction = Reaction.objects.get(author=self.user, post=self.post)
+        self.assertTrue(reaction.is_active)
+        self.assertEqual(reaction.deleted_at, deleted_at)
+
+    def test_unknown_post_and_kind(self):
+        self.assertIsNone(react(self.user, 'missing', ReactionKind.LIKE))
+        with self.assertRaises(ValueError):
+            react(self.user, self.post.slug, 'love')
+
+    def test_reaction_view(self):
+        self.client.force_login(self.user)
+        url = reverse('likes:like-create', kwargs={'post_slug': self.post.slug})
+
+        response = self.client.post(url, {'active': True}, content_type='application/json')
+        self.assertEqual(response.json(), {'kind': 'like', 'like_count': 1, 'dislike_count': 0, 'changed': True})
+
+        response = self.client.post(url, {'active': False})
+        self.assertRedirects(response, reverse('posts:post-detail', kwargs={'slug': self.post.slug}),
+                             fetch_redirect_response=False)
+        self.assertCounters(0, 0)
+
+        response = self.client.post(url, {'active': 'yes'}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+        missing = reverse('likes:dislike-create', kwargs={'post_slug': 'missing'})
+        self.assertEqual(self.client.post(missing, HTTP_ACCEPT='application/json').status_code, 404)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'PostgresReactionBackend runs PostgreSQL only SQL')
+class TestPostgresReactions(TestReactions):
+    """The tests of TestReactions through the single statement backend: toggling, switching, counters."""
 
-# Create your tests here.
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch('likes.reactions.get_backend', return_value=PostgresReactionBackend())
+        patcher.start()
+        self.addCleanup(patcher.stop)
@@ -1,11 +1,12 @@
 from django.urls import path
 from . import views
+from .models import ReactionKind
 
 app_name = 'likes'
 
 urlpatterns = [
-    path('like/create/<slug:post_slug>', views.LikeCreateView.as_view(),    
+    path('like/create/<slug:post_slug>', views.ReactionView.as_view(kind=ReactionKind.LIKE),
                                                     name='like-create'),
-    path('dislike/create/<slug:post_slug>', views.DislikeCreateView.as_view(),    
+    path('dislike/create/<slug:post_slug>', views.ReactionView.as_view(kind=ReactionKind.DISLIKE),
                                                     name='dislike-create'),
 ]
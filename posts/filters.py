@@ -1,13 +1,15 @@
 import django_filters
 from .models import Post
+from . import search
 
 class PostsFilter(django_filters.FilterSet):
-    content = django_filters.CharFilter(lookup_expr='icontains')
+    # Text filters go through the search index (posts.search) instead of LIKE '%...%' scans
+    content = django_filters.CharFilter(method='filter_full_text')
     
-    author__username = django_filters.CharFilter(lookup_expr='icontains')
+    author__username = django_filters.CharFilter(lookup_expr='exact')
     author__country = django_filters.CharFilter(lookup_expr='icontains')
     category__title = django_filters.CharFilter(lookup_expr='icontains')
-    tags__title = django_filters.CharFilter(lookup_expr='icontains')
+    tags__title = django_filters.CharFilter(method='filter_full_text')
     
     
     release_date = django_filters.DateTimeFilter(
@@ -33,5 +35,7 @@ class PostsFilter(django_filters.FilterSet):
                   'tags__title',
                   'release_date',
                   ]
-    
-    
\ No newline at end of file
+
+    def filter_full_text(self, queryset, name, value):
+        field = 'tags' if name == 'tags__title' else name
+        return search.search(queryset, value, fields=[field])
\ No newline at end of file
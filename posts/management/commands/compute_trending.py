@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from posts.trending import compute_trending
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the trending posts and tags from the recent likes, dislikes and comments, meant to run from cron'
+
+    def handle(self, *args, **options):
+        posts, tags = compute_trending()
+        self.stdout.write(self.style.SUCCESS(f'Ranked {posts} trending post(s) and {tags} tag(s).'))
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, IntegerField, Max, Min, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from comments.models import Comment
+from likes.models import Reaction, ReactionKind
+from posts.models import Post
+
+
+def active_count_subquery(model, **filters):
+    """Correlated COUNT of the active rows of model (matching filters) pointing at the outer post"""
+    counts = (
+        model.objects
+        .filter(post=OuterRef('pkid'), is_active=True, **filters)
+        .order_by()
+        .values('post')
+        .annotate(total=Count('pkid'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the denormalized like/dislike/comment counters on posts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of posts (by pkid range) updated per transaction',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        bounds = Post.objects.aggregate(low=Min('pkid'), high=Max('pkid'))
+
+        if bounds['low'] is None:
+            self.stdout.write('No posts to recount.')
+            return
+
+        updated = 0
+        for start in range(bounds['low'], bounds['high'] + 1, batch_size):
+            with transaction.atomic():
+                updated += Post.objects.filter(
+                    pkid__gte=start,
+                    pkid__lt=start + batch_size,
+                ).update(
+                    like_count=active_count_subquery(Reaction, kind=ReactionKind.LIKE),
+                    dislike_count=active_count_subquery(Reaction, kind=ReactionKind.DISLIKE),
+                    comment_count=active_count_subquery(Comment),
+                )
+
+        self.stdout.write(self.style.SUCCESS(f'Recounted counters for {updated} post(s).'))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from posts.timeline import trim_timelines
+
+
+class Command(BaseCommand):
+    help = 'Trims every home timeline down to its newest TIMELINE_MAX_LENGTH posts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-length',
+            type=int,
+            default=None,
+            help='Entries kept per timeline (defaults to TIMELINE_MAX_LENGTH)',
+        )
+
+    def handle(self, *args, **options):
+        removed = trim_timelines(options['max_length'])
+        self.stdout.write(self.style.SUCCESS(f'Removed {removed} timeline entr(y/ies).'))
@@ -0,0 +1,59 @@
+# Generated by Django 5.0.4 on 2026-10-18 02:40
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def active_count(model, **filters):
+    counts = (
+        model._base_manager.filter(post=OuterRef("pkid"), is_active=True, **filters)
+        .order_by()
+        .values("post")
+        .annotate(total=Count("pkid"))
+        .values("total")
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def fill_counters(apps, schema_editor):
+    """The counters of the existing posts, as recount_post_counters computes them."""
+    apps.get_model("posts", "Post")._base_manager.update(
+        like_count=active_count(apps.get_model("likes", "Like")),
+        dislike_count=active_count(apps.get_model("likes", "Dislike")),
+        comment_count=active_count(apps.get_model("comments", "Comment")),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0007_alter_post_managers"),
+        ("likes", "0004_dislike_is_active_like_is_active"),
+        ("comments", "0005_comment_is_active"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="comment_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Comments count"
+            ),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="dislike_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Dislikes count"
+            ),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="like_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Likes count"
+            ),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.0.4 on 2026-10-18 02:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("likes", "0005_dislike_deleted_at_like_deleted_at"),
+        ("posts", "0008_post_comment_count_post_dislike_count_and_more"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                fields=["-created_at", "-pkid"], name="posts_post_created_087ad2_idx"
+            ),
+        ),
+    ]
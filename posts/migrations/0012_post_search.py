@@ -0,0 +1,85 @@
+# Generated by Django 5.0.4 on 2026-10-18 03:05
+
+import django.contrib.postgres.search
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+TAGS_JOIN = """
+    FROM posts_post post
+    LEFT JOIN posts_post_tags post_tag ON post_tag.post_id = post.pkid
+    LEFT JOIN posts_tags tag ON tag.pkid = post_tag.tags_id
+    GROUP BY post.pkid
+"""
+
+
+def create_search_index(apps, schema_editor):
+    """The index of posts.search for the current database, filled with the existing posts."""
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute(
+            "CREATE TABLE posts_post_search ("
+            " post_id bigint PRIMARY KEY REFERENCES posts_post (pkid) ON DELETE CASCADE,"
+            " document tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            "CREATE INDEX posts_post_search_document_gin ON posts_post_search USING gin (document)"
+        )
+        schema_editor.execute(
+            "INSERT INTO posts_post_search (post_id, document)"
+            " SELECT post.pkid,"
+            " setweight(to_tsvector(%(config)s, coalesce(post.title, '')), 'A')"
+            " || setweight(to_tsvector(%(config)s, coalesce(post.content, '')), 'B')"
+            " || setweight(to_tsvector(%(config)s, coalesce(string_agg(tag.title, ' '), '')), 'C')"
+            + TAGS_JOIN,
+            {"config": settings.POSTS_SEARCH_CONFIG},
+        )
+    elif vendor == "sqlite":
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE posts_post_fts USING fts5("
+            "title, content, tags, tokenize = 'porter unicode61')"
+        )
+        schema_editor.execute(
+            "INSERT INTO posts_post_fts (rowid, title, content, tags)"
+            " SELECT post.pkid, coalesce(post.title, ''), coalesce(post.content, ''),"
+            " coalesce(group_concat(tag.title, ' '), '')" + TAGS_JOIN
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute("DROP TABLE posts_post_search")
+    elif vendor == "sqlite":
+        schema_editor.execute("DROP TABLE posts_post_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0011_post_renditions"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PostSearchDocument",
+            fields=[
+                (
+                    "post",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        primary_key=True,
+                        related_name="search_document",
+                        serialize=False,
+                        to="posts.post",
+                    ),
+                ),
+                ("document", django.contrib.postgres.search.SearchVectorField()),
+            ],
+            options={
+                "db_table": "posts_post_search",
+                "managed": False,
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
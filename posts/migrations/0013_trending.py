@@ -0,0 +1,64 @@
+# Generated by Django 5.0.4 on 2026-10-18 03:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0012_post_search"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TrendingPost",
+            fields=[
+                (
+                    "post",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="trending",
+                        serialize=False,
+                        to="posts.post",
+                    ),
+                ),
+                ("score", models.FloatField(verbose_name="Score")),
+            ],
+            options={
+                "verbose_name": "Trending post",
+                "verbose_name_plural": "Trending posts",
+                "indexes": [
+                    models.Index(
+                        fields=["-score", "-post"], name="posts_trend_score_02d02d_idx"
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="TrendingTag",
+            fields=[
+                (
+                    "tag",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="trending",
+                        serialize=False,
+                        to="posts.tags",
+                    ),
+                ),
+                ("score", models.FloatField(verbose_name="Score")),
+            ],
+            options={
+                "verbose_name": "Trending tag",
+                "verbose_name_plural": "Trending tags",
+                "indexes": [
+                    models.Index(
+                        fields=["-score", "-tag"], name="posts_trend_score_a890ec_idx"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.4 on 2026-10-18 03:28
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0013_trending"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="post",
+            name="likes",
+        ),
+    ]
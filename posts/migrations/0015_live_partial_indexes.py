@@ -0,0 +1,35 @@
+# Generated by Django 5.0.4 on 2026-10-18 03:47
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0014_remove_post_likes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="post",
+            name="posts_post_created_087ad2_idx",
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["-created_at", "-pkid"],
+                name="post_live_feed_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["author", "-created_at", "-pkid"],
+                name="post_live_author_idx",
+            ),
+        ),
+    ]
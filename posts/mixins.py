@@ -5,7 +5,10 @@ from django.db.models import QuerySet
 from django.utils.decorators import method_decorator
 from django.contrib.auth.decorators import permission_required
 
+from common.slugs import resolve_slug
+from followers.graph import social_graph
 from .models import Post
+from .search import SEARCH_ORDERING
 from .utils import search_posts, posts_filter, paginate_posts
 
 
@@ -22,11 +25,7 @@ class GetPostObjectMixin:
         _slug = self.kwargs.get(self.slug_url_kwarg
                                 if not kwargs.get('post_slug')
                                 else kwargs.get('post_slug'), '')
-        try:
-            post = Post.published.get(slug=_slug)
-        except Post.DoesNotExist:
-            post = None
-        return post
+        return resolve_slug(self.request, Post.published, _slug)
 
 class PostPermissionMixin:
     """Mixin to handle post-related permissions."""
@@ -37,8 +36,13 @@ class PostPermissionMixin:
         return super().dispatch(request, *args, **kwargs)
 
 class PostPaginationMixin:
-    """Mixin to handle post pagination and filtering."""
+    """Mixin to handle keyset post pagination and filtering."""
     paginate_by = 5
+    cursor_query_params = ('after', 'before')
+
+    def get_paginate_by(self, queryset) -> None:
+        """Turn off ListView's OFFSET pagination, pages come from paginate_posts."""
+        return None
 
     def get_queryset(self) -> QuerySet:
         queryset = super().get_queryset()
@@ -46,22 +50,44 @@ class PostPaginationMixin:
             queryset, _ = search_posts(self.request, queryset)
         return queryset
 
+    def get_pagination_ordering(self):
+        """Search results are paged by relevance, everything else newest first."""
+        if self.request.GET.get('search_query', '').strip():
+            return SEARCH_ORDERING
+        return ('-created_at', '-pkid')
+
+    def get_pagination_query(self) -> str:
+        """The current query string without cursors, so page links keep search and filters."""
+        params = self.request.GET.copy()
+        for param in self.cursor_query_params:
+            params.pop(param, None)
+        return params.urlencode()
+
     def get_context_data(self, **kwargs) -> Dict[str, Any]:
         context = super().get_context_data(**kwargs)
         queryset = self.get_queryset()
-        posts, search_query = posts_filter(self.request, queryset)
+        posts, filter = posts_filter(self.request, queryset)
 
-        custom_range, page_obj = paginate_posts(
+        page_obj = paginate_posts(
             self.request,
             posts,
-            self.paginate_by
+            self.paginate_by,
+            self.get_pagination_ordering()
+        )
+
+        # Follow state of every author on the page in one cache round trip
+        following = social_graph.is_following_many(
+            self.request.user,
+            {post.author.username for post in page_obj.object_list}
         )
 
         context.update({
             'page_obj': page_obj,
-            'custom_range': custom_range,
-            'posts': posts,
-            'search_query': search_query or self.request.GET.get('search_query', '')
+            'is_paginated': page_obj.has_other_pages(),
+            'pagination_query': self.get_pagination_query(),
+            'posts': page_obj.object_list,
+            'filter': filter,
+            'search_query': self.request.GET.get('search_query', ''),
+            'followed_authors': {username for username, followed in following.items() if followed},
         })
         return context
-
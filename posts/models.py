@@ -1,12 +1,13 @@
 import uuid
 from django.db import models
 from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
 from django.urls import reverse
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import validate_slug, MaxLengthValidator
 from autoslug import AutoSlugField
 
-from common.models import TimeStampedUUIDModel
+from common.models import ImageRenditionsModel, TimeStampedUUIDModel
 from .managers import PublishedPostsManager
 from common import utils as common_utils
 
@@ -16,7 +17,7 @@ class STATUS(models.TextChoices):
     PUBLISH = "publish", _("Publish")
     
 
-class Post(TimeStampedUUIDModel):
+class Post(TimeStampedUUIDModel, ImageRenditionsModel):
     objects = models.Manager()
     published = PublishedPostsManager()
     
@@ -60,13 +61,6 @@ class Post(TimeStampedUUIDModel):
                                 related_name='profile',
                                 on_delete=models.CASCADE
                             )
-    likes = models.ForeignKey( 
-                                "likes.Like",
-                                related_name='likes',
-                                on_delete=models.CASCADE,
-                                blank=True, 
-                                null=True
-                            )
     # category = models.ForeignKey('category.Category',
     #                              on_delete=models.CASCADE,
     #                              blank=True,
@@ -87,7 +81,24 @@ class Post(TimeStampedUUIDModel):
                                 default="default.jpg", 
                                 upload_to='posts'
                             )
-    
+    # Denormalized counters, kept up to date with F() updates in
+    # posts.utils.update_post_counters and rebuilt by recount_post_counters
+    like_count = models.PositiveIntegerField(
+                                verbose_name=_('Likes count'),
+                                default=0,
+                                editable=False
+                            )
+    dislike_count = models.PositiveIntegerField(
+                                verbose_name=_('Dislikes count'),
+                                default=0,
+                                editable=False
+                            )
+    comment_count = models.PositiveIntegerField(
+                                verbose_name=_('Comments count'),
+                                default=0,
+                                editable=False
+                            )
+
     def __str__(self):
         return self.title
 
@@ -97,7 +108,20 @@ class Post(TimeStampedUUIDModel):
         verbose_name_plural = _("Posts")
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['slug', 'active', 'title'])
+            models.Index(fields=['slug', 'active', 'title']),
+            # Backs the (created_at, pkid) keyset pagination of the feed, the
+            # published posts only: soft-deleted rows stay out of the index
+            models.Index(
+                fields=['-created_at', '-pkid'],
+                condition=models.Q(is_active=True),
+                name='post_live_feed_idx'
+            ),
+            # Timeline fan-out and backfill, an author's newest posts
+            models.Index(
+                fields=['author', '-created_at', '-pkid'],
+                condition=models.Q(is_active=True),
+                name='post_live_author_idx'
+            ),
         ]
 
     @property
@@ -152,3 +176,95 @@ class Tags(TimeStampedUUIDModel):
         indexes = [
             models.Index(fields=['title'])
         ]
+
+
+class TimelineEntry(models.Model):
+    """A post pushed into a follower's home timeline (fan-out on write, see posts.timeline)."""
+    pkid = models.BigAutoField(primary_key=True, editable=False)
+    owner = models.ForeignKey(
+                                settings.AUTH_USER_MODEL,
+                                related_name='timeline_entries',
+                                on_delete=models.CASCADE
+                            )
+    post = models.ForeignKey(
+                                Post,
+                                related_name='timeline_entries',
+                                on_delete=models.CASCADE
+                            )
+
+    def __str__(self):
+        return f"{self.post_id} in timeline of {self.owner_id}"
+
+    class Meta:
+        verbose_name = _("Timeline entry")
+        verbose_name_plural = _("Timeline entries")
+        constraints = [
+            models.UniqueConstraint(
+                                    fields=['owner', 'post'],
+                                    name="unique_timeline_entry"
+                                ),
+        ]
+
+
+class PostSearchDocument(models.Model):
+    """
+        Weighted tsvector of a post, the PostgreSQL search index (see posts.search).
+        The table and its GIN index only exist on PostgreSQL, they are created
+        by migration 0012 and written with raw SQL, hence managed = False.
+    """
+    post = models.OneToOneField(
+                                Post,
+                                primary_key=True,
+                                related_name='search_document',
+                                on_delete=models.DO_NOTHING
+                            )
+    document = SearchVectorField()
+
+    def __str__(self):
+        return f"Search document of {self.post_id}"
+
+    class Meta:
+        managed = False
+        db_table = 'posts_post_search'
+
+
+class TrendingPost(models.Model):
+    """Time-decayed engagement score of a post, replaced by every posts.trending run."""
+    post = models.OneToOneField(
+                                Post,
+                                primary_key=True,
+                                related_name='trending',
+                                on_delete=models.CASCADE
+                            )
+    score = models.FloatField(verbose_name=_('Score'))
+
+    def __str__(self):
+        return f"Post {self.post_id} trending at {self.score:.2f}"
+
+    class Meta:
+        verbose_name = _("Trending post")
+        verbose_name_plural = _("Trending posts")
+        indexes = [
+            models.Index(fields=['-score', '-post']),
+        ]
+
+
+class TrendingTag(models.Model):
+    """Summed trending score of the posts of a tag, replaced by every posts.trending run."""
+    tag = models.OneToOneField(
+                                Tags,
+                                primary_key=True,
+                                related_name='trending',
+                                on_delete=models.CASCADE
+                            )
+    score = models.FloatField(verbose_name=_('Score'))
+
+    def __str__(self):
+        return f"Tag {self.tag_id} trending at {self.score:.2f}"
+
+    class Meta:
+        verbose_name = _("Trending tag")
+        verbose_name_plural = _("Trending tags")
+        indexes = [
+            models.Index(fields=['-score', '-tag']),
+        ]
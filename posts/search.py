@@ -0,0 +1,254 @@
+"""
+Full-text search of posts.
+
+Every post has a search document made of its title, content and tag titles,
+weighted in that order. The document lives next to the posts table in a
+backend specific index, kept current by the signals in posts.signals:
+
+    PostgresSearchBackend   tsvector column with a GIN index (posts_post_search)
+    SQLiteSearchBackend     FTS5 virtual table (posts_post_fts), for development
+
+search() narrows a posts queryset to the matching posts and annotates them
+with `search_rank` (higher is better, see SEARCH_ORDERING) and
+`search_headline`, an excerpt of the content where the matched terms are
+wrapped in HEADLINE_START/HEADLINE_STOP. Render it with the `highlight`
+filter from the posts_search template library, which escapes the content.
+"""
+import logging
+import re
+from functools import lru_cache
+from typing import Iterable, Optional, Sequence
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank, SearchVectorField
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.db.models import CharField, F, FloatField, Func, QuerySet, Value
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import Post, PostSearchDocument
+
+logger = logging.getLogger(__name__)
+
+# Private use characters, they can't come from user content and survive escaping
+HEADLINE_START = '\ue000'
+HEADLINE_STOP = '\ue001'
+
+SEARCH_ORDERING = ('-search_rank', '-pkid')
+
+# Document columns and their weight letter in the tsvector, in column order
+SEARCH_FIELDS = {'title': 'A', 'content': 'B', 'tags': 'C'}
+
+# The bm25 column weight standing for each tsvector weight letter
+BM25_WEIGHTS = {'A': 4.0, 'B': 2.0, 'C': 1.0, 'D': 0.5}
+
+BACKENDS = {
+    'postgresql': 'posts.search.PostgresSearchBackend',
+    'sqlite': 'posts.search.SQLiteSearchBackend',
+}
+
+
+class SearchBackend:
+    """Interface of the search index backends."""
+
+    def search(self, queryset: QuerySet, query: str, fields: Optional[Sequence[str]] = None) -> QuerySet:
+        """Posts of queryset matching query, in any of fields (default: all of SEARCH_FIELDS)."""
+        raise NotImplementedError
+
+    def index(self, post_pkids: Iterable[int]) -> None:
+        """(Re)build the search documents of the given posts."""
+        raise NotImplementedError
+
+    def remove(self, post_pkids: Iterable[int]) -> None:
+        raise NotImplementedError
+
+    def rebuild(self) -> None:
+        """Rebuild the documents of every post."""
+        raise NotImplementedError
+
+    @staticmethod
+    def check_fields(fields: Optional[Sequence[str]]) -> Sequence[str]:
+        fields = tuple(fields or SEARCH_FIELDS)
+        unknown = set(fields) - set(SEARCH_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown search fields: {', '.join(sorted(unknown))}")
+        return fields
+
+
+class TsFilter(Func):
+    """ts_filter(document, weights): the lexemes of a tsvector with the given weights."""
+    function = 'ts_filter'
+    template = '%(function)s(%(expressions)s::"char"[])'
+    output_field = SearchVectorField()
+
+
+class PostgresSearchBackend(SearchBackend):
+    """
+        Weighted tsvector per post in posts_post_search (PostSearchDocument),
+        matched with websearch_to_tsquery through its GIN index and ranked
+        with ts_rank.
+    """
+
+    def document_sql(self, where: str = '') -> str:
+        post_table = Post._meta.db_table
+        tags_table = Post.tags.through._meta.db_table
+        tag_table = Post.tags.field.related_model._meta.db_table
+        return f"""
+            SELECT post.pkid,
+                   setweight(to_tsvector(%(config)s, coalesce(post.title, '')), '{SEARCH_FIELDS['title']}')
+                   || setweight(to_tsvector(%(config)s, coalesce(post.content, '')), '{SEARCH_FIELDS['content']}')
+                   || setweight(to_tsvector(%(config)s, coalesce(string_agg(tag.title, ' '), '')),
+                                '{SEARCH_FIELDS['tags']}')
+            FROM {post_table} post
+            LEFT JOIN {tags_table} post_tag ON post_tag.post_id = post.pkid
+            LEFT JOIN {tag_table} tag ON tag.pkid = post_tag.tags_id
+            {where}
+            GROUP BY post.pkid
+        """
+
+    def upsert(self, where: str = '', params: Optional[dict] = None) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO posts_post_search (post_id, document)
+                {self.document_sql(where)}
+                ON CONFLICT (post_id) DO UPDATE SET document = EXCLUDED.document
+                """,
+                {'config': settings.POSTS_SEARCH_CONFIG, **(params or {})}
+            )
+
+    def index(self, post_pkids):
+        self.upsert('WHERE post.pkid = ANY(%(pkids)s)', {'pkids': list(post_pkids)})
+
+    def remove(self, post_pkids):
+        # Deleted posts take their row with them through ON DELETE CASCADE
+        PostSearchDocument.objects.filter(post_id__in=list(post_pkids)).delete()
+
+    def rebuild(self):
+        self.upsert()
+
+    def search(self, queryset, query, fields=None):
+        fields = self.check_fields(fields)
+        search_query = SearchQuery(query, search_type='websearch', config=settings.POSTS_SEARCH_CONFIG)
+        document = F('search_document__document')
+
+        queryset = queryset.filter(search_document__document=search_query)
+        if set(fields) != set(SEARCH_FIELDS):
+            weights = '{' + ','.join(SEARCH_FIELDS[field].lower() for field in fields) + '}'
+            # The plain match above is the one served by the GIN index
+            queryset = queryset.annotate(
+                search_document_fields=TsFilter(document, Value(weights))
+            ).filter(search_document_fields=search_query)
+
+        return queryset.annotate(
+            search_rank=SearchRank(document, search_query),
+            search_headline=SearchHeadline(
+                'content',
+                search_query,
+                config=settings.POSTS_SEARCH_CONFIG,
+                start_sel=HEADLINE_START,
+                stop_sel=HEADLINE_STOP,
+                max_words=settings.POSTS_SEARCH_HEADLINE_WORDS,
+                min_words=settings.POSTS_SEARCH_HEADLINE_WORDS // 2,
+            ),
+        )
+
+
+class SQLiteSearchBackend(SearchBackend):
+    """
+        FTS5 table posts_post_fts(title, content, tags) keyed by the post pkid,
+        ranked with bm25 and highlighted with snippet().
+    """
+    table = 'posts_post_fts'
+    # bm25 column weights, in the column order of the table, ranked like the tsvector weights
+    weights = tuple(BM25_WEIGHTS[letter] for letter in SEARCH_FIELDS.values())
+
+    def document_sql(self, where: str = '') -> str:
+        post_table = Post._meta.db_table
+        tags_table = Post.tags.through._meta.db_table
+        tag_table = Post.tags.field.related_model._meta.db_table
+        return f"""
+            SELECT post.pkid, coalesce(post.title, ''), coalesce(post.content, ''),
+                   coalesce(group_concat(tag.title, ' '), '')
+            FROM {post_table} post
+            LEFT JOIN {tags_table} post_tag ON post_tag.post_id = post.pkid
+            LEFT JOIN {tag_table} tag ON tag.pkid = post_tag.tags_id
+            {where}
+            GROUP BY post.pkid
+        """
+
+    def index(self, post_pkids):
+        post_pkids = list(post_pkids)
+        if not post_pkids:
+            return
+        placeholders = ', '.join(['%s'] * len(post_pkids))
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE rowid IN ({placeholders})", post_pkids)
+            cursor.execute(
+                f"INSERT INTO {self.table} (rowid, title, content, tags) "
+                f"{self.document_sql(f'WHERE post.pkid IN ({placeholders})')}",
+                post_pkids
+            )
+
+    def remove(self, post_pkids):
+        post_pkids = list(post_pkids)
+        if not post_pkids:
+            return
+        placeholders = ', '.join(['%s'] * len(post_pkids))
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE rowid IN ({placeholders})", post_pkids)
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table}")
+            cursor.execute(f"INSERT INTO {self.table} (rowid, title, content, tags) {self.document_sql()}")
+
+    @staticmethod
+    def match_expression(query: str, fields: Sequence[str]) -> str:
+        """
+            An FTS5 query matching every word of query, restricted to fields.
+            Words are quoted, so the FTS5 operators and syntax errors can't
+            come from user input.
+        """
+        words = re.findall(r'\w+', query)
+        if not words:
+            return ''
+        terms = ' '.join(f'"{word}"' for word in words)
+        return f"{{{' '.join(fields)}}} : ({terms})"
+
+    def search(self, queryset, query, fields=None):
+        fields = self.check_fields(fields)
+        match = self.match_expression(query, fields)
+        if not match:
+            # Annotated all the same, the results are still paginated by SEARCH_ORDERING
+            return queryset.none().annotate(
+                search_rank=Value(0.0, output_field=FloatField()),
+                search_headline=Value('', output_field=CharField()),
+            )
+
+        post_column = f"{connection.ops.quote_name(Post._meta.db_table)}.{connection.ops.quote_name('pkid')}"
+        matching = f"FROM {self.table} WHERE {self.table} MATCH %s AND rowid = {post_column}"
+        weights = ', '.join(str(weight) for weight in self.weights)
+        return queryset.filter(
+            pkid__in=RawSQL(f"SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s", [match])
+        ).annotate(
+            # bm25 is lower for better matches
+            search_rank=RawSQL(f"SELECT -bm25({self.table}, {weights}) {matching}", [match]),
+            search_headline=RawSQL(
+                f"SELECT snippet({self.table}, 1, %s, %s, '…', %s) {matching}",
+                [HEADLINE_START, HEADLINE_STOP, settings.POSTS_SEARCH_HEADLINE_WORDS, match]
+            ),
+        )
+
+
+@lru_cache(maxsize=None)
+def get_backend() -> SearchBackend:
+    try:
+        return import_string(BACKENDS[connection.vendor])()
+    except KeyError:
+        raise ImproperlyConfigured(f"Posts search has no backend for the {connection.vendor} database")
+
+
+def search(queryset: QuerySet, query: str, fields: Optional[Sequence[str]] = None) -> QuerySet:
+    return get_backend().search(queryset, query, fields)
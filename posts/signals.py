@@ -0,0 +1,105 @@
+import logging
+
+from django.db import transaction
+from django.dispatch import receiver
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
+
+from comments.models import Comment
+from common.cache import bump_cache_version
+from followers.models import UserFollowing
+from likes.models import Reaction
+from . import search, timeline
+from .models import Post, Tags
+from .utils import POSTS_PAGES_CACHE_VERSION, post_page_cache_version
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=Post)
+@receiver(pre_delete, sender=Post)
+def invalidate_posts_pages(sender, instance, **kwargs):
+    """A post change can show up on any list page and renames its detail page, drop them all."""
+    bump_cache_version(POSTS_PAGES_CACHE_VERSION)
+    logger.debug(f"Posts page cache invalidated by {instance}")
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def invalidate_posts_pages_on_tags(sender, instance, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_cache_version(POSTS_PAGES_CACHE_VERSION)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(pre_delete, sender=Comment)
+@receiver(post_save, sender=Reaction)
+@receiver(pre_delete, sender=Reaction)
+def invalidate_post_detail_page(sender, instance, **kwargs):
+    """Comments and reactions only change the detail page of their post."""
+    if instance.post_id is None:
+        return
+    if kwargs['signal'] is pre_delete and not instance.is_active:
+        # Hard delete of a soft-deleted row (purge_soft_deleted), its page was
+        # invalidated by the soft delete already
+        return
+    bump_cache_version(post_page_cache_version(instance.post.slug))
+
+
+@receiver(post_save, sender=Post)
+def fan_out_new_post(sender, instance, created, **kwargs):
+    if not created:
+        return
+    transaction.on_commit(lambda: timeline.fan_out_post(instance))
+
+
+@receiver(post_save, sender=UserFollowing)
+def backfill_timeline_on_follow(sender, instance, created, update_fields=None, **kwargs):
+    # A follow is created, or reactivated by SocialGraph.follow after an unfollow
+    reactivated = instance.is_active and update_fields is not None and 'is_active' in update_fields
+    if not (created or reactivated):
+        return
+    transaction.on_commit(
+        lambda: timeline.backfill_timeline(instance.user_id, instance.following_user_id)
+    )
+
+
+@receiver(pre_delete, sender=UserFollowing)
+def clean_timeline_on_unfollow(sender, instance, **kwargs):
+    timeline.remove_from_timeline(instance.user_id, instance.following_user_id)
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, update_fields=None, **kwargs):
+    if update_fields and not {'title', 'content'} & set(update_fields):
+        return
+    search.get_backend().index([instance.pkid])
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search.get_backend().remove([instance.pkid])
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def index_post_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    """Reindex the posts whose tags changed, from either side of the relation."""
+    if reverse and action == 'pre_clear':
+        # post_clear has no pk_set, remember the posts losing the tag
+        instance._cleared_post_pkids = list(instance.post_set.values_list('pkid', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        post_pkids = [instance.pkid]
+    elif action == 'post_clear':
+        post_pkids = instance.__dict__.pop('_cleared_post_pkids', [])
+    else:
+        post_pkids = pk_set
+    search.get_backend().index(post_pkids)
+
+
+@receiver(post_save, sender=Tags)
+def index_tag_posts(sender, instance, created, **kwargs):
+    """A renamed tag changes the documents of its posts."""
+    if not created:
+        search.get_backend().index(instance.post_set.values_list('pkid', flat=True))
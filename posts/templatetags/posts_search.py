@@ -0,0 +1,16 @@
+from django import template
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from posts.search import HEADLINE_START, HEADLINE_STOP
+
+register = template.Library()
+
+
+@register.filter
+def highlight(headline):
+    """Escape a search_headline and wrap its matched terms in <mark>."""
+    if not headline:
+        return ''
+    html = escape(headline).replace(HEADLINE_START, '<mark>').replace(HEADLINE_STOP, '</mark>')
+    return mark_safe(html)
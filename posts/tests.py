@@ -1,15 +1,34 @@
 from django.test import TestCase, RequestFactory, Client
+from django.test import override_settings
 from django.urls import reverse
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.contrib.sessions.backends.cache import SessionStore
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.exceptions import PermissionDenied
+from django.core.cache import cache
+from django.core.management import call_command
 from django.db import transaction
+from django.middleware.csrf import get_token
+from django.utils import timezone
+from django.utils.text import slugify
 
 from posts.models import Post, Tags
 from posts.views import PostsListView, CreatePostView, PostDetailView, PostUpdateView, PostDeleteView
+from posts.utils import search_posts, update_post_counters
+from posts.filters import PostsFilter
+from common.pagination import CursorPaginator
+from posts.models import TimelineEntry, TrendingPost, TrendingTag
+from posts import search, timeline, trending
+from followers.models import UserFollowing
 from comments.models import Comment
+from likes.models import Reaction, ReactionKind
+from likes.reactions import react
 
 import tempfile
+from datetime import timedelta
+from io import StringIO
 import shutil
 from PIL import Image
 import os
@@ -88,7 +107,7 @@ class TestPostsViews(TestCase):
         # Use the test client to log in
         self.client.force_login(
             user if user else self.user,
-            backend='allauth.account.auth_backends.AuthenticationBackend'
+            backend='users.backends.CachedAuthenticationBackend'
         )
 
         self.assertEqual(request.user.is_authenticated, True)
@@ -282,9 +301,12 @@ class TestPostsViews(TestCase):
         self.assertTrue('is_paginated' in response.context)
         self.assertTrue(response.context['is_paginated'] == True)
         
-        # Second page should have the remaining posts
-        response = self.client.get(reverse('posts:posts-list') + '?page=2')
-        self.assertEqual(len(response.context['posts']), 11)  # 16 total - 5 on first page
+        # Following the next cursor gives the following 5 posts, without overlap
+        first_page = list(response.context['posts'])
+        next_cursor = response.context['page_obj'].next_cursor
+        response = self.client.get(reverse('posts:posts-list') + f'?after={next_cursor}')
+        self.assertEqual(len(response.context['posts']), 5)
+        self.assertFalse(set(first_page) & set(response.context['posts']))
 
     def test_invalid_post_handling(self):
         """Test handling of non-existent posts."""
@@ -300,3 +322,436 @@ class TestPostsViews(TestCase):
         # Test non-existent post delete
         response = self.client.get(reverse('posts:post-delete', kwargs={'slug': 'non-existent'}))
         self.assertEqual(response.status_code, 404)
+
+
+class TestPostCounters(TestCase):
+    def setUp(self):
+        self.user = User._default_manager.create_user(
+            username='counteruser',
+            email='counter@example.com',
+            password='testpass123'
+        )
+        self.other_user = User._default_manager.create_user(
+            username='counteruser2',
+            email='counter2@example.com',
+            password='testpass123'
+        )
+        # bulk_create skips Post.save, which expects the view kwargs
+        self.post = Post.objects.bulk_create([
+            Post(title='Counted Post', slug='counted-post', author=self.user)
+        ])[0]
+
+    def test_update_post_counters_applies_deltas(self):
+        update_post_counters(self.post.pkid, like_count=2, comment_count=1)
+        update_post_counters(self.post.pkid, like_count=-1, dislike_count=-1)
+        self.post.refresh_from_db()
+
+        self.assertEqual(self.post.like_count, 1)
+        self.assertEqual(self.post.dislike_count, 0)  # never below zero
+        self.assertEqual(self.post.comment_count, 1)
+
+    def test_deleting_reaction_decrements_counter(self):
+        react(self.user, self.post.slug, ReactionKind.LIKE)
+
+        react(self.user, self.post.slug, ReactionKind.LIKE, active=False)
+        react(self.user, self.post.slug, ReactionKind.LIKE, active=False)  # already soft-deleted
+        self.post.refresh_from_db()
+
+        self.assertEqual(self.post.like_count, 0)
+
+    def test_recount_post_counters_command(self):
+        Reaction.objects.create(author=self.user, post=self.post, kind=ReactionKind.LIKE)
+        Reaction.objects.create(author=self.other_user, post=self.post, kind=ReactionKind.DISLIKE)
+        Reaction.objects.create(
+            author=User._default_manager.create_user(
+                username='counteruser3', email='counter3@example.com', password='testpass123'
+            ),
+            post=self.post,
+            kind=ReactionKind.LIKE,
+            is_active=False
+        )
+        Comment.objects.create(post=self.post, author=self.user, title='First')
+        Post.objects.filter(pkid=self.post.pkid).update(like_count=42)
+
+        call_command('recount_post_counters', stdout=StringIO())
+        self.post.refresh_from_db()
+
+        self.assertEqual(self.post.like_count, 1)
+        self.assertEqual(self.post.dislike_count, 1)
+        self.assertEqual(self.post.comment_count, 1)
+
+
+class TestCursorPagination(TestCase):
+    def setUp(self):
+        self.user = User._default_manager.create_user(
+            username='cursoruser',
+            email='cursor@example.com',
+            password='testpass123'
+        )
+        Post.objects.bulk_create([
+            Post(title=f'Cursor Post {i}', slug=f'cursor-post-{i}', author=self.user)
+            for i in range(12)
+        ])
+        # Pairs of posts share a timestamp so the pkid tie-breaker is exercised
+        now = timezone.now()
+        for index, post in enumerate(Post.objects.order_by('pkid')):
+            Post.objects.filter(pkid=post.pkid).update(
+                created_at=now - timedelta(minutes=index // 2)
+            )
+        self.expected = list(Post.published.order_by('-created_at', '-pkid'))
+
+    def test_walk_forward_and_back(self):
+        paginator = CursorPaginator(Post.published.all(), 5)
+
+        pages = [paginator.page()]
+        while pages[-1].has_next():
+            pages.append(paginator.page(after=pages[-1].next_cursor))
+
+        self.assertEqual([len(page) for page in pages], [5, 5, 2])
+        self.assertEqual([post for page in pages for post in page], self.expected)
+        self.assertFalse(pages[0].has_previous())
+
+        previous = paginator.page(before=pages[-1].previous_cursor)
+        self.assertEqual(list(previous), list(pages[1]))
+        self.assertTrue(previous.has_next())
+
+    def test_page_query_does_not_depend_on_depth(self):
+        paginator = CursorPaginator(Post.published.all(), 5)
+        cursor = paginator.encode_cursor(self.expected[-3])
+
+        with self.assertNumQueries(1):
+            page = paginator.page(after=cursor)
+        self.assertEqual(list(page), self.expected[-2:])
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        response = self.client.get(reverse('posts:posts-list') + '?after=not-a-cursor')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['posts']), self.expected[:5])
+
+
+class TestAnonymousPageCache(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User._default_manager.create_user(
+            username='cacheuser',
+            email='cache@example.com',
+            password='testpass123',
+            is_active=True
+        )
+        self.post = Post.objects.bulk_create([
+            Post(title='Cached Post', slug='cached-post', author=self.user)
+        ])[0]
+        self.url = reverse('posts:post-detail', kwargs={'slug': self.post.slug})
+
+    def test_anonymous_detail_page_is_served_from_cache(self):
+        first = self.client.get(self.url)
+
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url)
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.content, second.content)
+
+    def test_cached_page_has_no_csrf_token(self):
+        response = self.client.get(self.url)
+
+        self.assertNotIn(b'csrfmiddlewaretoken', response.content)
+        self.assertNotIn(b'X-CSRFToken', response.content)
+
+    def test_page_using_a_csrf_token_is_not_cached(self):
+        request = RequestFactory().get(self.url)
+        request.user = AnonymousUser()
+        request.session = SessionStore()
+        request._messages = FallbackStorage(request)
+        view = PostDetailView()
+        view.setup(request, slug=self.post.slug)
+        key = view.get_page_cache_key()
+        # As a {% csrf_token %} in the page would
+        get_token(request)
+
+        view.dispatch(request, slug=self.post.slug).render()
+
+        self.assertIsNone(cache.get(key))
+
+    def test_unknown_query_parameters_share_the_cached_page(self):
+        self.client.get(self.url, {'page': 1})
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, {'page': 1, 'x': 'random'})
+
+        self.assertEqual(response.status_code, 200)
+        # The comments page is part of the key
+        self.assertIsNotNone(self.client.get(self.url, {'page': 2}).context)
+
+    def test_reaction_invalidates_detail_page(self):
+        self.client.get(self.url)
+        Reaction.objects.create(author=self.user, post=self.post, kind=ReactionKind.LIKE)
+
+        response = self.client.get(self.url)
+
+        # Re-rendered rather than served from the cache
+        self.assertIsNotNone(response.context)
+
+    def test_authenticated_pages_are_not_cached(self):
+        self.client.force_login(self.user)
+        self.client.get(self.url)
+
+        response = self.client.get(self.url)
+
+        self.assertIsNotNone(response.context)
+
+
+class TestTimeline(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User._default_manager.create_user(
+            username='timelineauthor',
+            email='timelineauthor@example.com',
+            password='testpass123'
+        )
+        self.reader = User._default_manager.create_user(
+            username='timelinereader',
+            email='timelinereader@example.com',
+            password='testpass123',
+            is_active=True
+        )
+        self.old_post = self._create_post('Before follow')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.following = UserFollowing.objects.create(
+                user=self.reader,
+                following_user=self.author
+            )
+
+    def _create_post(self, title):
+        # bulk_create skips Post.save, which expects the view kwargs
+        return Post.objects.bulk_create([
+            Post(title=title, slug=slugify(title), author=self.author)
+        ])[0]
+
+    def test_follow_backfills_and_new_posts_fan_out(self):
+        new_post = self._create_post('After follow')
+        self.assertEqual(timeline.fan_out_post(new_post), 1)
+
+        self.assertEqual(
+            set(TimelineEntry.objects.filter(owner=self.reader).values_list('post_id', flat=True)),
+            {self.old_post.pkid, new_post.pkid}
+        )
+        self.assertEqual(
+            list(timeline.timeline_queryset(self.reader)),
+            list(Post.published.filter(pkid__in=[self.old_post.pkid, new_post.pkid]))
+        )
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_large_accounts_are_merged_on_read(self):
+        new_post = self._create_post('Large account post')
+
+        self.assertEqual(timeline.fan_out_post(new_post), 0)
+        self.assertFalse(TimelineEntry.objects.filter(post=new_post).exists())
+        self.assertIn(new_post, timeline.timeline_queryset(self.reader))
+
+    def test_unfollow_removes_posts_from_timeline(self):
+        self.following.delete()
+
+        self.assertFalse(TimelineEntry.objects.filter(owner=self.reader).exists())
+
+    def test_trim_keeps_newest_entries(self):
+        posts = [self._create_post(f'Trim {i}') for i in range(3)]
+        timeline.push_to_timelines([self.reader.pkid], [post.pkid for post in posts])
+
+        self.assertEqual(timeline.trim_timelines(max_length=2), 2)
+        self.assertEqual(
+            set(TimelineEntry.objects.filter(owner=self.reader).values_list('post_id', flat=True)),
+            {posts[1].pkid, posts[2].pkid}
+        )
+
+    def test_timeline_view(self):
+        self.client.force_login(self.reader)
+        response = self.client.get(reverse('posts:timeline'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['posts']), [self.old_post])
+
+
+class TestPostSearch(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User._default_manager.create_user(
+            username='searchauthor',
+            email='searchauthor@example.com',
+            password='testpass123'
+        )
+        self.tag = Tags.objects.create(title='mountains')
+        # bulk_create skips Post.save, which expects the view kwargs
+        self.title_match, self.content_match, self.other = Post.objects.bulk_create([
+            Post(title='Alpine lakes', slug='alpine-lakes', author=self.author,
+                 content='A long walk between the lakes'),
+            Post(title='Weekend', slug='weekend', author=self.author,
+                 content='We walked to the alpine <b>lakes</b> and back'),
+            Post(title='City break', slug='city-break', author=self.author,
+                 content='Museums all day'),
+        ])
+        call_command('rebuild_search_index', stdout=StringIO())
+
+    def test_results_are_ranked(self):
+        results = list(search.search(Post.published.all(), 'alpine lakes').order_by(*search.SEARCH_ORDERING))
+
+        self.assertEqual(results, [self.title_match, self.content_match])
+        self.assertGreater(results[0].search_rank, results[1].search_rank)
+
+    def test_content_ranks_above_tags(self):
+        # bulk_create skips Post.save, which expects the view kwargs
+        in_content, in_tags = Post.objects.bulk_create([
+            Post(title='Sunday', slug='sunday', author=self.author, content='Harbour'),
+            Post(title='Monday', slug='monday', author=self.author, content='Quiet'),
+        ])
+        in_tags.tags.add(Tags.objects.create(title='harbour'))
+        call_command('rebuild_search_index', stdout=StringIO())
+
+        results = list(search.search(Post.published.all(), 'harbour').order_by(*search.SEARCH_ORDERING))
+
+        self.assertEqual(results, [in_content, in_tags])
+        self.assertGreater(results[0].search_rank, results[1].search_rank)
+
+    def test_stemmed_and_malformed_queries(self):
+        self.assertCountEqual(search.search(Post.published.all(), 'walking'), [self.title_match, self.content_match])
+        self.assertEqual(list(search.search(Post.published.all(), 'museum" (')), [self.other])
+        self.assertFalse(search.search(Post.published.all(), '"()*').exists())
+
+    def test_search_keeps_the_incoming_queryset(self):
+        posts, search_query = search_posts(
+            RequestFactory().get('/', {'search_query': 'lakes'}),
+            Post.published.exclude(pkid=self.title_match.pkid)
+        )
+
+        self.assertEqual(search_query, 'lakes')
+        self.assertEqual(list(posts), [self.content_match])
+
+    def test_index_follows_post_and_tag_changes(self):
+        self.other.content = 'Museums and a view of the mountains'
+        # save_base sends post_save without Post.save, which expects the view kwargs
+        self.other.save_base()
+        self.assertEqual(list(search.search(Post.published.all(), 'view')), [self.other])
+
+        self.content_match.tags.add(self.tag)
+        self.assertEqual(
+            list(search.search(Post.published.all(), 'mountains', fields=['tags'])),
+            [self.content_match]
+        )
+
+        self.tag.title = 'peaks'
+        self.tag.save()
+        self.assertEqual(list(search.search(Post.published.all(), 'peaks')), [self.content_match])
+
+        self.tag.post_set.clear()
+        self.assertFalse(search.search(Post.published.all(), 'peaks').exists())
+
+        Post.objects.filter(pkid=self.other.pkid).delete()
+        self.assertFalse(search.search(Post.objects.all(), 'museums').exists())
+
+    def test_filter_searches_one_field(self):
+        filter = PostsFilter({'content': 'alpine'}, queryset=Post.published.all())
+
+        self.assertEqual(list(filter.qs), [self.content_match])
+
+    def test_search_view_pages_by_rank_with_escaped_highlights(self):
+        url = reverse('posts:posts-list')
+        response = self.client.get(url, {'search_query': 'alpine lakes'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['posts']), [self.title_match, self.content_match])
+        self.assertContains(response, '<mark>alpine</mark> &lt;b&gt;<mark>lakes</mark>&lt;/b&gt;', html=False)
+
+    def test_punctuation_only_query_pages_an_empty_result(self):
+        self.assertEqual(list(search.search(Post.published.all(), '!!!').order_by(*search.SEARCH_ORDERING)), [])
+
+        response = self.client.get(reverse('posts:posts-list'), {'search_query': '!!!'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['posts']), [])
+
+
+@override_settings(TRENDING_HALF_LIFE_HOURS=12, TRENDING_WINDOW_HOURS=72,
+                   TRENDING_WEIGHTS={'like': 1.0, 'dislike': 0.5, 'comment': 2.0})
+class TestTrending(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User._default_manager.create_user(
+            username='trendauthor', email='trendauthor@example.com', password='testpass123',
+            first_name='Trend', last_name='Author', is_active=True
+        )
+        self.fans = User._default_manager.bulk_create([
+            User(username=f'fan{i}', email=f'fan{i}@example.com') for i in range(3)
+        ])
+        # bulk_create skips Post.save, which expects the view kwargs
+        self.fresh, self.stale, self.quiet = Post.objects.bulk_create([
+            Post(title=title, slug=slugify(title), author=self.author)
+            for title in ('Fresh', 'Stale', 'Quiet')
+        ])
+        self.tag = Tags.objects.create(title='hiking')
+        self.fresh.tags.add(self.tag)
+        self.stale.tags.add(self.tag)
+
+        Reaction.objects.bulk_create([
+            *(Reaction(author=fan, post=post, kind=ReactionKind.LIKE)
+              for fan in self.fans for post in (self.fresh, self.stale)),
+            Reaction(author=self.author, post=self.fresh, kind=ReactionKind.DISLIKE),
+            Reaction(author=self.author, post=self.quiet, kind=ReactionKind.LIKE),
+        ])
+        Comment.objects.create(post=self.stale, author=self.author, title='Old news')
+        # A day old, two half-lives
+        Reaction.objects.filter(post=self.stale).update(updated_at=timezone.now() - timedelta(hours=24))
+        Comment.objects.filter(post=self.stale).update(created_at=timezone.now() - timedelta(hours=24))
+        # Outside the window
+        Reaction.objects.filter(post=self.quiet).update(updated_at=timezone.now() - timedelta(hours=100))
+
+    def test_scores_decay_with_age(self):
+        with self.assertNumQueries(1):
+            scores = trending.score_posts()
+
+        self.assertEqual(set(scores), {self.fresh.pkid, self.stale.pkid})
+        # Bucketed by the hour, so within the decay of an hour of the exact values
+        self.assertAlmostEqual(scores[self.fresh.pkid], 3.5, delta=0.25)
+        self.assertAlmostEqual(scores[self.stale.pkid], 5 / 4, delta=0.1)
+
+    def test_compute_trending_command_ranks_posts_and_tags(self):
+        call_command('compute_trending', stdout=StringIO())
+
+        self.assertEqual(
+            list(TrendingPost.objects.order_by(*trending.POSTS_ORDERING).values_list('post_id', flat=True)),
+            [self.fresh.pkid, self.stale.pkid]
+        )
+        tag = TrendingTag.objects.get()
+        self.assertEqual(tag.tag, self.tag)
+        self.assertAlmostEqual(tag.score, sum(TrendingPost.objects.values_list('score', flat=True)))
+
+    def test_trending_views_are_cursor_paginated_and_cached(self):
+        trending.compute_trending()
+        url = reverse('posts:trending-posts')
+        self.client.force_login(self.author)
+
+        response = self.client.get(url)
+        TrendingPost.objects.filter(post=self.stale).delete()
+        cached = self.client.get(url)
+
+        self.assertEqual([entry.post for entry in response.context['trending']], [self.fresh, self.stale])
+        self.assertEqual([entry.post for entry in cached.context['trending']], [self.fresh, self.stale])
+
+        # A new run invalidates the cached pages
+        trending.compute_trending()
+        self.assertEqual(len(self.client.get(url).context['trending']), 2)
+
+        response = self.client.get(reverse('posts:trending-tags'))
+        self.assertContains(response, '#hiking')
+
+    def test_trending_pages(self):
+        trending.compute_trending()
+        queryset = trending.trending_posts()
+
+        first = trending.trending_page(queryset, trending.POSTS_ORDERING, 1)
+        second = trending.trending_page(queryset, trending.POSTS_ORDERING, 1, after=first.next_cursor)
+        invalid = trending.trending_page(queryset, trending.POSTS_ORDERING, 1, after='garbage')
+
+        self.assertEqual([entry.post for entry in first], [self.fresh])
+        self.assertEqual([entry.post for entry in second], [self.stale])
+        self.assertFalse(second.has_next())
+        self.assertEqual([entry.post for entry in invalid], [self.fresh])
@@ -0,0 +1,189 @@
+"""
+Home timeline: posts of the users someone follows.
+
+Posts are pushed into a bounded per-follower TimelineEntry table when they are
+created (fan-out on write), so reading a timeline never joins the follow graph.
+Authors with more than TIMELINE_FANOUT_LIMIT followers are skipped on write and
+merged in on read instead (fan-out on read), so one post from a large account
+doesn't turn into millions of inserts.
+"""
+import logging
+from typing import Iterable, List
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Exists, OuterRef, Q, QuerySet
+
+from followers.models import UserFollowing
+from .models import Post, TimelineEntry
+
+logger = logging.getLogger(__name__)
+
+PULL_AUTHORS_CACHE_TIMEOUT = 60 * 5
+
+
+def pull_authors_cache_key(user_pkid) -> str:
+    return f'timeline:pull-authors:{user_pkid}'
+
+
+def _followers(author_pkid) -> QuerySet:
+    return UserFollowing.objects.filter(following_user_id=author_pkid, is_active=True)
+
+
+def has_large_following(author_pkid) -> bool:
+    """True when the author has more than TIMELINE_FANOUT_LIMIT followers (bounded index scan)."""
+    limit = settings.TIMELINE_FANOUT_LIMIT
+    return _followers(author_pkid).order_by().values('pkid')[limit:limit + 1].exists()
+
+
+def get_pull_author_ids(user) -> List[int]:
+    """Followed authors that are too large to fan out, their posts are merged in on read."""
+    key = pull_authors_cache_key(user.pkid)
+    author_ids = cache.get(key)
+    if author_ids is None:
+        limit = settings.TIMELINE_FANOUT_LIMIT
+        over_limit = (
+            UserFollowing.objects
+            .filter(following_user=OuterRef('following_user'), is_active=True)
+            .order_by()
+            .values('pkid')[limit:limit + 1]
+        )
+        author_ids = list(
+            UserFollowing.objects
+            .filter(user=user, is_active=True)
+            .filter(Exists(over_limit))
+            .values_list('following_user_id', flat=True)
+        )
+        cache.set(key, author_ids, PULL_AUTHORS_CACHE_TIMEOUT)
+    return author_ids
+
+
+def push_to_timelines(owner_ids: Iterable[int], post_ids: Iterable[int]) -> None:
+    """Insert timeline entries in batches, entries that already exist are skipped."""
+    batch_size = settings.TIMELINE_FANOUT_BATCH_SIZE
+    entries = [
+        TimelineEntry(owner_id=owner_id, post_id=post_id)
+        for owner_id in owner_ids
+        for post_id in post_ids
+    ]
+    TimelineEntry.objects.bulk_create(entries, batch_size=batch_size, ignore_conflicts=True)
+
+
+def fan_out_post(post: Post) -> int:
+    """Push a new post into the timelines of its author's followers."""
+    if has_large_following(post.author_id):
+        logger.info(f"Post {post.pkid} not fanned out, author {post.author_id} is read on pull")
+        return 0
+
+    follower_ids = list(_followers(post.author_id).values_list('user_id', flat=True))
+    push_to_timelines(follower_ids, [post.pkid])
+    logger.debug(f"Post {post.pkid} fanned out to {len(follower_ids)} timelines")
+    return len(follower_ids)
+
+
+def backfill_timeline(user_pkid, author_pkid) -> None:
+    """Copy the author's latest posts into a new follower's timeline."""
+    cache.delete(pull_authors_cache_key(user_pkid))
+    if has_large_following(author_pkid):
+        return
+
+    post_ids = list(
+        Post.published
+        .filter(author_id=author_pkid)
+        .order_by('-created_at', '-pkid')
+        .values_list('pkid', flat=True)[:settings.TIMELINE_BACKFILL]
+    )
+    push_to_timelines([user_pkid], post_ids)
+
+
+def backfill_timeline_many(user_pkid, author_pkids: Iterable[int]) -> None:
+    """
+        Backfill after a bulk follow: the newest posts of all the new authors
+        in one query, capped at TIMELINE_MAX_LENGTH instead of TIMELINE_BACKFILL
+        per author. Large accounts are left to the read side as usual.
+    """
+    cache.delete(pull_authors_cache_key(user_pkid))
+    author_pkids = set(author_pkids)
+    limit = settings.TIMELINE_FANOUT_LIMIT
+    over_limit = (
+        UserFollowing.objects
+        .filter(following_user=OuterRef('following_user'), is_active=True)
+        .order_by()
+        .values('pkid')[limit:limit + 1]
+    )
+    large_authors = set(
+        UserFollowing.objects
+        .filter(user_id=user_pkid, following_user_id__in=author_pkids, is_active=True)
+        .filter(Exists(over_limit))
+        .values_list('following_user_id', flat=True)
+    )
+
+    post_ids = list(
+        Post.published
+        .filter(author_id__in=author_pkids - large_authors)
+        .order_by('-created_at', '-pkid')
+        .values_list('pkid', flat=True)[:settings.TIMELINE_MAX_LENGTH]
+    )
+    push_to_timelines([user_pkid], post_ids)
+
+
+def remove_from_timeline(user_pkid, author_pkid) -> None:
+    """Drop an unfollowed author's posts from the user's timeline."""
+    cache.delete(pull_authors_cache_key(user_pkid))
+    TimelineEntry.objects.filter(owner_id=user_pkid, post__author_id=author_pkid).delete()
+
+
+def remove_authors_from_timeline(user_pkid, author_pkids: Iterable[int]) -> None:
+    """remove_from_timeline for a bulk unfollow, in one DELETE."""
+    cache.delete(pull_authors_cache_key(user_pkid))
+    TimelineEntry.objects.filter(owner_id=user_pkid, post__author_id__in=list(author_pkids)).delete()
+
+
+def trim_timelines(max_length=None) -> int:
+    """Keep only the newest max_length entries of every timeline, returns the rows removed."""
+    max_length = max_length or settings.TIMELINE_MAX_LENGTH
+    overflowing = (
+        TimelineEntry.objects
+        .values('owner_id')
+        .annotate(total=Count('pkid'))
+        .filter(total__gt=max_length)
+        .values_list('owner_id', flat=True)
+    )
+
+    removed = 0
+    for owner_id in list(overflowing):
+        oldest_kept = (
+            TimelineEntry.objects
+            .filter(owner_id=owner_id)
+            .order_by('-post_id')
+            .values_list('post_id', flat=True)[max_length - 1]
+        )
+        deleted, _ = TimelineEntry.objects.filter(
+            owner_id=owner_id,
+            post_id__lt=oldest_kept,
+        ).delete()
+        removed += deleted
+    return removed
+
+
+def timeline_queryset(user) -> QuerySet:
+    """
+        Posts of the user's timeline: the newest pushed entries, the posts of
+        followed large accounts and the user's own posts.
+    """
+    pushed = (
+        TimelineEntry.objects
+        .filter(owner=user)
+        .order_by('-post_id')
+        .values('post_id')[:settings.TIMELINE_MAX_LENGTH]
+    )
+    return (
+        Post.published
+        .filter(
+            Q(pkid__in=pushed) |
+            Q(author_id__in=get_pull_author_ids(user)) |
+            Q(author=user)
+        )
+        .select_related('author')
+        .prefetch_related('tags')
+    )
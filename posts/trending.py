@@ -0,0 +1,156 @@
+"""
+Trending posts and tags.
+
+A post's score is its engagement over the last TRENDING_WINDOW_HOURS with
+exponential time decay: every like, dislike and comment counts its weight
+from TRENDING_WEIGHTS, halved for every TRENDING_HALF_LIFE_HOURS of age.
+A tag scores the sum of its posts' scores.
+
+The compute_trending command (run it from cron) reads the window with one
+statement: per event source a GROUP BY (post, hour) count, the three glued
+with UNION ALL. The decay is applied per hour bucket in Python, and the best
+TRENDING_MAX_POSTS posts and TRENDING_MAX_TAGS tags replace the TrendingPost
+and TrendingTag tables. The trending pages read only those tables, keyset
+paginated on (score, pk) and cached until the next run.
+"""
+import hashlib
+import heapq
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, QuerySet, Value
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from common.cache import bump_cache_version, get_cache_versions
+from common.pagination import CursorPage, CursorPaginator, InvalidCursor
+from .models import Post, TrendingPost, TrendingTag
+
+logger = logging.getLogger(__name__)
+
+# Version key of the cached trending pages, bumped by every run
+TRENDING_CACHE_VERSION = 'trending:version'
+
+
+class EventSource(NamedTuple):
+    model_label: str
+    filters: Dict[str, str]
+    # A reaction counts from when it was last set, a comment from when it was written
+    time_field: str
+
+    def queryset(self, since: datetime) -> QuerySet:
+        return apps.get_model(self.model_label).objects.filter(
+            **self.filters, **{f'{self.time_field}__gte': since}, is_active=True, post__is_active=True
+        )
+
+
+EVENT_SOURCES = {
+    'like': EventSource('likes.Reaction', {'kind': 'like'}, 'updated_at'),
+    'dislike': EventSource('likes.Reaction', {'kind': 'dislike'}, 'updated_at'),
+    'comment': EventSource('comments.Comment', {}, 'created_at'),
+}
+
+POSTS_ORDERING = ('-score', '-post_id')
+TAGS_ORDERING = ('-score', '-tag_id')
+
+
+def decay(age: timedelta) -> float:
+    return 0.5 ** (age.total_seconds() / 3600 / settings.TRENDING_HALF_LIFE_HOURS)
+
+
+def event_counts(since: datetime) -> QuerySet:
+    """(post_id, hour, events, kind) rows of every event table since `since`, as one UNION ALL."""
+    counts = [
+        source.queryset(since)
+        .order_by()
+        .annotate(hour=TruncHour(source.time_field))
+        .values('post_id', 'hour')
+        .annotate(events=Count('pkid'), kind=Value(kind))
+        .values_list('post_id', 'hour', 'events', 'kind')
+        for kind, source in EVENT_SOURCES.items()
+    ]
+    return counts[0].union(*counts[1:], all=True)
+
+
+def score_posts(now: Optional[datetime] = None) -> Dict[int, float]:
+    now = now or timezone.now()
+    since = now - timedelta(hours=settings.TRENDING_WINDOW_HOURS)
+    weights = settings.TRENDING_WEIGHTS
+
+    scores = defaultdict(float)
+    for post_pkid, hour, events, kind in event_counts(since):
+        # Events of a bucket are aged from the middle of their hour
+        scores[post_pkid] += weights[kind] * events * decay(now - hour - timedelta(minutes=30))
+    return scores
+
+
+def score_tags(post_scores: Dict[int, float], batch_size: int = 500) -> Dict[int, float]:
+    scores = defaultdict(float)
+    post_pkids = list(post_scores)
+    PostTags = Post.tags.through
+    for start in range(0, len(post_pkids), batch_size):
+        rows = (
+            PostTags.objects
+            .filter(post_id__in=post_pkids[start:start + batch_size], tags__is_active=True)
+            .values_list('post_id', 'tags_id')
+        )
+        for post_pkid, tag_pkid in rows:
+            scores[tag_pkid] += post_scores[post_pkid]
+    return scores
+
+
+def compute_trending(now: Optional[datetime] = None) -> Tuple[int, int]:
+    """Rebuild the trending tables, returns the number of posts and tags ranked."""
+    post_scores = score_posts(now)
+    tag_scores = score_tags(post_scores)
+
+    top_posts = heapq.nlargest(settings.TRENDING_MAX_POSTS, post_scores.items(), key=lambda item: item[1])
+    top_tags = heapq.nlargest(settings.TRENDING_MAX_TAGS, tag_scores.items(), key=lambda item: item[1])
+
+    with transaction.atomic():
+        TrendingPost.objects.all().delete()
+        TrendingPost.objects.bulk_create([TrendingPost(post_id=pkid, score=score) for pkid, score in top_posts])
+        TrendingTag.objects.all().delete()
+        TrendingTag.objects.bulk_create([TrendingTag(tag_id=pkid, score=score) for pkid, score in top_tags])
+        transaction.on_commit(lambda: bump_cache_version(TRENDING_CACHE_VERSION))
+
+    logger.info(f"Trending computed: {len(top_posts)} post(s), {len(top_tags)} tag(s)")
+    return len(top_posts), len(top_tags)
+
+
+def trending_posts() -> QuerySet:
+    return (
+        TrendingPost.objects
+        .filter(post__is_active=True)
+        .select_related('post__author')
+        .prefetch_related('post__tags')
+    )
+
+
+def trending_tags() -> QuerySet:
+    return TrendingTag.objects.filter(tag__is_active=True).select_related('tag')
+
+
+def trending_page(queryset: QuerySet, ordering, per_page: int, after: str = None, before: str = None) -> CursorPage:
+    """
+        Keyset page of a trending table, cached under the version of the
+        last run. An invalid cursor falls back to the first page.
+    """
+    version = get_cache_versions([TRENDING_CACHE_VERSION])[TRENDING_CACHE_VERSION]
+    digest = hashlib.md5(f'{per_page}|{after}|{before}'.encode()).hexdigest()
+    key = f'trending:{queryset.model._meta.model_name}:{version}:{digest}'
+    page = cache.get(key)
+    if page is None:
+        paginator = CursorPaginator(queryset, per_page, ordering)
+        try:
+            page = paginator.page(after=after, before=before)
+        except InvalidCursor:
+            page = paginator.page()
+        cache.set(key, page, settings.TRENDING_CACHE_TIMEOUT)
+    return page
@@ -6,6 +6,12 @@ app_name = 'posts'
 urlpatterns = [
     path('',                         views.PostsListView.as_view(),
                                                         name='posts-list'),
+    path('timeline/',                views.TimelineView.as_view(),
+                                                        name='timeline'),
+    path('trending/',                views.TrendingPostsView.as_view(),
+                                                        name='trending-posts'),
+    path('trending/tags/',           views.TrendingTagsView.as_view(),
+                                                        name='trending-tags'),
     path('post/detail/<slug:slug>/', views.PostDetailView.as_view(), 
                                                         name='post-detail'),
     path('post/update/<slug:slug>/', views.PostUpdateView.as_view(), 
@@ -1,51 +1,54 @@
 from .models import Post
-from django.db.models import Q
-from django.core.paginator import Paginator, PageNotAnInteger, EmptyPage
+from django.db.models import F
+from django.db.models.functions import Greatest
+from common.pagination import CursorPaginator, InvalidCursor
 from .filters import PostsFilter
+from . import search
 
 
-def paginate_posts(request, posts, results):
+# Version keys of the anonymous page cache (common.mixins.AnonymousPageCacheMixin)
+POSTS_PAGES_CACHE_VERSION = 'posts:pages:version'
 
-    page = request.GET.get('page')
-    paginator = Paginator(posts, results)
 
-    try:
-        posts = paginator.page(page)
-    except PageNotAnInteger:
-        page = 1
-        posts = paginator.page(page)
-    except EmptyPage:
-        page = paginator.num_pages
-        posts = paginator.page(page)
-
-    leftIndex = (int(page) - 4)
-
-    if leftIndex < 1:
-        leftIndex = 1
+def post_page_cache_version(slug) -> str:
+    return f'posts:pages:{slug}:version'
 
-    rightIndex = (int(page) + 5)
 
-    if rightIndex > paginator.num_pages:
-        rightIndex = paginator.num_pages + 1
+def paginate_posts(request, posts, results, ordering=('-created_at', '-pkid')):
+    """
+        Keyset-paginate posts by ordering, (created_at, pkid) by default,
+        using the opaque `after`/`before` cursors from the query string.
+        An invalid cursor falls back to the first page.
+    """
+    paginator = CursorPaginator(posts, results, ordering)
 
-    custom_range = range(leftIndex, rightIndex)
+    try:
+        page = paginator.page(
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
+        )
+    except InvalidCursor:
+        page = paginator.page()
 
-    return custom_range, posts
+    return page
 
 
 def search_posts(request, queryset=None):
-
-    search_query = ''
+    """
+        Full-text search of the `search_query` parameter within queryset
+        (published posts by default), see posts.search. Matches come
+        annotated with search_rank and search_headline, paginate them
+        with posts.search.SEARCH_ORDERING.
+    """
+    search_query = request.GET.get('search_query', '').strip()
     posts = queryset
-    if request.GET.get('search_query'):
-        search_query = request.GET.get('search_query')
+    if search_query:
+        if posts is None:
+            posts = Post.published.all()
+        posts = search.search(posts, search_query)
 
-        posts = Post.published.all().distinct().filter(
-            Q(title__icontains=search_query) 
-        )
-        
     return posts, search_query
-    
+
 
 def posts_filter(request, queryset=None):
     filter = None
@@ -53,4 +56,20 @@ def posts_filter(request, queryset=None):
     if queryset is not None:
         filter = PostsFilter(request.GET, queryset=queryset)
         posts = filter.qs
-    return posts, filter
\ No newline at end of file
+    return posts, filter
+
+
+def update_post_counters(post_pkid, **deltas) -> int:
+    """
+        Atomically apply deltas to the denormalized post counters in one UPDATE,
+        e.g. update_post_counters(post.pkid, like_count=1, dislike_count=-1).
+        Counters never go below zero.
+    """
+    changes = {
+        field: Greatest(F(field) + delta, 0)
+        for field, delta in deltas.items()
+        if delta
+    }
+    if not changes:
+        return 0
+    return Post.objects.filter(pkid=post_pkid).update(**changes)
@@ -1,6 +1,6 @@
 from typing import Any, Dict
 from django.db import transaction
-from django.db.models import QuerySet, Count
+from django.db.models import QuerySet
 from django.http import HttpRequest, HttpResponse
 from django.shortcuts import redirect
 from django.urls import reverse_lazy, reverse
@@ -18,13 +18,26 @@ from users.permissions import PermissionEnum
 from .mixins import PostPaginationMixin, PostPermissionMixin
 from .models import Post, Tags
 from .forms import UpdateForm, CreateForm
-from .utils import posts_filter
+from .filters import PostsFilter
+from .utils import (posts_filter,
+                    paginate_posts,
+                    POSTS_PAGES_CACHE_VERSION,
+                    post_page_cache_version)
+from .timeline import timeline_queryset
+from . import trending
 from . import mixins
 from common import mixins as common_mixins
 
-class PostsListView(PostPaginationMixin, ListView):
+class PostsListView(common_mixins.AnonymousPageCacheMixin,
+                    PostPaginationMixin,
+                    ListView):
     """View for displaying a list of published posts with filtering and pagination."""
     model = Post
+    cache_key_prefix = 'posts-list'
+    cache_version_keys = (POSTS_PAGES_CACHE_VERSION,)
+    cache_query_params = ('search_query',
+                          *PostPaginationMixin.cursor_query_params,
+                          *PostsFilter.base_filters)
     queryset = Post.published.select_related('author').prefetch_related('tags')
     template_name = 'index.html'
     context_object_name = 'posts'
@@ -41,6 +54,65 @@ class PostsListView(PostPaginationMixin, ListView):
         context['search_query'] = self.request.GET.get('search_query', '')
         return context
     
+class TimelineView(LoginRequiredMixin, ListView):
+    """Home timeline with the posts of followed users, cursor paginated."""
+    model = Post
+    template_name = 'posts/timeline.html'
+    context_object_name = 'posts'
+    posts_per_page = 5
+
+    def get_queryset(self) -> QuerySet:
+        return timeline_queryset(self.request.user)
+
+    def get_context_data(self, **kwargs) -> Dict[str, Any]:
+        context = super().get_context_data(**kwargs)
+        page_obj = paginate_posts(self.request, self.object_list, self.posts_per_page)
+        context.update({
+            'page_obj': page_obj,
+            'posts': page_obj.object_list,
+            'is_paginated': page_obj.has_other_pages(),
+        })
+        return context
+
+class TrendingPostsView(common_mixins.AnonymousPageCacheMixin, ListView):
+    """Posts ranked by time-decayed engagement (posts.trending), cursor paginated."""
+    cache_key_prefix = 'trending-posts'
+    cache_version_keys = (trending.TRENDING_CACHE_VERSION,)
+    cache_query_params = ('after', 'before')
+    template_name = 'posts/trending_posts.html'
+    context_object_name = 'trending'
+    ordering = trending.POSTS_ORDERING
+    per_page = 10
+
+    def get_queryset(self) -> QuerySet:
+        return trending.trending_posts()
+
+    def get_context_data(self, **kwargs) -> Dict[str, Any]:
+        context = super().get_context_data(**kwargs)
+        page_obj = trending.trending_page(
+            self.object_list,
+            self.ordering,
+            self.per_page,
+            after=self.request.GET.get('after'),
+            before=self.request.GET.get('before'),
+        )
+        context.update({
+            'page_obj': page_obj,
+            self.context_object_name: page_obj.object_list,
+            'is_paginated': page_obj.has_other_pages(),
+        })
+        return context
+
+class TrendingTagsView(TrendingPostsView):
+    """Tags ranked by the summed trending score of their posts."""
+    cache_key_prefix = 'trending-tags'
+    template_name = 'posts/trending_tags.html'
+    ordering = trending.TAGS_ORDERING
+    per_page = 20
+
+    def get_queryset(self) -> QuerySet:
+        return trending.trending_tags()
+
 class CreatePostView(LoginRequiredMixin,
                      PostPermissionMixin,
                      common_mixins.HandleNotFoundObjectMixin,
@@ -69,24 +141,28 @@ class CreatePostView(LoginRequiredMixin,
         context['action'] = 'Create'
         return context
 
-class PostDetailView(mixins.GetPostObjectMixin,
+class PostDetailView(common_mixins.AnonymousPageCacheMixin,
+                     mixins.GetPostObjectMixin,
                      common_mixins.HandleNotFoundObjectMixin,
                      DetailView):
     """View for displaying a single post with its comments and reactions."""
     model = Post
     template_name = 'posts/post-detail.html'
     context_object_name = 'post'
+    cache_key_prefix = 'post-detail'
+    # Comments page, see comments.utils.paginate_comments
+    cache_query_params = ('page',)
+
+    def get_cache_version_keys(self):
+        return [POSTS_PAGES_CACHE_VERSION,
+                post_page_cache_version(self.kwargs.get(self.slug_url_kwarg))]
 
     def get_queryset(self) -> QuerySet:
-        """Optimize the queryset with related data and annotations."""
+        """Optimize the queryset with related data."""
         return (
             super().get_queryset()
             .select_related('author')
             .prefetch_related('tags')
-            .annotate(
-                like_count=Count('like', distinct=True),
-                dislike_count=Count('dislike', distinct=True),
-            )
         )
 
     def get_context_data(self, **kwargs) -> Dict[str, Any]:
@@ -98,19 +174,28 @@ class PostDetailView(mixins.GetPostObjectMixin,
         comments = post.comments.select_related('author').all()
         custom_range, page_obj = paginate_comments(self.request, comments, 5)
 
-        # Get like/dislike counts using annotations in the queryset
-        like_count = getattr(post, 'like_count', 0)
-        dislike_count = getattr(post, 'dislike_count', 0)
-        comment_count = getattr(post, 'comment_count', 0)
-
+        # Counters are denormalized on the post, no aggregation needed
         context.update({
             'comments': page_obj,
             'custom_range': custom_range,
-            'like_count': like_count,
-            'dislike_count': dislike_count,
+            'like_count': post.like_count,
+            'dislike_count': post.dislike_count,
+            'comment_count': post.comment_count,
             'comment_form': CommentCreateForm(),
+            # Pages with the reaction buttons are rendered for logged in users only, never cached
+            'user_reaction': self.get_user_reaction(),
         })
         return context
+
+    def get_user_reaction(self):
+        if not self.request.user.is_authenticated:
+            return None
+        return (
+            self.object.reactions
+            .filter(author=self.request.user, is_active=True)
+            .values_list('kind', flat=True)
+            .first()
+        )
  
 class PostUpdateView(LoginRequiredMixin,
                      PostPermissionMixin,
@@ -0,0 +1,141 @@
+"""
+Authentication backends with a cached identity and permission snapshot.
+
+Every request (and websocket connect) resolves its user through the
+get_user() of the backend stored in the session. These backends serve it
+from the cache: the Profile together with its user and group permission
+sets, stored under the user's version key and the global groups version.
+The permission sets are put where ModelBackend memoizes them on the user,
+so has_perm() and permission_required checks run no queries either.
+
+users.signals bumps the user version when the profile, its permissions or
+its groups change, and the groups version when a group's permissions do.
+Writes that bypass post_save invalidate the snapshots themselves:
+refresh_permission_bits() and the follow counters of followers.graph.
+
+The permissions of permissions.PERMISSION_BITS are answered from
+Profile.permission_bits alone (PermissionBitsMixin), the same signals
+recompute the bits with refresh_permission_bits().
+"""
+import logging
+from itertools import islice
+
+from allauth.account.auth_backends import AuthenticationBackend
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+from common.cache import bump_cache_version, get_cache_versions
+from .permissions import PERMISSION_APP_LABELS, PERMISSION_BITS, permission_bit
+
+logger = logging.getLogger(__name__)
+
+# Version of every snapshot, bumped when the permissions of a group change
+GROUPS_CACHE_VERSION = 'auth:groups:version'
+
+
+def user_cache_version(user_pk) -> str:
+    return f'auth:user:{user_pk}:version'
+
+
+def invalidate_user(user_pk) -> None:
+    bump_cache_version(user_cache_version(user_pk))
+
+
+def invalidate_groups() -> None:
+    bump_cache_version(GROUPS_CACHE_VERSION)
+
+
+class CachedUserMixin:
+
+    def load_snapshot(self, user_id):
+        Profile = get_user_model()
+        try:
+            user = Profile._default_manager.get(pk=user_id)
+        except Profile.DoesNotExist:
+            return None
+        return {
+            'user': user,
+            'user_perms': frozenset(self.get_user_permissions(user)),
+            'group_perms': frozenset(self.get_group_permissions(user)),
+        }
+
+    def get_user(self, user_id):
+        keys = [user_cache_version(user_id), GROUPS_CACHE_VERSION]
+        versions = get_cache_versions(keys)
+        cache_key = f"auth:user:{user_id}:{versions[keys[0]]}:{versions[keys[1]]}"
+
+        snapshot = cache.get(cache_key)
+        if snapshot is None:
+            snapshot = self.load_snapshot(user_id)
+            if snapshot is None:
+                return None
+            cache.set(cache_key, snapshot, settings.AUTH_CACHE_TIMEOUT)
+            logger.debug(f"Auth snapshot of user {user_id} cached")
+
+        user = snapshot['user']
+        if not self.user_can_authenticate(user):
+            return None
+        # Where ModelBackend._get_permissions and get_all_permissions memoize them
+        user._user_perm_cache = set(snapshot['user_perms'])
+        user._group_perm_cache = set(snapshot['group_perms'])
+        user._perm_cache = user._user_perm_cache | user._group_perm_cache
+        return user
+
+
+class PermissionBitsMixin:
+    """has_perm() of the permissions with a bit is one AND on the loaded profile."""
+
+    def has_perm(self, user_obj, perm, obj=None):
+        bit = permission_bit(perm)
+        if not bit or obj is not None:
+            return super().has_perm(user_obj, perm, obj)
+        return bool(user_obj.is_active and user_obj.permission_bits & bit)
+
+
+class CachedModelBackend(CachedUserMixin, PermissionBitsMixin, ModelBackend):
+    pass
+
+
+class CachedAuthenticationBackend(CachedUserMixin, PermissionBitsMixin, AuthenticationBackend):
+    """allauth's email/username login, allauth prefers it as an AuthenticationBackend subclass."""
+
+
+def compute_permission_bits(user_pks) -> dict:
+    """permission_bits of each profile in user_pks, in two queries."""
+    Profile = get_user_model()
+    masks = dict.fromkeys(user_pks, 0)
+    granted = (
+        Profile.user_permissions.through.objects
+        .filter(profile_id__in=list(masks), permission__codename__in=PERMISSION_APP_LABELS)
+        .values_list('profile_id', 'permission__content_type__app_label', 'permission__codename')
+    )
+    through_groups = (
+        Profile.groups.through.objects
+        .filter(profile_id__in=list(masks), group__permissions__codename__in=PERMISSION_APP_LABELS)
+        .values_list('profile_id', 'group__permissions__content_type__app_label', 'group__permissions__codename')
+    )
+    for rows in (granted, through_groups):
+        for user_pk, app_label, codename in rows:
+            masks[user_pk] |= PERMISSION_BITS.get(f"{app_label}.{codename}", 0)
+    return masks
+
+
+def refresh_permission_bits(queryset, batch_size: int = 1000) -> int:
+    """Recompute permission_bits of the profiles in queryset, returns how many changed."""
+    Profile = get_user_model()
+    changed = 0
+    current = queryset.order_by('pk').values_list('pk', 'permission_bits').iterator(chunk_size=batch_size)
+    while batch := dict(islice(current, batch_size)):
+        stale = [
+            Profile(pk=user_pk, permission_bits=mask)
+            for user_pk, mask in compute_permission_bits(batch).items()
+            if mask != batch[user_pk]
+        ]
+        Profile.objects.bulk_update(stale, ['permission_bits'])
+        # bulk_update sends no post_save, the snapshots holding the old bits go here
+        for profile in stale:
+            invalidate_user(profile.pk)
+        changed += len(stale)
+    return changed
@@ -0,0 +1,24 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from users.backends import refresh_permission_bits
+
+Profile = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds Profile.permission_bits from the granted user and group permissions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of profiles recomputed per round of queries',
+        )
+
+    def handle(self, *args, **options):
+        # Invalidates the cached auth snapshots of the changed profiles
+        changed = refresh_permission_bits(Profile.objects.all(), batch_size=options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(f'Recounted permission bits, {changed} profile(s) changed.'))
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.4 on 2026-10-18 03:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0004_alter_profile_gender"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="profile",
+            name="renditions",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
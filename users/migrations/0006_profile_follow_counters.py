@@ -0,0 +1,52 @@
+# Generated by Django 5.0.4 on 2026-10-18 03:13
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    """The counters of the existing profiles, as SocialGraph.recount computes them."""
+    UserFollowing = apps.get_model("followers", "UserFollowing")
+
+    def active_count(field):
+        counts = (
+            UserFollowing._base_manager
+            .filter(**{field: OuterRef("pkid")}, is_active=True)
+            .order_by()
+            .values(field)
+            .annotate(total=Count("pkid"))
+            .values("total")
+        )
+        return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+    apps.get_model("users", "Profile")._base_manager.update(
+        followers_count=active_count("following_user"),
+        following_count=active_count("user"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0005_profile_renditions"),
+        ("followers", "0002_userfollowing_is_active"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="profile",
+            name="followers_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Followers count"
+            ),
+        ),
+        migrations.AddField(
+            model_name="profile",
+            name="following_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Following count"
+            ),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
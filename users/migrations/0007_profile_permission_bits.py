@@ -0,0 +1,59 @@
+# Generated by Django 5.0.4 on 2026-10-18 03:41
+
+from django.db import migrations, models
+
+# users.permissions.PERMISSION_BITS as of this migration, frozen so later
+# changes to the enums don't change what it writes
+PERMISSION_BITS = {
+    "posts.add_post": 1 << 0,
+    "posts.change_post": 1 << 1,
+    "posts.delete_post": 1 << 2,
+    "users.change_profile": 1 << 5,
+    "users.delete_profile": 1 << 6,
+    "comments.add_comment": 1 << 7,
+    "comments.change_comment": 1 << 8,
+    "comments.delete_comment": 1 << 9,
+}
+CODENAMES = {perm.partition(".")[2] for perm in PERMISSION_BITS}
+
+
+def fill_permission_bits(apps, schema_editor):
+    """The bits of the permissions granted so far, directly or through groups."""
+    Profile = apps.get_model("users", "Profile")
+    masks = {}
+    granted = Profile.user_permissions.through.objects.filter(
+        permission__codename__in=CODENAMES
+    ).values_list("profile_id", "permission__content_type__app_label", "permission__codename")
+    through_groups = Profile.groups.through.objects.filter(
+        group__permissions__codename__in=CODENAMES
+    ).values_list(
+        "profile_id", "group__permissions__content_type__app_label", "group__permissions__codename"
+    )
+    for rows in (granted, through_groups):
+        for profile_id, app_label, codename in rows.iterator():
+            bit = PERMISSION_BITS.get(f"{app_label}.{codename}", 0)
+            masks[profile_id] = masks.get(profile_id, 0) | bit
+
+    Profile.objects.bulk_update(
+        [Profile(pk=pk, permission_bits=mask) for pk, mask in masks.items()],
+        ["permission_bits"],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0006_profile_follow_counters"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="profile",
+            name="permission_bits",
+            field=models.PositiveBigIntegerField(
+                default=0, editable=False, verbose_name="Permission bits"
+            ),
+        ),
+        migrations.RunPython(fill_permission_bits, migrations.RunPython.noop),
+    ]
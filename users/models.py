@@ -7,6 +7,7 @@ from django_countries.fields import CountryField
 
 import uuid
 
+from common.models import ImageRenditionsModel
 from .managers import UserManager
 from .permissions import (PermissionEnum,
                           PermissionDescriptionEnum,
@@ -20,9 +21,10 @@ class GenderChoices(models.TextChoices):
     PREFER_NOT_TO_SAY = "prefer_not_to_say", _("Prefer not to say")
 
 
-class Profile(AbstractUser):
+class Profile(AbstractUser, ImageRenditionsModel):
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = ["username", "first_name", "last_name"]
+    rendition_field = 'featured_img'
     
     objects = UserManager()
 
@@ -82,6 +84,25 @@ class Profile(AbstractUser):
     is_staff = models.BooleanField(default=False, blank=True, null=True)
     is_active = models.BooleanField(default=False, blank=True, null=True)
     is_superuser = models.BooleanField(default=False, blank=True, null=True)
+    # Denormalized follow counters, kept up to date by followers.graph.SocialGraph
+    # and rebuilt by recount_follow_counters
+    followers_count = models.PositiveIntegerField(
+                                        verbose_name=_('Followers count'),
+                                        default=0,
+                                        editable=False
+                                    )
+    following_count = models.PositiveIntegerField(
+                                        verbose_name=_('Following count'),
+                                        default=0,
+                                        editable=False
+                                    )
+    # permissions.PERMISSION_BITS permissions granted directly or through groups,
+    # one bit each. Kept up to date by users.signals, rebuilt by recount_permission_bits
+    permission_bits = models.PositiveBigIntegerField(
+                                        verbose_name=_('Permission bits'),
+                                        default=0,
+                                        editable=False
+                                    )
     
     
     def __str__(self):
@@ -189,15 +210,14 @@ class Profile(AbstractUser):
         return self.followers.all()
     
     def count_followers(self):
-        return self.followers.all().count()
+        return self.followers_count
     
     def count_following(self):
-        return self.followers.all().count()
+        return self.following_count
     
     def is_following(self, username):
-        return self.following_users_list.filter(
-                following_user__username=username
-            ).exists()
+        from followers.graph import social_graph
+        return social_graph.is_following(self, username)
         
     def getFollowingUser(self, username):
         return self.following_users_list.filter(
@@ -39,3 +39,60 @@ class PermissionDescriptionEnum(StrEnum):
     ADD_DISLIKE = 'Can add dislike'
     DELETE_DISLIKE = 'Can delete dislike'
 
+
+
+# App of each permission backed by a Permission row, has_perm() names them
+# 'app_label.codename'. follow_user, unfollow_user, the like/dislike codenames
+# (likes only has Reaction), admin and chat have no row and get no bit.
+PERMISSION_APP_LABELS = {
+    PermissionEnum.ADD_POST: 'posts',
+    PermissionEnum.EDIT_POST: 'posts',
+    PermissionEnum.DELETE_POST: 'posts',
+    PermissionEnum.CHANGE_PROFILE: 'users',
+    PermissionEnum.DELETE_PROFILE: 'users',
+    PermissionEnum.ADD_COMMENT: 'comments',
+    PermissionEnum.CHANGE_COMMENT: 'comments',
+    PermissionEnum.DELETE_COMMENT: 'comments',
+}
+
+
+def qualified_permission(codename: str) -> str:
+    return f"{PERMISSION_APP_LABELS[codename]}.{codename}"
+
+
+# Bit of each permission in Profile.permission_bits, keyed by
+# 'app_label.codename' so a codename of another app gets no bit. The masks
+# are stored, so a bit is the position of its permission in its enum and new
+# members only go at the end: PermissionEnum takes the low bits and
+# CustomPermissionEnum starts at CUSTOM_PERMISSION_OFFSET. Members without an
+# app label leave their bit unused. users/migrations/0007 keeps its own copy
+# of the mapping.
+CUSTOM_PERMISSION_OFFSET = 32
+
+PERMISSION_BITS = {
+    **{
+        qualified_permission(perm): 1 << i
+        for i, perm in enumerate(PermissionEnum)
+        if perm in PERMISSION_APP_LABELS
+    },
+    **{
+        qualified_permission(perm): 1 << (CUSTOM_PERMISSION_OFFSET + i)
+        for i, perm in enumerate(CustomPermissionEnum)
+        if perm in PERMISSION_APP_LABELS
+    },
+}
+
+
+def permission_bit(perm: str) -> int:
+    """
+        Bit of 'app_label.codename', 0 when it has none. Like ModelBackend, a
+        bare codename matches nothing.
+    """
+    return PERMISSION_BITS.get(perm, 0)
+
+
+def permission_mask(perms) -> int:
+    mask = 0
+    for perm in perms:
+        mask |= permission_bit(perm)
+    return mask
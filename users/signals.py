@@ -6,13 +6,15 @@ from django.dispatch import receiver
 from django.contrib.auth.models import Group, Permission
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.auth import get_user_model
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_delete, post_save
 
 # AllAuth
 from allauth.account.signals import user_signed_up, email_confirmation_sent, email_confirmed
 from allauth.account.models import EmailAddress, EmailConfirmation
 
-from users.permissions import PermissionEnum
+from users.backends import (compute_permission_bits, invalidate_groups, invalidate_user,
+                            refresh_permission_bits)
+from users.permissions import PERMISSION_APP_LABELS, PermissionEnum
 
 logger = logging.getLogger(__name__)
 
@@ -83,4 +85,60 @@ def add_default_permissions(sender, instance, created, **kwargs):
     if created:
         basic_group.permissions.set(basic_perms.values_list('id', flat=True))
         logger.info(f"Group permissions: {basic_group.permissions.all()}")
-    instance.groups.add(basic_group)
\ No newline at end of file
+    instance.groups.add(basic_group)
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def invalidate_auth_snapshot(sender, instance, **kwargs):
+    """The cached identity (users.backends) holds every profile field."""
+    invalidate_user(instance.pk)
+
+
+def refresh_all_permission_bits():
+    """When the affected profiles are unknown, only bits can have been taken away."""
+    refresh_permission_bits(Profile.objects.filter(permission_bits__gt=0))
+
+
+@receiver(m2m_changed, sender=Profile.user_permissions.through)
+@receiver(m2m_changed, sender=Profile.groups.through)
+def invalidate_auth_snapshot_on_perms(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    # The bits are recomputed before the snapshots holding them are invalidated
+    if not reverse:
+        instance.permission_bits = compute_permission_bits([instance.pk])[instance.pk]
+        Profile.objects.filter(pk=instance.pk).update(permission_bits=instance.permission_bits)
+        invalidate_user(instance.pk)
+    elif pk_set:
+        # A permission or group given to (or taken from) these profiles
+        refresh_permission_bits(Profile.objects.filter(pk__in=pk_set))
+        for user_pk in pk_set:
+            invalidate_user(user_pk)
+    else:
+        # clear() from the permission or group side, the profiles are unknown
+        refresh_all_permission_bits()
+        invalidate_groups()
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+def invalidate_group_permissions(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        refresh_permission_bits(Profile.objects.filter(groups=instance))
+    elif pk_set:
+        refresh_permission_bits(Profile.objects.filter(groups__in=pk_set).distinct())
+    else:
+        refresh_all_permission_bits()
+    invalidate_groups()
+
+
+@receiver(post_delete, sender=Group)
+@receiver(post_delete, sender=Permission)
+def invalidate_deleted_permissions(sender, instance, **kwargs):
+    # Rare admin operations, the cascaded rows are gone without m2m signals.
+    # The content type may be gone as well, the codename alone decides
+    if sender is Group or instance.codename in PERMISSION_APP_LABELS:
+        refresh_all_permission_bits()
+    invalidate_groups()
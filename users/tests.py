@@ -1,3 +1,172 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from chats.models import Chat
+from followers.graph import social_graph
+from users.backends import CachedModelBackend, invalidate_user
+from users.permissions import PERMISSION_BITS, PermissionEnum, permission_bit, permission_mask
+
+
+User = get_user_model()
+
+# Statements reading these tables directly, joins to post authors don't count
+AUTH_TABLES = tuple(f'FROM "{table}"' for table in (
+    'users_profile', 'django_session', 'auth_permission', 'auth_group', 'users_profile_groups'
+))
+
+
+class TestCachedAuth(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User._default_manager.create_user(
+            username='cachedauth',
+            email='cachedauth@example.com',
+            password='testpass123',
+            first_name='Cached',
+            last_name='Auth',
+            is_active=True
+        )
+        self.backend = CachedModelBackend()
+        self.permission = Permission.objects.get(codename='view_post')
+
+    def test_warm_page_view_runs_no_auth_queries(self):
+        self.client.force_login(self.user)
+        url = reverse('posts:timeline')
+        self.client.get(url)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+
+        self.assertEqual(response.context['user'], self.user)
+        auth_queries = [
+            query['sql'] for query in queries.captured_queries
+            if any(table in query['sql'] for table in AUTH_TABLES)
+        ]
+        self.assertEqual(auth_queries, [])
+
+    def test_snapshot_serves_permissions(self):
+        self.backend.get_user(self.user.pk)
+
+        with self.assertNumQueries(0):
+            user = self.backend.get_user(self.user.pk)
+            self.assertFalse(user.has_perm('posts.view_post'))
+
+    def test_permission_and_group_changes_invalidate(self):
+        self.assertFalse(self.backend.get_user(self.user.pk).has_perm('posts.view_post'))
+
+        self.user.user_permissions.add(self.permission)
+        self.assertTrue(self.backend.get_user(self.user.pk).has_perm('posts.view_post'))
+
+        self.user.user_permissions.remove(self.permission)
+        group = Group.objects.create(name='Viewers')
+        group.user_set.add(self.user)
+        self.assertFalse(self.backend.get_user(self.user.pk).has_perm('posts.view_post'))
+
+        group.permissions.add(self.permission)
+        self.assertTrue(self.backend.get_user(self.user.pk).has_perm('posts.view_post'))
+
+    def test_profile_changes_invalidate(self):
+        self.backend.get_user(self.user.pk)
+
+        self.user.username = 'renamed'
+        self.user.save()
+        self.assertEqual(self.backend.get_user(self.user.pk).username, 'renamed')
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertIsNone(self.backend.get_user(self.user.pk))
+
+    def test_counter_and_bit_updates_invalidate(self):
+        follower = User._default_manager.create_user(
+            username='follower', email='follower@example.com', password='testpass123', is_active=True
+        )
+        self.backend.get_user(self.user.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            social_graph.follow(follower, self.user)
+        self.assertEqual(self.backend.get_user(self.user.pk).followers_count, 1)
+
+        User.objects.filter(pk=self.user.pk).update(permission_bits=0)
+        invalidate_user(self.user.pk)
+        self.assertFalse(self.backend.get_user(self.user.pk).has_perm('posts.add_post'))
+        call_command('recount_permission_bits', stdout=StringIO())
+        self.assertTrue(self.backend.get_user(self.user.pk).has_perm('posts.add_post'))
+
+
+class TestPermissionBits(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User._default_manager.create_user(
+            username='bits', email='bits@example.com', password='testpass123', is_active=True
+        )
+        self.add_post = Permission.objects.get(codename=PermissionEnum.ADD_POST)
+
+    def test_default_permissions_set_the_bits(self):
+        perms = [
+            f"{app_label}.{codename}"
+            for app_label, codename in Permission.objects.values_list('content_type__app_label', 'codename')
+        ]
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.permission_bits, permission_mask(perms))
+        self.assertTrue(self.user.permission_bits & PERMISSION_BITS['comments.add_comment'])
+
+    def test_same_codename_of_another_app_has_no_bit(self):
+        self.assertTrue(permission_bit('posts.add_post'))
+        self.assertEqual(permission_bit('chats.add_post'), 0)
+
+        other_app = Permission.objects.create(
+            codename=PermissionEnum.ADD_POST,
+            name='Can add post elsewhere',
+            content_type=ContentType.objects.get_for_model(Chat),
+        )
+        bits = User.objects.get(pk=self.user.pk).permission_bits
+        self.user.user_permissions.add(other_app)
+        self.assertEqual(User.objects.get(pk=self.user.pk).permission_bits, bits)
+
+    def test_has_perm_runs_no_queries(self):
+        user = User.objects.get(pk=self.user.pk)
+
+        with self.assertNumQueries(0):
+            self.assertTrue(user.has_perm('posts.add_post'))
+            self.assertTrue(user.has_perm('comments.add_comment'))
+
+    def test_bare_codename_matches_nothing(self):
+        # Like ModelBackend, permissions are named 'app_label.codename'
+        self.assertEqual(permission_bit(PermissionEnum.ADD_POST), 0)
+        self.assertFalse(User.objects.get(pk=self.user.pk).has_perm(PermissionEnum.ADD_POST))
+
+    def test_only_permissions_with_a_row_have_a_bit(self):
+        perms = {
+            f"{app_label}.{codename}"
+            for app_label, codename in Permission.objects.values_list('content_type__app_label', 'codename')
+        }
+        self.assertLessEqual(set(PERMISSION_BITS), perms)
+        # Bits follow the enum positions, the unbacked members leave a gap
+        self.assertEqual(PERMISSION_BITS['users.change_profile'], 1 << 5)
+
+    def test_revoking_updates_the_bits(self):
+        # Granted both directly and through the Basic Users group
+        self.user.user_permissions.remove(self.add_post)
+        self.assertTrue(User.objects.get(pk=self.user.pk).has_perm('posts.add_post'))
+
+        Group.objects.get(name='Basic Users').permissions.remove(self.add_post)
+        self.assertFalse(User.objects.get(pk=self.user.pk).has_perm('posts.add_post'))
+
+        self.user.user_permissions.add(self.add_post)
+        self.assertTrue(self.user.has_perm('posts.add_post'))
+
+    def test_recount_restores_the_bits(self):
+        bits = User.objects.get(pk=self.user.pk).permission_bits
+        User.objects.filter(pk=self.user.pk).update(permission_bits=0)
 
-# Create your tests here.
+        call_command('recount_permission_bits', stdout=StringIO())
+        self.assertEqual(User.objects.get(pk=self.user.pk).permission_bits, bits)
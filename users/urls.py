@@ -21,6 +21,12 @@ urlpatterns = [
                                             name='follow-user'),
     path('unfollow/<str:username>',   follower_views.unfollow_user,
                                             name='unfollow-user'),
+    path('follow-bulk/',               follower_views.BulkFollowView.as_view(),
+                                            name='follow-bulk'),
+    path('unfollow-bulk/',             follower_views.BulkFollowView.as_view(unfollow=True),
+                                            name='unfollow-bulk'),
+    path('suggestions/',               follower_views.SuggestionsView.as_view(),
+                                            name='follow-suggestions'),
     path('user-profile/<str:username>', 
                         follower_views.FollowingProfileDetailView.as_view(), 
                                             name='following-user-profile'),
@@ -0,0 +1,275 @@
+"""
+Benchmark harness used by the `benchmark` management command.
+
+Seeds a synthetic dataset tagged with a per-run prefix, replays GET requests
+against the main views through the test client (latency percentiles and
+queries per request) and drives ChatConsumer through WebsocketCommunicator
+on the in-memory channel layer (messages per second).
+"""
+import math
+import random
+import statistics
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+from asgiref.sync import async_to_sync
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.text import slugify
+
+from chats.consumers import ChatConsumer
+from chats.models import Chat, Message
+from comments.models import Comment
+from followers.graph import social_graph
+from followers.models import UserFollowing
+from likes.models import Reaction, ReactionKind
+from posts.models import Post, Tags, STATUS as POST_STATUS
+
+Profile = get_user_model()
+
+IN_MEMORY_CHANNEL_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+
+@dataclass
+class Dataset:
+    prefix: str
+    users: List[Any] = field(default_factory=list)
+    posts: List[Post] = field(default_factory=list)
+    chats: List[Chat] = field(default_factory=list)
+
+    def counts(self) -> Dict[str, int]:
+        return {
+            'users': len(self.users),
+            'follows': UserFollowing.objects.filter(user__in=self.users).count(),
+            'posts': len(self.posts),
+            'likes': Reaction.objects.filter(post__in=self.posts, kind=ReactionKind.LIKE).count(),
+            'comments': Comment.objects.filter(post__in=self.posts).count(),
+            'chats': len(self.chats),
+            'messages': Message.objects.filter(chat__in=self.chats).count(),
+        }
+
+
+def seed_dataset(users: int = 50,
+                 follows_per_user: int = 10,
+                 posts_per_user: int = 5,
+                 tags: int = 20,
+                 likes_per_post: int = 5,
+                 comments_per_post: int = 3,
+                 chats_per_user: int = 2,
+                 messages_per_chat: int = 50,
+                 seed: int = 0) -> Dataset:
+    """Bulk insert a synthetic dataset, every row is reachable from users named `<prefix>-<n>`."""
+    rng = random.Random(seed)
+    dataset = Dataset(prefix=f"bench-{uuid.uuid4().hex[:8]}")
+    password = make_password('benchmark')
+
+    dataset.users = Profile.objects.bulk_create([
+        Profile(
+            username=f"{dataset.prefix}-{i}",
+            email=f"{dataset.prefix}-{i}@example.com",
+            password=password,
+            is_active=True,
+        )
+        for i in range(users)
+    ])
+
+    UserFollowing.objects.bulk_create([
+        UserFollowing(user=user, following_user=followed)
+        for user in dataset.users
+        for followed in rng.sample([u for u in dataset.users if u != user], min(follows_per_user, users - 1))
+    ], ignore_conflicts=True)
+    # bulk_create bypasses SocialGraph, which maintains the follow counters
+    social_graph.recount(Profile.objects.filter(pkid__in=[user.pkid for user in dataset.users]))
+
+    tag_objects = Tags.objects.bulk_create([Tags(title=f"{dataset.prefix}-tag-{i}") for i in range(tags)])
+
+    posts = []
+    for user in dataset.users:
+        for i in range(posts_per_user):
+            title = f"{user.username} post {i}"
+            posts.append(Post(
+                title=title,
+                slug=slugify(title),
+                content=f"Benchmark post {i} by {user.username}",
+                author=user,
+                status=POST_STATUS.PUBLISH,
+                like_count=min(likes_per_post, users),
+                comment_count=comments_per_post,
+            ))
+    # bulk_create skips Post.save, which expects the view kwargs
+    dataset.posts = Post.objects.bulk_create(posts)
+
+    if tag_objects:
+        Post.tags.through.objects.bulk_create([
+            Post.tags.through(post_id=post.pkid, tags_id=tag.pkid)
+            for post in dataset.posts
+            for tag in rng.sample(tag_objects, min(3, len(tag_objects)))
+        ])
+
+    Reaction.objects.bulk_create([
+        Reaction(author=author, post=post, kind=ReactionKind.LIKE)
+        for post in dataset.posts
+        for author in rng.sample(dataset.users, min(likes_per_post, users))
+    ])
+    Comment.objects.bulk_create([
+        Comment(author=rng.choice(dataset.users), post=post, title=f"Comment {i}", content="Benchmark comment")
+        for post in dataset.posts
+        for i in range(comments_per_post)
+    ])
+
+    pairs = set()
+    for user in dataset.users:
+        for other in rng.sample([u for u in dataset.users if u != user], min(chats_per_user, users - 1)):
+            if (other.pkid, user.pkid) not in pairs:
+                pairs.add((user.pkid, other.pkid))
+    by_pkid = {user.pkid: user for user in dataset.users}
+    # bulk_create skips Chat.save, which sets the slug
+    dataset.chats = Chat.objects.bulk_create([
+        Chat(
+            author=by_pkid[author],
+            chat_to_user=by_pkid[receiver],
+            slug=slugify(f"from-{by_pkid[author].username}-to-{by_pkid[receiver].username}"),
+        )
+        for author, receiver in pairs
+    ])
+
+    Message.objects.bulk_create([
+        Message(
+            chat=chat,
+            author=chat.author if i % 2 else chat.chat_to_user,
+            sent_for=chat.chat_to_user if i % 2 else chat.author,
+            message=f"Benchmark message {i}",
+        )
+        for chat in dataset.chats
+        for i in range(messages_per_chat)
+    ], batch_size=1000)
+
+    return dataset
+
+
+def drop_dataset(dataset: Dataset) -> None:
+    """Hard delete the seeded rows, deleting the users cascades to everything they own."""
+    Profile.objects.filter(username__startswith=f"{dataset.prefix}-").delete()
+    Tags.objects.filter(title__startswith=f"{dataset.prefix}-").delete()
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def summarize(timings: List[float]) -> Dict[str, float]:
+    return {
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'p99_ms': round(percentile(timings, 99), 3),
+        'mean_ms': round(statistics.fmean(timings), 3),
+    }
+
+
+def benchmark_view(client: Client, url: str, requests: int, warmup: int = 2) -> Dict[str, Any]:
+    """Latency percentiles and queries per request of GET url."""
+    for _ in range(warmup):
+        client.get(url)
+
+    timings, queries, statuses = [], [], set()
+    for _ in range(requests):
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = client.get(url)
+            timings.append((time.perf_counter() - start) * 1000)
+        queries.append(len(captured))
+        statuses.add(response.status_code)
+
+    return {
+        'url': url,
+        'requests': requests,
+        'status': sorted(statuses),
+        **summarize(timings),
+        'queries_median': statistics.median(queries),
+        'queries_max': max(queries),
+    }
+
+
+def benchmark_views(dataset: Dataset, requests: int, warmup: int = 2) -> Dict[str, Dict[str, Any]]:
+    viewer = dataset.users[0]
+    post = dataset.posts[len(dataset.posts) // 2]
+    chat = next(chat for chat in dataset.chats if viewer.pkid in (chat.author_id, chat.chat_to_user_id))
+    followed = UserFollowing.objects.filter(user=viewer).select_related('following_user').first()
+
+    urls = {
+        'PostsListView': reverse('posts:posts-list'),
+        'PostDetailView': reverse('posts:post-detail', kwargs={'slug': post.slug}),
+        'ChatListView': reverse('chats:user-chats'),
+        'ChatDetailView': reverse('chats:chat-detail', kwargs={'chat_slug': chat.slug}),
+        'FollowingProfileDetailView': reverse(
+            'users:following-user-profile',
+            kwargs={'username': followed.following_user.username if followed else dataset.users[1].username}
+        ),
+    }
+
+    client = Client(raise_request_exception=False)
+    client.force_login(viewer)
+    return {name: benchmark_view(client, url, requests, warmup) for name, url in urls.items()}
+
+
+async def _drive_chat(chat: Chat, messages: int) -> Dict[str, Any]:
+    async def connect(user, other):
+        communicator = WebsocketCommunicator(
+            ChatConsumer.as_asgi(),
+            f"/ws/chat/{chat.slug}/{other.id}/?token=benchmark"
+        )
+        communicator.scope['user'] = user
+        communicator.scope['url_route'] = {
+            'kwargs': {'room_name': chat.slug, 'receiver_id': str(other.id)}
+        }
+        connected, _ = await communicator.connect()
+        if not connected:
+            raise RuntimeError(f"ChatConsumer refused the connection to {chat.slug}")
+        return communicator
+
+    async def receive_message(communicator):
+        while True:
+            frame = await communicator.receive_json_from(timeout=5)
+            if frame['type'] == 'chat_message':
+                return frame
+
+    sender = await connect(chat.author, chat.chat_to_user)
+    recipient = await connect(chat.chat_to_user, chat.author)
+
+    timings = []
+    start = time.perf_counter()
+    for i in range(messages):
+        sent_at = time.perf_counter()
+        await sender.send_json_to({'type': 'chat_message', 'message': f"Benchmark {i}", 'temp_id': f"temp-{i}"})
+        await receive_message(recipient)
+        timings.append((time.perf_counter() - sent_at) * 1000)
+    elapsed = time.perf_counter() - start
+
+    # Disconnecting drains the write-behind buffer, include it in the cost
+    await sender.disconnect()
+    await recipient.disconnect()
+    total = time.perf_counter() - start
+
+    return {
+        'messages': messages,
+        'messages_per_second': round(messages / elapsed, 1),
+        'messages_per_second_persisted': round(messages / total, 1),
+        **summarize(timings),
+    }
+
+
+def benchmark_chat(dataset: Dataset, messages: int) -> Dict[str, Any]:
+    """Round trip latency and throughput of ChatConsumer between two participants."""
+    chat = Chat.objects.select_related('author', 'chat_to_user').get(pkid=dataset.chats[0].pkid)
+    with override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS):
+        return async_to_sync(_drive_chat)(chat, messages)
@@ -0,0 +1,97 @@
+import json
+import platform
+from datetime import datetime, timezone
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from utilities import benchmark
+
+
+class Command(BaseCommand):
+    help = ('Seed a synthetic dataset, measure latency and queries per request of the main views '
+            'and chat websocket throughput, and write a JSON report')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--follows-per-user', type=int, default=10)
+        parser.add_argument('--posts-per-user', type=int, default=5)
+        parser.add_argument('--tags', type=int, default=20)
+        parser.add_argument('--likes-per-post', type=int, default=5)
+        parser.add_argument('--comments-per-post', type=int, default=3)
+        parser.add_argument('--chats-per-user', type=int, default=2)
+        parser.add_argument('--messages-per-chat', type=int, default=50)
+        parser.add_argument('--requests', type=int, default=50,
+                            help='Measured requests per view')
+        parser.add_argument('--warmup', type=int, default=2,
+                            help='Unmeasured requests per view before measuring')
+        parser.add_argument('--ws-messages', type=int, default=200,
+                            help='Chat messages sent through the websocket consumer')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout')
+        parser.add_argument('--keep', action='store_true',
+                            help="Keep the seeded rows instead of deleting them afterwards")
+        parser.add_argument('--force', action='store_true',
+                            help='Run even though DEBUG is off')
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['force']:
+            raise CommandError("The benchmark writes to the configured database, pass --force to run it without DEBUG")
+        if options['users'] < 2:
+            raise CommandError("--users must be at least 2")
+
+        self.stderr.write("Seeding dataset...")
+        dataset = benchmark.seed_dataset(
+            users=options['users'],
+            follows_per_user=options['follows_per_user'],
+            posts_per_user=options['posts_per_user'],
+            tags=options['tags'],
+            likes_per_post=options['likes_per_post'],
+            comments_per_post=options['comments_per_post'],
+            chats_per_user=options['chats_per_user'],
+            messages_per_chat=options['messages_per_chat'],
+            seed=options['seed'],
+        )
+
+        try:
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+                self.stderr.write("Benchmarking views...")
+                views = benchmark.benchmark_views(dataset, options['requests'], options['warmup'])
+                self.stderr.write("Benchmarking chat websocket...")
+                chat = benchmark.benchmark_chat(dataset, options['ws_messages'])
+
+            report = {
+                'created_at': datetime.now(timezone.utc).isoformat(),
+                'environment': {
+                    'python': platform.python_version(),
+                    'django': django.get_version(),
+                    'database': settings.DATABASES['default']['ENGINE'],
+                    'cache': settings.CACHES['default']['BACKEND'],
+                },
+                'dataset': dataset.counts(),
+                'views': views,
+                'chat_websocket': chat,
+            }
+        finally:
+            if not options['keep']:
+                benchmark.drop_dataset(dataset)
+
+        for name, result in views.items():
+            self.stderr.write(
+                f"{name:<28} p50 {result['p50_ms']:>8.2f}ms  p95 {result['p95_ms']:>8.2f}ms  "
+                f"p99 {result['p99_ms']:>8.2f}ms  queries {result['queries_median']}  status {result['status']}"
+            )
+        self.stderr.write(
+            f"{'ChatConsumer':<28} {chat['messages_per_second']} msg/s  p50 {chat['p50_ms']:.2f}ms  "
+            f"p99 {chat['p99_ms']:.2f}ms"
+        )
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as report_file:
+                report_file.write(output)
+            self.stderr.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,101 @@
+import os
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import models
+
+from common.models import ImageRenditionsModel
+from common.storage import ContentAddressedStorage, is_blob
+
+
+class Command(BaseCommand):
+    help = 'Move existing uploads into the content-addressed storage, storing every distinct file once'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report what would be moved')
+        parser.add_argument('--keep-originals', action='store_true',
+                            help="Don't delete the old files once every row points to its blob")
+
+    def handle(self, *args, **options):
+        if not isinstance(default_storage, ContentAddressedStorage):
+            raise CommandError("The default storage is not common.storage.ContentAddressedStorage")
+
+        self.legacy_storage = FileSystemStorage(location=settings.MEDIA_ROOT)
+        self.dry_run = options['dry_run']
+        # Legacy name -> blob name, a file referenced by several rows is hashed once
+        self.moved = {}
+        self.references = 0
+
+        for model in apps.get_models():
+            file_fields = [field for field in model._meta.get_fields() if isinstance(field, models.FileField)]
+            for field in file_fields:
+                self.migrate_field(model, field)
+            if issubclass(model, ImageRenditionsModel):
+                self.migrate_renditions(model)
+
+        bytes_before = sum(self.legacy_storage.size(name) for name in self.moved)
+        bytes_after = sum(default_storage.size(name) for name in set(self.moved.values()) if name)
+        self.stdout.write(
+            f"{len(self.moved)} file(s) for {self.references} reference(s) stored as "
+            f"{len(set(self.moved.values()))} blob(s), {bytes_before} -> {bytes_after} bytes"
+        )
+
+        if not self.dry_run and not options['keep_originals']:
+            for name in self.moved:
+                self.legacy_storage.delete(name)
+        self.stdout.write(self.style.SUCCESS("Dry run finished" if self.dry_run else "Media migrated"))
+
+    def to_blob(self, name):
+        """The blob of a legacy file, with one more reference, None when the file is gone."""
+        if name not in self.moved:
+            if not self.legacy_storage.exists(name):
+                self.stdout.write(self.style.WARNING(f"Missing file {name}, left as is"))
+                return None
+            if self.dry_run:
+                self.moved[name] = name
+                return name
+            with self.legacy_storage.open(name, 'rb') as legacy_file:
+                self.moved[name] = default_storage.save(os.path.basename(name), File(legacy_file))
+            self.references += 1
+            return self.moved[name]
+
+        blob_name = self.moved[name]
+        if blob_name and not self.dry_run:
+            default_storage.add_reference(blob_name)
+        self.references += 1
+        return blob_name
+
+    def migrate_field(self, model, field):
+        legacy = (
+            model._default_manager
+            .exclude(**{field.name: ''})
+            .exclude(**{f"{field.name}__startswith": 'blobs/'})
+            .exclude(**{f"{field.name}__isnull": True})
+        )
+        if field.has_default():
+            # Field defaults are referenced by name from code, they stay where they are
+            legacy = legacy.exclude(**{field.name: field.default})
+
+        legacy = legacy.values_list('pk', field.name)
+        for pk, name in legacy.iterator():
+            blob_name = self.to_blob(name)
+            if blob_name and not self.dry_run:
+                model._default_manager.filter(pk=pk).update(**{field.name: blob_name})
+
+    def migrate_renditions(self, model):
+        for pk, renditions in model._default_manager.exclude(renditions={}).values_list('pk', 'renditions').iterator():
+            changed = {
+                size: self.to_blob(path)
+                for size, path in renditions.items()
+                if size != 'source' and path and not is_blob(path)
+            }
+            source = renditions.get('source')
+            if source and not is_blob(source) and source in self.moved:
+                changed['source'] = self.moved[source]
+            if changed and not self.dry_run:
+                renditions.update({size: path for size, path in changed.items() if path})
+                model._default_manager.filter(pk=pk).update(renditions=renditions)
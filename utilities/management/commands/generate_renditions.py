@@ -0,0 +1,33 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from common.models import ImageRenditionsModel
+from common.renditions import generate_renditions, needs_renditions
+
+
+class Command(BaseCommand):
+    help = 'Generate missing image renditions of existing uploads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', action='append', dest='models',
+                            help='Limit to a model label such as posts.Post, can be repeated')
+
+    def handle(self, *args, **options):
+        models = [
+            model for model in apps.get_models()
+            if issubclass(model, ImageRenditionsModel)
+            and (not options['models'] or model._meta.label in options['models'])
+        ]
+
+        for model in models:
+            generated = 0
+            queryset = model._default_manager.exclude(**{model.rendition_field: ''}).order_by('pk')
+            for instance in queryset.iterator(chunk_size=500):
+                if not needs_renditions(instance):
+                    continue
+                try:
+                    if generate_renditions(model._meta.label, instance.pk):
+                        generated += 1
+                except Exception as e:
+                    self.stdout.write(self.style.ERROR(f"{model._meta.label} {instance.pk}: {e}"))
+            self.stdout.write(self.style.SUCCESS(f"{model._meta.label}: generated renditions for {generated} image(s)"))
@@ -0,0 +1,39 @@
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from common.archival import SOFT_DELETED_MODELS, expired, purge
+
+
+class Command(BaseCommand):
+    help = 'Hard-deletes (or archives) rows soft-deleted more than --days ago, in batched transactions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.SOFT_DELETE_RETENTION_DAYS,
+                            help='Rows soft-deleted at least this many days ago are purged')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Rows deleted per transaction')
+        parser.add_argument('--archive', action='store_true',
+                            help='Copy the rows to the ArchivedRow table before deleting them')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only count the rows that would be purged')
+        parser.add_argument('--model', action='append', choices=SOFT_DELETED_MODELS,
+                            help='Only purge this model, can be repeated')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        labels = [label for label in SOFT_DELETED_MODELS if label in (options['model'] or SOFT_DELETED_MODELS)]
+
+        for label in labels:
+            if options['dry_run']:
+                count = expired(apps.get_model(label), cutoff).count()
+                self.stdout.write(f"{label}: {count} row(s) to purge")
+                continue
+            deleted = purge(label, cutoff, options['batch_size'], options['archive'])
+            summary = ', '.join(f"{count} {model}" for model, count in sorted(deleted.items()) if count)
+            self.stdout.write(f"{label}: {summary or 'nothing to purge'}")
+
+        self.stdout.write(self.style.SUCCESS("Dry run finished" if options['dry_run'] else "Soft-deleted rows purged"))
@@ -0,0 +1,31 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from common.mail import process_outbox
+
+
+class Command(BaseCommand):
+    help = 'Sends the queued outbox emails, as a long running worker unless --once is given'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Send what is due and exit instead of polling')
+        parser.add_argument('--batch-size', type=int, default=settings.OUTBOX_BATCH_SIZE,
+                            help='Messages claimed per round')
+        parser.add_argument('--rate', type=int, default=settings.OUTBOX_RATE_PER_MINUTE,
+                            help='Messages sent per minute at most, 0 for no limit')
+
+    def handle(self, *args, **options):
+        while True:
+            result = process_outbox(options['batch_size'], options['rate'])
+            if any(result):
+                self.stdout.write(
+                    f"{result.sent} sent, {result.retried} to retry, {result.failed} given up"
+                )
+            if options['once']:
+                break
+            time.sleep(settings.OUTBOX_POLL_INTERVAL)
+
+        self.stdout.write(self.style.SUCCESS('Outbox processed.'))
@@ -1,3 +1,33 @@
+import json
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import TestCase
 
-# Create your tests here.
+
+class TestBenchmarkCommand(TestCase):
+    def test_small_run_reports_every_target_and_cleans_up(self):
+        stdout = StringIO()
+        call_command(
+            'benchmark',
+            '--users=4', '--follows-per-user=2', '--posts-per-user=2', '--tags=3',
+            '--likes-per-post=2', '--comments-per-post=1', '--chats-per-user=1',
+            '--messages-per-chat=5', '--requests=3', '--warmup=0', '--ws-messages=5',
+            '--force',
+            stdout=stdout,
+            stderr=StringIO(),
+        )
+        report = json.loads(stdout.getvalue())
+
+        self.assertEqual(
+            set(report['views']),
+            {'PostsListView', 'PostDetailView', 'ChatListView', 'ChatDetailView', 'FollowingProfileDetailView'}
+        )
+        for result in report['views'].values():
+            self.assertEqual(result['requests'], 3)
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+        self.assertEqual(report['dataset']['users'], 4)
+        self.assertEqual(report['chat_websocket']['messages'], 5)
+        self.assertGreater(report['chat_websocket']['messages_per_second'], 0)
+        self.assertFalse(get_user_model().objects.filter(username__startswith='bench-').exists())